@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import ActivityEvent, ActivityReadMarker
+
+
+@admin.register(ActivityEvent)
+class ActivityEventAdmin(admin.ModelAdmin):
+    list_display = ['title', 'kind', 'detail', 'actor', 'created_at']
+    list_filter = ['kind']
+    search_fields = ['title', 'detail']
+    list_select_related = ['actor']
+    raw_id_fields = ['actor', 'initiative', 'employee']
+    date_hierarchy = 'created_at'
+
+
+@admin.register(ActivityReadMarker)
+class ActivityReadMarkerAdmin(admin.ModelAdmin):
+    list_display = ['user', 'last_seen_at', 'updated_at']
+    list_select_related = ['user']
+    search_fields = ['user__username']
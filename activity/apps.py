@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ActivityConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'activity'
+    verbose_name = 'Actividad'
+    
+    def ready(self):
+        import activity.signals
@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .feed import unread_count
+
+
+def activity(request):
+    """Número de eventos sin leer; solo se consulta si la plantilla lo usa"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'activity_unread': SimpleLazyObject(lambda: unread_count(user))}
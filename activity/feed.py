@@ -0,0 +1,118 @@
+"""
+Flujo de actividad.
+
+Los eventos se escriben al guardar (ver signals.py) en una sola tabla, así que
+leer el flujo combinado es un recorrido del índice (created_at, id):
+
+    events, next_cursor = feed_page(before=request.GET.get('before'))
+
+El cursor es opaco para el cliente ("<microsegundos>_<id>") y la paginación
+no usa OFFSET, por lo que la página 100 cuesta lo mismo que la primera.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+from .models import ActivityEvent, ActivityReadMarker
+
+
+FEED_PAGE_SIZE = 20
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Usuario de la petición en curso; lo fija ActivityActorMiddleware
+current_actor = ContextVar('activity_actor', default=None)
+
+
+def record(kind, object_id, title, detail='', actor=None, **related):
+    """
+    Registra un evento. `related` son las referencias opcionales (initiative,
+    employee o sus *_id); el actor por defecto es el usuario de la petición.
+    """
+    actor = actor or current_actor.get()
+    return ActivityEvent.objects.create(
+        kind=kind,
+        object_id=object_id,
+        title=title[:200],
+        detail=detail[:255],
+        actor=actor if actor is not None and actor.is_authenticated else None,
+        **related,
+    )
+
+
+def encode_cursor(created_at, pk):
+    micros = (created_at - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}_{pk}'
+
+
+def decode_cursor(value):
+    """Devuelve (created_at, id) o None si el cursor no es válido"""
+    try:
+        micros, pk = value.split('_', 1)
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def _after(created_at, pk):
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+
+
+def _before(created_at, pk):
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+
+
+def feed_page(before=None, limit=FEED_PAGE_SIZE, queryset=None):
+    """
+    Devuelve (eventos, cursor_siguiente) con los `limit` eventos anteriores al
+    cursor `before`, del más reciente al más antiguo. El cursor siguiente es
+    None en la última página.
+    """
+    if limit < 1:
+        raise ValueError('limit debe ser al menos 1')
+    queryset = ActivityEvent.objects.all() if queryset is None else queryset
+    position = decode_cursor(before) if before else None
+    if position:
+        queryset = queryset.filter(_before(*position))
+
+    events = list(
+        queryset.select_related('actor', 'initiative', 'employee__user')
+        .order_by('-created_at', '-pk')[:limit + 1]
+    )
+    if len(events) > limit:
+        events = events[:limit]
+        return events, encode_cursor(events[-1].created_at, events[-1].pk)
+    return events, None
+
+
+def read_position(user):
+    """(created_at, id) del último evento visto por el usuario, o None"""
+    marker = ActivityReadMarker.objects.filter(user=user).values_list('last_seen_at', 'last_seen_id').first()
+    return tuple(marker) if marker else None
+
+
+def unread_count(user, position=None):
+    """Eventos de otros usuarios posteriores al marcador de lectura: un solo COUNT"""
+    position = position or read_position(user)
+    queryset = ActivityEvent.objects.exclude(actor=user)
+    if position:
+        queryset = queryset.filter(_after(*position))
+    return queryset.count()
+
+
+def mark_seen(user):
+    """Mueve el marcador de lectura del usuario al evento más reciente"""
+    latest = ActivityEvent.objects.order_by('-created_at', '-pk').values_list('created_at', 'pk').first()
+    if not latest:
+        return
+    ActivityReadMarker.objects.update_or_create(
+        user=user, defaults={'last_seen_at': latest[0], 'last_seen_id': latest[1]}
+    )
+
+
+def is_unread(event, position):
+    """Indica si el evento es posterior a la posición de lectura"""
+    if position is None:
+        return True
+    return (event.created_at, event.pk) > position
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from activity.models import ActivityEvent
+from initiatives.models import InitiativeUpdate
+from team.models import Absence
+
+
+class Command(BaseCommand):
+    help = 'Genera eventos de actividad para las actualizaciones y ausencias registradas antes del flujo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Registros por lote')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        created = 0
+
+        updates = InitiativeUpdate.objects.select_related('initiative').only(
+            'pk', 'title', 'update_type', 'created_by_id', 'created_at', 'initiative__title'
+        )
+        created += self._backfill('UPDATE', updates, chunk_size, lambda update: ActivityEvent(
+            kind='UPDATE', object_id=update.pk, title=update.title[:200],
+            detail=f'{update.get_update_type_display()} · {update.initiative.title}'[:255],
+            initiative_id=update.initiative_id, actor_id=update.created_by_id,
+            created_at=update.created_at,
+        ))
+
+        absences = Absence.objects.select_related('employee__user', 'absence_type')
+        created += self._backfill('ABSENCE_CREATED', absences, chunk_size, lambda absence: ActivityEvent(
+            kind='ABSENCE_CREATED', object_id=absence.pk, title=absence.employee.full_name[:200],
+            detail=f'{absence.absence_type.name} · {absence.start_date:%d/%m/%Y} al {absence.end_date:%d/%m/%Y}',
+            employee_id=absence.employee_id, created_at=absence.created_at,
+        ))
+
+        self.stdout.write(self.style.SUCCESS(f'{created} evento(s) de actividad creados'))
+
+    def _backfill(self, kind, queryset, chunk_size, build):
+        """Crea los eventos faltantes de `kind` recorriendo `queryset` por clave primaria"""
+        created = 0
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+            if not chunk:
+                return created
+            last_pk = chunk[-1].pk
+            existing = set(ActivityEvent.objects.filter(
+                kind=kind, object_id__in=[obj.pk for obj in chunk]
+            ).values_list('object_id', flat=True))
+            events = [build(obj) for obj in chunk if obj.pk not in existing]
+            ActivityEvent.objects.bulk_create(events)
+            created += len(events)
@@ -0,0 +1,14 @@
+from .feed import current_actor
+
+
+class ActivityActorMiddleware:
+    """Expone el usuario de la petición a las señales que registran actividad"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        token = current_actor.set(getattr(request, 'user', None))
+        try:
+            return self.get_response(request)
+        finally:
+            current_actor.reset(token)
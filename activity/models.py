@@ -0,0 +1,52 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class ActivityEvent(models.Model):
+    """Evento del flujo de actividad (actualizaciones, cambios de estado y ausencias)"""
+    KIND_CHOICES = [
+        ('UPDATE', 'Actualización de iniciativa'),
+        ('INITIATIVE_STATUS', 'Cambio de estado de iniciativa'),
+        ('STORY_STATUS', 'Cambio de estado de historia'),
+        ('ABSENCE_CREATED', 'Ausencia registrada'),
+        ('ABSENCE_CHANGED', 'Ausencia modificada'),
+        ('ABSENCE_DELETED', 'Ausencia eliminada'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Tipo')
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='activity_events', verbose_name='Realizado por')
+    initiative = models.ForeignKey('initiatives.Initiative', on_delete=models.SET_NULL, null=True, blank=True, related_name='activity_events', verbose_name='Iniciativa')
+    employee = models.ForeignKey('team.Employee', on_delete=models.SET_NULL, null=True, blank=True, related_name='activity_events', verbose_name='Empleado')
+    object_id = models.PositiveBigIntegerField(verbose_name='ID del Registro')
+    title = models.CharField(max_length=200, verbose_name='Título')
+    detail = models.CharField(max_length=255, blank=True, verbose_name='Detalle')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Fecha')
+    
+    class Meta:
+        verbose_name = 'Evento de Actividad'
+        verbose_name_plural = 'Eventos de Actividad'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Paginación por clave (created_at, id) y conteo de no leídos desde el marcador
+            models.Index(fields=['created_at', 'id'], name='activity_created_idx'),
+            models.Index(fields=['kind', 'object_id'], name='activity_kind_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+
+class ActivityReadMarker(models.Model):
+    """Último evento visto por cada usuario; lo posterior cuenta como no leído"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='activity_marker', verbose_name='Usuario')
+    last_seen_at = models.DateTimeField(verbose_name='Visto hasta')
+    last_seen_id = models.PositiveBigIntegerField(default=0, verbose_name='Último evento visto')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Marcador de Lectura'
+        verbose_name_plural = 'Marcadores de Lectura'
+
+    def __str__(self):
+        return f"{self.user} ({self.last_seen_at:%d/%m/%Y %H:%M})"
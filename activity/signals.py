@@ -0,0 +1,85 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from initiatives.models import Initiative, InitiativeUpdate, UserStory
+from team.models import Absence
+
+from .feed import record
+
+
+def _remember_status(sender, instance, update_fields):
+    """Guarda el estado previo para detectar transiciones en post_save"""
+    if update_fields is not None and 'status' not in update_fields:
+        instance._activity_previous_status = None
+        return
+    previous = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    instance._activity_previous_status = previous
+
+
+def _status_changed(instance, created):
+    previous = getattr(instance, '_activity_previous_status', None)
+    return not created and previous is not None and previous != instance.status
+
+
+@receiver(post_save, sender=InitiativeUpdate)
+def record_initiative_update(sender, instance, created, **kwargs):
+    if created:
+        record(
+            'UPDATE', instance.pk, instance.title,
+            detail=f'{instance.get_update_type_display()} · {instance.initiative.title}',
+            initiative=instance.initiative, actor=instance.created_by,
+        )
+
+
+@receiver(pre_save, sender=Initiative)
+@receiver(pre_save, sender=UserStory)
+def remember_status(sender, instance, update_fields=None, **kwargs):
+    _remember_status(sender, instance, update_fields)
+
+
+@receiver(post_save, sender=Initiative)
+def record_initiative_status(sender, instance, created, **kwargs):
+    if _status_changed(instance, created):
+        previous = dict(Initiative.STATUS_CHOICES).get(instance._activity_previous_status)
+        record(
+            'INITIATIVE_STATUS', instance.pk, instance.title,
+            detail=f'{previous} → {instance.get_status_display()}',
+            initiative=instance,
+        )
+
+
+@receiver(post_save, sender=UserStory)
+def record_story_status(sender, instance, created, **kwargs):
+    if _status_changed(instance, created):
+        previous = dict(UserStory.STATUS_CHOICES).get(instance._activity_previous_status)
+        record(
+            'STORY_STATUS', instance.pk, f'US-{instance.pk}: {instance.title}',
+            detail=f'{previous} → {instance.get_status_display()}',
+            initiative_id=instance.initiative_id,
+        )
+
+
+def _absence_detail(absence):
+    return f'{absence.absence_type.name} · {absence.start_date:%d/%m/%Y} al {absence.end_date:%d/%m/%Y}'
+
+
+@receiver(post_save, sender=Absence)
+def record_absence_change(sender, instance, created, **kwargs):
+    record(
+        'ABSENCE_CREATED' if created else 'ABSENCE_CHANGED', instance.pk,
+        instance.employee.full_name, detail=_absence_detail(instance),
+        employee=instance.employee,
+    )
+
+
+@receiver(post_delete, sender=Absence)
+def record_absence_delete(sender, instance, origin=None, **kwargs):
+    # Solo bajas directas: al eliminar un empleado sus ausencias caen en cascada
+    if getattr(origin, 'model', type(origin)) is not Absence:
+        return
+    record(
+        'ABSENCE_DELETED', instance.pk, instance.employee.full_name,
+        detail=_absence_detail(instance), employee_id=instance.employee_id,
+    )
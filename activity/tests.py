@@ -0,0 +1,115 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from team.models import Absence, AbsenceType, Employee
+
+from .feed import decode_cursor, encode_cursor, feed_page, mark_seen, record, unread_count
+from .models import ActivityEvent
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        self.ana = User.objects.create_user('ana', password='x')
+        self.beto = User.objects.create_user('beto', password='x')
+
+    def test_cursor_round_trip(self):
+        moment = datetime(2026, 3, 2, 9, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+        self.assertIsNone(decode_cursor('basura'))
+        self.assertIsNone(decode_cursor('12_x'))
+
+    def test_pages_cover_every_event_once_with_equal_timestamps(self):
+        moment = datetime(2026, 3, 2, 9, 0, tzinfo=dt_timezone.utc)
+        ids = [
+            ActivityEvent.objects.create(kind='UPDATE', object_id=n, title=f'Evento {n}', created_at=moment).pk
+            for n in range(5)
+        ]
+
+        seen, cursor = [], None
+        while True:
+            events, cursor = feed_page(before=cursor, limit=2)
+            seen.extend(event.pk for event in events)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, sorted(ids, reverse=True))
+
+    def test_limit_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            feed_page(limit=0)
+
+    def test_unread_count_follows_read_marker(self):
+        record('UPDATE', 1, 'Propio', actor=self.ana)
+        record('UPDATE', 2, 'Ajeno', actor=self.beto)
+        self.assertEqual(unread_count(self.ana), 1)
+
+        mark_seen(self.ana)
+        self.assertEqual(unread_count(self.ana), 0)
+
+        record('UPDATE', 3, 'Nuevo', actor=self.beto)
+        self.assertEqual(unread_count(self.ana), 1)
+
+
+class ActivitySignalTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('ana', password='x', first_name='Ana', last_name='Prueba')
+        self.employee = Employee.objects.create(
+            user=user, employee_id='ANA', birth_date=date(1990, 1, 1), hire_date=date(2015, 3, 1), position='Analista',
+        )
+        self.absence_type = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+
+    def test_absence_changes_are_recorded(self):
+        absence = Absence.objects.create(
+            employee=self.employee, absence_type=self.absence_type, start_date=date(2026, 3, 2), end_date=date(2026, 3, 3),
+        )
+        absence.end_date = date(2026, 3, 4)
+        absence.save()
+        absence.delete()
+
+        self.assertEqual(
+            list(ActivityEvent.objects.order_by('pk').values_list('kind', flat=True)),
+            ['ABSENCE_CREATED', 'ABSENCE_CHANGED', 'ABSENCE_DELETED'],
+        )
+        self.assertEqual(ActivityEvent.objects.order_by('pk').last().detail, 'Vacaciones · 02/03/2026 al 04/03/2026')
+
+    def test_cascaded_absences_are_not_recorded(self):
+        Absence.objects.create(
+            employee=self.employee, absence_type=self.absence_type, start_date=date(2026, 3, 2), end_date=date(2026, 3, 3),
+        )
+        self.employee.delete()
+        self.assertFalse(ActivityEvent.objects.filter(kind='ABSENCE_DELETED').exists())
+
+
+class ActivityViewTests(TestCase):
+    def setUp(self):
+        self.ana = User.objects.create_user('ana', password='x')
+        self.beto = User.objects.create_user('beto', password='x')
+        for n in range(3):
+            record('UPDATE', n, f'Evento {n}', actor=self.beto)
+        self.client.force_login(self.ana)
+
+    def test_feed_marks_everything_seen(self):
+        response = self.client.get(reverse('activity:feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(event.is_unread for event in response.context['events']))
+        self.assertEqual(unread_count(self.ana), 0)
+
+    def test_items_page_and_invalid_cursor(self):
+        response = self.client.get(reverse('activity:items'), {'limit': 2})
+        self.assertEqual(len(response.context['events']), 2)
+        cursor = response.context['next_cursor']
+
+        response = self.client.get(reverse('activity:items'), {'before': cursor, 'limit': 'x'})
+        self.assertEqual([event.title for event in response.context['events']], ['Evento 0'])
+        self.assertIsNone(response.context['next_cursor'])
+
+        for limit in ('0', '-1'):
+            response = self.client.get(reverse('activity:items'), {'limit': limit})
+            self.assertEqual(len(response.context['events']), 1)
+
+        # Un cursor ilegible se ignora y se muestra la primera página
+        response = self.client.get(reverse('activity:items'), {'before': 'basura'})
+        self.assertEqual(len(response.context['events']), 3)
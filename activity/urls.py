@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'activity'
+
+urlpatterns = [
+    path('', views.activity_feed, name='feed'),
+    path('items/', views.activity_items, name='items'),
+]
@@ -0,0 +1,62 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+
+from .feed import (
+    FEED_PAGE_SIZE, decode_cursor, encode_cursor, feed_page, is_unread, mark_seen, read_position,
+)
+from .models import ActivityEvent
+
+
+def _feed_queryset(request):
+    """Eventos filtrados por tipo (`kind`) si se indica"""
+    queryset = ActivityEvent.objects.all()
+    kind = request.GET.get('kind', '')
+    if kind in dict(ActivityEvent.KIND_CHOICES):
+        queryset = queryset.filter(kind=kind)
+    return queryset, kind
+
+
+def _annotate_unread(events, position):
+    for event in events:
+        event.is_unread = is_unread(event, position)
+    return events
+
+
+@login_required
+def activity_feed(request):
+    """Flujo de actividad con scroll infinito; al abrirlo se marca todo como visto"""
+    queryset, kind = _feed_queryset(request)
+    position = read_position(request.user)
+    events, next_cursor = feed_page(queryset=queryset)
+    mark_seen(request.user)
+
+    return render(request, 'activity/feed.html', {
+        'events': _annotate_unread(events, position),
+        'next_cursor': next_cursor,
+        'kind': kind,
+        'kind_choices': ActivityEvent.KIND_CHOICES,
+        # Posición previa de lectura para resaltar lo nuevo también en las páginas siguientes
+        'seen': encode_cursor(*position) if position else '',
+    })
+
+
+@login_required
+def activity_items(request):
+    """Fragmento HTMX con la siguiente página de eventos"""
+    queryset, kind = _feed_queryset(request)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', FEED_PAGE_SIZE)), 100))
+    except ValueError:
+        limit = FEED_PAGE_SIZE
+    events, next_cursor = feed_page(before=request.GET.get('before'), limit=limit, queryset=queryset)
+    seen = request.GET.get('seen', '')
+    position = decode_cursor(seen) if seen else None
+    if position:
+        _annotate_unread(events, position)
+
+    return render(request, 'activity/_items.html', {
+        'events': events,
+        'seen': seen,
+        'next_cursor': next_cursor,
+        'kind': kind,
+    })
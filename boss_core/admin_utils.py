@@ -0,0 +1,163 @@
+"""
+Utilidades para changelists del admin con tablas grandes.
+
+- EstimatedCountPaginator: evita el COUNT(*) exacto sobre millones de filas.
+  Sin filtros usa la estimación del motor (estadísticas de la tabla); con
+  filtros cuenta como máximo COUNT_LIMIT filas.
+- InputFilter: filtro lateral con un campo de búsqueda en lugar de listar
+  todas las opciones (por ejemplo, todos los empleados).
+- DeferredSideEffectsMixin: las acciones masivas recalculan una vez al final
+  en lugar de por registro.
+
+Uso:
+    class TaskAdmin(admin.ModelAdmin):
+        paginator = EstimatedCountPaginator
+        show_full_result_count = False
+        list_filter = [EmployeeInputFilter.for_field('assignee')]
+"""
+from django.contrib import admin
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from boss_core.side_effects import defer_side_effects
+
+
+COUNT_LIMIT = 10000
+
+
+def estimated_table_count(queryset):
+    """
+    Filas estimadas de la tabla del queryset según las estadísticas del
+    motor, o None si el queryset tiene filtros o el motor no ofrece estimación.
+    """
+    if queryset.query.where:
+        return None
+
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+            )
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 solo existe después de ejecutar ANALYZE
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+
+    if not row or row[0] is None:
+        return None
+    try:
+        estimate = int(str(row[0]).split()[0])
+    except ValueError:
+        return None
+    # PostgreSQL devuelve -1 para tablas nunca analizadas
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginador para changelists grandes. Solo cuenta exacto si el resultado
+    tiene menos de COUNT_LIMIT filas; si no, usa la estimación del motor (sin
+    filtros) o el tope, de modo que el conteo nunca recorre la tabla completa.
+    """
+    count_limit = COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        capped = queryset.order_by().values('pk')[:self.count_limit + 1].count()
+        if capped <= self.count_limit:
+            return capped
+        estimate = estimated_table_count(queryset)
+        return max(estimate, capped) if estimate is not None else capped
+
+    @property
+    def is_exact(self):
+        return self.count <= self.count_limit
+
+    def validate_number(self, number):
+        # Con un conteo aproximado puede haber páginas más allá de la estimación
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.is_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if number <= self.num_pages:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Filtro lateral con un campo de texto. Las subclases definen `title`,
+    `parameter_name` y `search_fields` (lookups icontains, combinados con OR).
+    """
+    template = 'admin/input_filter.html'
+    search_fields = ()
+
+    def lookups(self, request, model_admin):
+        # Una opción ficticia para que el admin muestre el filtro
+        return ((),)
+
+    def choices(self, changelist):
+        # Parámetros actuales (salvo la página), para conservarlos al buscar
+        all_choice = next(super().choices(changelist))
+        all_choice['value'] = self.value() or ''
+        all_choice['query_parts'] = [
+            (key, value)
+            for key, values in changelist.params.items()
+            if key not in (self.parameter_name, 'p')
+            for value in (values if isinstance(values, list) else [values])
+        ]
+        yield all_choice
+
+    def queryset(self, request, queryset):
+        term = (self.value() or '').strip()
+        if not term:
+            return queryset
+        condition = Q()
+        for word in term.split():
+            word_condition = Q()
+            for field in self.search_fields:
+                word_condition |= Q(**{f'{field}__icontains': word})
+            condition &= word_condition
+        return queryset.filter(condition)
+
+    @classmethod
+    def for_field(cls, prefix, title=None):
+        """Crea una variante del filtro que busca a través de la relación `prefix`"""
+        return type(f'{cls.__name__}_{prefix}', (cls,), {
+            'title': title or cls.title,
+            'parameter_name': f'{prefix}_q',
+            'search_fields': tuple(f'{prefix}__{field}' for field in cls.search_fields),
+        })
+
+
+class EmployeeInputFilter(InputFilter):
+    title = 'Empleado'
+    parameter_name = 'employee_q'
+    search_fields = ('user__first_name', 'user__last_name', 'employee_id')
+
+
+class DeferredSideEffectsMixin:
+    """Borrado masivo ("Eliminar seleccionados") con los efectos secundarios diferidos"""
+
+    def delete_queryset(self, request, queryset):
+        with defer_side_effects():
+            super().delete_queryset(request, queryset)
@@ -0,0 +1,96 @@
+"""
+Inspección de dependencias antes de eliminar un registro.
+
+Todos los conteos de relaciones se obtienen en una sola consulta, anotando
+una subconsulta COUNT por relación sobre el registro. Los listados de
+objetos relacionados son querysets perezosos limitados a los primeros N:
+solo se consultan si la plantilla los recorre.
+
+Uso:
+    report = inspect_dependencies(employee, [
+        Relation('owned_initiatives', Initiative.objects.all(), 'owner',
+                 blocking=True, message='Es propietario de {count} iniciativa(s)'),
+        ...
+    ])
+    report.can_delete, report.counts['owned_initiatives'], report.preview['owned_initiatives']
+"""
+from typing import NamedTuple
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+PREVIEW_LIMIT = 5
+
+
+class Relation(NamedTuple):
+    name: str
+    queryset: object
+    lookup: str
+    outer: str = 'pk'
+    blocking: bool = False
+    message: str = ''
+
+
+class DependencyReport(NamedTuple):
+    instance: object
+    relations: list
+    counts: dict
+    preview: dict
+
+    @property
+    def blocking_reasons(self):
+        return [
+            relation.message.format(count=self.counts[relation.name])
+            for relation in self.relations
+            if relation.blocking and self.counts[relation.name]
+        ]
+
+    @property
+    def warnings(self):
+        return [
+            relation.message.format(count=self.counts[relation.name])
+            for relation in self.relations
+            if not relation.blocking and self.counts[relation.name]
+        ]
+
+    @property
+    def can_delete(self):
+        return not any(
+            self.counts[relation.name] for relation in self.relations if relation.blocking
+        )
+
+
+def count_subquery(queryset, lookup, outer='pk'):
+    """Expresión COUNT correlacionada: filas de `queryset` cuyo `lookup` apunta a OuterRef(outer)"""
+    counted = queryset.filter(
+        **{lookup: OuterRef(outer)}
+    ).order_by().values(lookup).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def _count_subquery(relation):
+    return count_subquery(relation.queryset, relation.lookup, relation.outer)
+
+
+def inspect_dependencies(instance, relations, preview_limit=PREVIEW_LIMIT):
+    """Cuenta en una consulta las dependencias de `instance` y prepara los listados perezosos"""
+    counts = type(instance)._default_manager.filter(pk=instance.pk).annotate(
+        **{f'dep_count_{relation.name}': _count_subquery(relation) for relation in relations}
+    ).values(*(f'dep_count_{relation.name}' for relation in relations)).first() or {}
+
+    outer_values = {}
+    preview = {}
+    for relation in relations:
+        if relation.outer not in outer_values:
+            outer_values[relation.outer] = getattr(instance, 'pk' if relation.outer == 'pk' else f'{relation.outer}_id')
+        preview[relation.name] = relation.queryset.filter(
+            **{relation.lookup: outer_values[relation.outer]}
+        )[:preview_limit]
+
+    return DependencyReport(
+        instance=instance,
+        relations=relations,
+        counts={relation.name: counts.get(f'dep_count_{relation.name}', 0) for relation in relations},
+        preview=preview,
+    )
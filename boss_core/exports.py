@@ -0,0 +1,121 @@
+"""
+Exportaciones por streaming.
+
+Las filas se escriben una a una en un buffer que devuelve lo escrito en vez
+de acumularlo, de modo que la respuesta se envía mientras se recorre el
+queryset y nunca se construye completa en memoria.
+
+Los XLSX se generan con un libro de solo escritura: openpyxl vuelca cada fila
+a un archivo temporal y al final comprime el libro en disco, que se envía por
+bloques. La memoria es constante, pero la descarga empieza al terminar de
+generar el archivo.
+
+Los textos provienen de usuarios (motivos, títulos), así que se neutralizan
+antes de escribirlos: un valor que empieza con = + - @ (o tabulador o retorno)
+se interpretaría como fórmula al abrir el archivo. En XLSX se escribe como
+celda de texto explícita y en CSV con un apóstrofo delante. Los caracteres
+de control que XLSX no admite se eliminan.
+
+    return export_response(request.GET.get('export'), 'ausencias', header, rows)
+"""
+import csv
+import tempfile
+from itertools import islice
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """Objeto tipo archivo que devuelve el valor escrito en lugar de guardarlo"""
+
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    """Texto que una hoja de cálculo no evaluará como fórmula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def iter_csv(header, rows):
+    writer = csv.writer(Echo())
+    # BOM para que Excel detecte UTF-8
+    yield '\ufeff'
+    yield writer.writerow([csv_value(value) for value in header])
+    for row in rows:
+        yield writer.writerow([csv_value(value) for value in row])
+
+
+def streaming_csv_response(filename, header, rows):
+    response = StreamingHttpResponse(iter_csv(header, rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def xlsx_row(sheet, row):
+    """Valores de la fila listos para openpyxl: sin caracteres de control y sin fórmulas"""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    values = []
+    for value in row:
+        if isinstance(value, str):
+            value = ILLEGAL_CHARACTERS_RE.sub('', value)
+            if value.startswith(FORMULA_PREFIXES):
+                value = WriteOnlyCell(sheet, value)
+                # openpyxl marca como fórmula todo texto que empieza con "="
+                value.data_type = 's'
+        values.append(value)
+    return values
+
+
+def xlsx_response(filename, header, rows, sheet_title='Datos'):
+    """Libro XLSX de una hoja generado fila por fila en un archivo temporal"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title[:31])
+    sheet.append(xlsx_row(sheet, header))
+    for row in rows:
+        sheet.append(xlsx_row(sheet, row))
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    # FileResponse envía el archivo por bloques y lo cierra (y borra) al terminar
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+def export_response(fmt, basename, header, rows, sheet_title=None):
+    """Respuesta de descarga en el formato pedido ('csv' o 'xlsx')"""
+    if fmt == 'xlsx':
+        return xlsx_response(f'{basename}.xlsx', header, rows, sheet_title or basename.replace('_', ' ').title())
+    return streaming_csv_response(f'{basename}.csv', header, rows)
+
+
+def chunked(iterable, size):
+    """Agrupa un iterable en listas de `size` elementos para procesarlas por lote"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def full_name(first_name, last_name):
+    """Igual que User.get_full_name() a partir de columnas de values_list"""
+    return f'{first_name} {last_name}'.strip()
+
+
+def local_time(value):
+    """Fecha y hora local sin zona ni microsegundos: XLSX no admite zonas horarias"""
+    if value is None:
+        return None
+    return timezone.localtime(value).replace(tzinfo=None, microsecond=0)
@@ -0,0 +1,214 @@
+"""
+Feeds iCalendar de suscripción (por usuario y por departamento).
+
+Los clientes de calendario consultan el feed cada pocos minutos sin sesión,
+así que la URL lleva un token firmado con el alcance del feed. Cada respuesta
+lleva un ETag calculado a partir de los datos del alcance (número y última
+modificación de las ausencias, y los campos publicados de empleados, sprints
+y tareas operativas) y del día en curso: mientras nada de eso cambie
+la consulta se responde con 304 usando unas pocas consultas agregadas, sin
+generar el calendario. Al salir de los datos, el ETag es el mismo en todos
+los procesos y no necesita invalidarse.
+"""
+import hashlib
+from datetime import date, datetime, time, timedelta
+from itertools import chain
+from typing import NamedTuple
+
+from django.core import signing
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from boss_core.ical import CalendarEvent
+from initiatives.models import Sprint
+from initiatives.projection import occurrence_events, project_occurrences, projected_tasks
+from team.departments import normalize_department_name
+from team.models import Absence, Department, Employee
+
+
+FEED_SALT = 'boss.calendar-feed'
+
+# Ventana de los feeds alrededor de hoy
+FEED_PAST_DAYS = 90
+FEED_FUTURE_DAYS = 365
+# Las tareas operativas diarias generan muchas ocurrencias: se proyectan menos días
+OPERATIONAL_FUTURE_DAYS = 90
+
+
+def feed_token(scope, value):
+    """
+    Token firmado y estable para un feed: scope 'user' (id de usuario) o
+    'department' (id; los tokens anteriores llevan el nombre). Se revoca al
+    rotar SECRET_KEY.
+    """
+    return signing.Signer(salt=FEED_SALT).sign_object([scope, value], compress=True)
+
+
+def read_feed_token(token):
+    """Devuelve (scope, valor) o None si el token no es válido"""
+    try:
+        scope, value = signing.Signer(salt=FEED_SALT).unsign_object(token)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if scope not in ('user', 'department'):
+        return None
+    return scope, value
+
+
+def _absence_events(absences, start, end):
+    absences = absences.filter(start_date__lte=end, end_date__gte=start).select_related(
+        'employee__user', 'absence_type'
+    ).order_by('start_date', 'pk')
+    for absence in absences.iterator(chunk_size=500):
+        yield CalendarEvent(
+            uid=f'absence-{absence.pk}@boss',
+            summary=f'{absence.employee.full_name} - {absence.absence_type.name}',
+            start=absence.start_date,
+            end=absence.end_date,
+            description=absence.reason,
+            all_day=True,
+            categories='Ausencia',
+        )
+
+
+def _birthday(birth_date, year):
+    try:
+        return birth_date.replace(year=year)
+    except ValueError:
+        # 29 de febrero en año no bisiesto
+        return date(year, 2, 28)
+
+
+def _birthday_events(employees, start, end):
+    for employee in employees.filter(is_active=True).select_related('user').order_by('pk'):
+        for year in range(start.year, end.year + 1):
+            birthday = _birthday(employee.birth_date, year)
+            if start <= birthday <= end:
+                yield CalendarEvent(
+                    uid=f'birthday-{employee.pk}-{year}@boss',
+                    summary=f'Cumpleaños de {employee.full_name}',
+                    start=birthday,
+                    all_day=True,
+                    categories='Cumpleaños',
+                )
+
+
+def _sprint_events(start, end):
+    sprints = Sprint.objects.filter(start_date__lte=end, end_date__gte=start).order_by('start_date')
+    for sprint in sprints:
+        yield CalendarEvent(
+            uid=f'sprint-{sprint.pk}-start@boss',
+            summary=f'Inicio de {sprint.name}',
+            start=sprint.start_date,
+            description=sprint.goal,
+            all_day=True,
+            categories='Sprint',
+        )
+        yield CalendarEvent(
+            uid=f'sprint-{sprint.pk}-end@boss',
+            summary=f'Fin de {sprint.name}',
+            start=sprint.end_date,
+            all_day=True,
+            categories='Sprint',
+        )
+
+
+def _operational_events(tasks, start):
+    range_start = timezone.make_aware(datetime.combine(start, time.min))
+    range_end = timezone.make_aware(datetime.combine(
+        timezone.localdate() + timedelta(days=OPERATIONAL_FUTURE_DAYS), time.max
+    ))
+    return occurrence_events(project_occurrences(tasks, range_start, range_end))
+
+
+def _feed_department(value):
+    """Department del token: por id, o por nombre en los tokens anteriores al modelo"""
+    if isinstance(value, int):
+        return Department.objects.filter(pk=value).first()
+    return Department.objects.filter(name__iexact=normalize_department_name(value)).first()
+
+
+class FeedSources(NamedTuple):
+    name: str
+    absences: object
+    colleagues: object
+    tasks: object
+
+
+def _feed_window():
+    today = timezone.localdate()
+    return today - timedelta(days=FEED_PAST_DAYS), today + timedelta(days=FEED_FUTURE_DAYS)
+
+
+def feed_sources(scope, value):
+    """Querysets del alcance del feed, o None si ya no existe (usuario sin perfil de empleado, etc.)"""
+    if scope == 'user':
+        employee = Employee.objects.filter(user_id=value).select_related('user').first()
+        if employee is None:
+            return None
+        return FeedSources(
+            name=f'BOSS - {employee.full_name}',
+            absences=Absence.objects.filter(employee=employee),
+            colleagues=Employee.objects.filter(department_id=employee.department_id),
+            tasks=projected_tasks(owner_id=employee.pk),
+        )
+
+    department = _feed_department(value)
+    if department is None:
+        return None
+    return FeedSources(
+        name=f'BOSS - {department.name}',
+        absences=Absence.objects.filter(employee__department_id=department.pk),
+        colleagues=Employee.objects.filter(department_id=department.pk),
+        tasks=projected_tasks().filter(initiative__owner__department_id=department.pk),
+    )
+
+
+def feed_etag(scope, value):
+    """
+    ETag del feed: cambia con los datos publicados o al cambiar de día (la
+    ventana se desplaza). None si el alcance ya no existe.
+    """
+    sources = feed_sources(scope, value)
+    if sources is None:
+        return None
+    start, end = _feed_window()
+
+    digest = hashlib.md5(f'{scope}:{value}:{sources.name}'.encode('utf-8'))
+    stamp = sources.absences.filter(start_date__lte=end, end_date__gte=start).aggregate(
+        count=Count('pk'), last=Max('updated_at')
+    )
+    digest.update(f'{stamp["count"]}:{stamp["last"] and stamp["last"].isoformat()}'.encode('utf-8'))
+    # Los demás orígenes son pocos renglones por alcance: se resumen los campos publicados
+    for row in chain(
+        sources.colleagues.order_by('pk').values_list(
+            'pk', 'user__first_name', 'user__last_name', 'birth_date', 'is_active',
+        ),
+        Sprint.objects.filter(start_date__lte=end, end_date__gte=start).order_by('pk').values_list(
+            'pk', 'name', 'start_date', 'end_date', 'goal',
+        ),
+        sources.tasks.values_list(
+            'pk', 'frequency', 'day_of_week', 'day_of_month', 'time_of_day', 'duration_hours', 'last_execution',
+            'initiative__title', 'initiative__start_date',
+        ),
+    ):
+        digest.update(f'|{row!r}'.encode('utf-8'))
+    return f'{digest.hexdigest()[:16]}-{timezone.localdate():%Y%m%d}'
+
+
+def feed_events(scope, value):
+    """
+    Eventos del feed como un iterable perezoso. Devuelve (nombre, eventos) o
+    None si el alcance ya no existe (usuario sin perfil de empleado, etc.).
+    """
+    sources = feed_sources(scope, value)
+    if sources is None:
+        return None
+    start, end = _feed_window()
+
+    return sources.name, chain(
+        _absence_events(sources.absences, start, end),
+        _birthday_events(sources.colleagues, start, end),
+        _sprint_events(start, end),
+        _operational_events(sources.tasks, start),
+    )
@@ -0,0 +1,93 @@
+"""
+Generación de calendarios iCalendar (RFC 5545) por streaming.
+
+Los eventos se consumen de un iterable y se emiten línea por línea, de modo
+que un calendario con miles de eventos nunca se construye completo en memoria.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import NamedTuple, Optional
+
+
+PRODID = '-//BOSS//Sistema de Gestion de Equipo//ES'
+
+
+class CalendarEvent(NamedTuple):
+    uid: str
+    summary: str
+    start: object
+    end: Optional[object] = None
+    description: str = ''
+    all_day: bool = False
+    categories: str = ''
+
+
+def escape_text(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_date(value):
+    return value.strftime('%Y%m%d')
+
+
+def fold_line(line):
+    """Divide líneas de más de 75 octetos según RFC 5545"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current = ''
+    for char in line:
+        limit = 75 if not parts else 74
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = char
+        else:
+            current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def event_lines(event, stamp):
+    yield 'BEGIN:VEVENT'
+    yield f'UID:{event.uid}'
+    yield f'DTSTAMP:{stamp}'
+    if event.all_day:
+        end = event.end or event.start
+        yield f'DTSTART;VALUE=DATE:{format_date(event.start)}'
+        # DTEND en eventos de día completo es exclusivo
+        yield f'DTEND;VALUE=DATE:{format_date(end + timedelta(days=1))}'
+    else:
+        yield f'DTSTART:{format_datetime(event.start)}'
+        if event.end:
+            yield f'DTEND:{format_datetime(event.end)}'
+    yield f'SUMMARY:{escape_text(event.summary)}'
+    if event.description:
+        yield f'DESCRIPTION:{escape_text(event.description)}'
+    if event.categories:
+        yield f'CATEGORIES:{escape_text(event.categories)}'
+    yield 'END:VEVENT'
+
+
+def iter_calendar(events, name):
+    """Genera el calendario completo como una secuencia de líneas terminadas en CRLF"""
+    stamp = format_datetime(datetime.now(dt_timezone.utc))
+    yield fold_line('BEGIN:VCALENDAR')
+    yield fold_line('VERSION:2.0')
+    yield fold_line(f'PRODID:{PRODID}')
+    yield fold_line('CALSCALE:GREGORIAN')
+    yield fold_line(f'X-WR-CALNAME:{escape_text(name)}')
+    for event in events:
+        for line in event_lines(event, stamp):
+            yield fold_line(line)
+    yield fold_line('END:VCALENDAR')
@@ -0,0 +1,265 @@
+"""
+Conciliación de valores derivados.
+
+Algunos campos se guardan calculados y los mantienen métodos save() y señales
+registro por registro, por lo que pueden desviarse (ediciones en el admin,
+cargas masivas, errores a medias):
+
+- Vacation.days_taken y days_pending: días hábiles de vacaciones del año.
+- Initiative.progress: promedio del progreso de sus historias.
+- OperationalTask.next_execution: próxima ocurrencia según su frecuencia.
+- Initiative/UserStory.priority_rank: rango numérico de la prioridad.
+- Department.headcount: empleados activos del departamento.
+- Initiative/UserStory/Task.attachment_count: adjuntos propios de cada registro.
+
+Cada familia se recalcula completa con una o dos consultas agregadas
+recorridas con .iterator(), se compara con lo guardado y las diferencias se
+corrigen con bulk_update por lotes:
+
+    reports = reconcile(dry_run=True)
+"""
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from initiatives.models import Attachment, Initiative, OperationalTask, Task, UserStory, priority_rank
+from team.models import Absence, Department, Employee, Vacation
+from team.workdays import business_days_array
+
+
+RECONCILE_CHUNK_SIZE = 1000
+
+
+class Drift(NamedTuple):
+    """Registro con valores guardados distintos de los calculados"""
+    pk: int
+    label: str
+    # campo -> (guardado, esperado)
+    changes: dict
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'label': self.label,
+            'changes': {field: {'stored': stored, 'expected': expected}
+                        for field, (stored, expected) in self.changes.items()},
+        }
+
+
+class FamilyReport(NamedTuple):
+    name: str
+    checked: int
+    drifts: list
+    dry_run: bool
+
+    def as_dict(self):
+        return {
+            'checked': self.checked,
+            'corrected': 0 if self.dry_run else len(self.drifts),
+            'drifted': len(self.drifts),
+            'records': [drift.as_dict() for drift in self.drifts],
+        }
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _diff(stored, expected):
+    return {field: (stored[field], value) for field, value in expected.items() if stored[field] != value}
+
+
+def check_vacations(chunk_size=RECONCILE_CHUNK_SIZE):
+    """Días tomados y pendientes de todos los registros de vacaciones"""
+    # Una pasada por las ausencias de vacaciones; días hábiles por lote con numpy
+    taken = defaultdict(int)
+    absences = Absence.objects.filter(absence_type__code='VAC').values_list(
+        'employee_id', 'start_date', 'end_date'
+    ).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(absences, chunk_size):
+        employee_ids, starts, ends = zip(*chunk)
+        for employee_id, start, days in zip(employee_ids, starts, business_days_array(starts, ends)):
+            taken[(employee_id, start.year)] += int(days)
+
+    checked = 0
+    drifts = []
+    vacations = Vacation.objects.values_list(
+        'pk', 'employee__employee_id', 'employee_id', 'year',
+        'days_entitled', 'days_carried_over', 'days_taken', 'days_pending',
+    ).order_by('pk')
+    for pk, code, employee_id, year, entitled, carried, days_taken, days_pending in vacations.iterator(
+        chunk_size=chunk_size
+    ):
+        checked += 1
+        expected_taken = taken.get((employee_id, year), 0)
+        changes = _diff(
+            {'days_taken': days_taken, 'days_pending': days_pending},
+            {'days_taken': expected_taken, 'days_pending': entitled + carried - expected_taken},
+        )
+        if changes:
+            drifts.append(Drift(pk, f'{code} {year}', changes))
+    return checked, drifts
+
+
+def _story_progress(status, total, done):
+    """Mismo cálculo que UserStory.progress_percentage"""
+    if total == 0:
+        return 0 if status != 'DONE' else 100
+    return round((done / total) * 100, 2)
+
+
+def check_initiative_progress(chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    Progreso de las iniciativas con historias (las demás se actualizan a mano),
+    igual que UserStory.update_initiative_progress
+    """
+    sums = defaultdict(float)
+    counts = defaultdict(int)
+    stories = UserStory.objects.annotate(
+        total=Count('tasks'), done=Count('tasks', filter=Q(tasks__status='DONE'))
+    ).values_list('initiative_id', 'status', 'total', 'done').order_by()
+    for initiative_id, status, total, done in stories.iterator(chunk_size=chunk_size):
+        sums[initiative_id] += _story_progress(status, total, done)
+        counts[initiative_id] += 1
+
+    checked = 0
+    drifts = []
+    initiatives = Initiative.objects.filter(pk__in=list(counts)).values_list('pk', 'title', 'progress').order_by('pk')
+    for pk, title, progress in initiatives.iterator(chunk_size=chunk_size):
+        checked += 1
+        # IntegerField: al guardar se trunca la parte decimal
+        expected = int(min(100, round(sums[pk] / counts[pk], 2)))
+        if progress != expected:
+            drifts.append(Drift(pk, title, {'progress': (progress, expected)}))
+    return checked, drifts
+
+
+def check_next_execution(chunk_size=RECONCILE_CHUNK_SIZE, now=None):
+    """
+    Próxima ejecución de las tareas operativas: vacía en tareas bajo demanda,
+    y en las recurrentes presente y posterior a la última ejecución. Las fechas
+    fijadas a mano que cumplen esto se respetan.
+    """
+    now = now or timezone.now()
+    checked = 0
+    drifts = []
+    tasks = OperationalTask.objects.select_related('initiative').only(
+        'frequency', 'day_of_week', 'day_of_month', 'time_of_day',
+        'last_execution', 'next_execution', 'initiative__title', 'initiative__start_date',
+    ).order_by('pk')
+    for task in tasks.iterator(chunk_size=chunk_size):
+        checked += 1
+        expected = task.next_execution
+        if not task.recurrence_rule.is_recurring:
+            expected = None
+        elif task.next_execution is None:
+            # Igual que el planificador al encontrar una tarea sin programar
+            expected = task.calculate_next_execution(after=now)
+        elif task.last_execution and task.next_execution <= task.last_execution:
+            expected = task.calculate_next_execution()
+        if expected != task.next_execution:
+            drifts.append(Drift(task.pk, task.initiative.title, {'next_execution': (task.next_execution, expected)}))
+    return checked, drifts
+
+
+def _check_priority_ranks(model):
+    def check(chunk_size=RECONCILE_CHUNK_SIZE):
+        """Rango de prioridad de cada registro según su código"""
+        checked = 0
+        drifts = []
+        rows = model.objects.values_list('pk', 'title', 'priority', 'priority_rank').order_by('pk')
+        for pk, title, priority, rank in rows.iterator(chunk_size=chunk_size):
+            checked += 1
+            expected = priority_rank(priority)
+            if rank != expected:
+                drifts.append(Drift(pk, title, {'priority_rank': (rank, expected)}))
+        return checked, drifts
+    return check
+
+
+def _check_attachment_counts(model, owner, **direct):
+    def check(chunk_size=RECONCILE_CHUNK_SIZE):
+        """Adjuntos propios de cada registro (los de sus historias o tareas cuentan en ellas)"""
+        counts = dict(
+            Attachment.objects.filter(**direct).values_list(owner).annotate(total=Count('pk')).order_by()
+        )
+        checked = 0
+        drifts = []
+        rows = model.objects.values_list('pk', 'title', 'attachment_count').order_by('pk')
+        for pk, title, stored in rows.iterator(chunk_size=chunk_size):
+            checked += 1
+            expected = counts.get(pk, 0)
+            if stored != expected:
+                drifts.append(Drift(pk, title, {'attachment_count': (stored, expected)}))
+        return checked, drifts
+    return check
+
+
+def check_department_headcounts(chunk_size=RECONCILE_CHUNK_SIZE):
+    """Plantilla activa de cada departamento (absent_today se recalcula solo al leerlo)"""
+    counts = dict(
+        Employee.objects.filter(is_active=True, department__isnull=False)
+        .values_list('department_id').annotate(total=Count('pk')).order_by()
+    )
+    checked = 0
+    drifts = []
+    for pk, name, headcount in Department.objects.values_list('pk', 'name', 'headcount').order_by('pk').iterator(
+        chunk_size=chunk_size
+    ):
+        checked += 1
+        expected = counts.get(pk, 0)
+        if headcount != expected:
+            drifts.append(Drift(pk, name, {'headcount': (headcount, expected)}))
+    return checked, drifts
+
+
+FAMILIES = {
+    'vacations': (Vacation, check_vacations),
+    'progress': (Initiative, check_initiative_progress),
+    'operational': (OperationalTask, check_next_execution),
+    'initiative_priority': (Initiative, _check_priority_ranks(Initiative)),
+    'story_priority': (UserStory, _check_priority_ranks(UserStory)),
+    'departments': (Department, check_department_headcounts),
+    'initiative_attachments': (
+        Initiative, _check_attachment_counts(Initiative, 'initiative_id', user_story__isnull=True, task__isnull=True),
+    ),
+    'story_attachments': (
+        UserStory, _check_attachment_counts(UserStory, 'user_story_id', user_story__isnull=False, task__isnull=True),
+    ),
+    'task_attachments': (Task, _check_attachment_counts(Task, 'task_id', task__isnull=False)),
+}
+
+
+def apply_drifts(model, drifts, chunk_size=RECONCILE_CHUNK_SIZE):
+    """Escribe los valores esperados con un bulk_update por lote y campos modificados"""
+    for chunk in _chunks(drifts, chunk_size):
+        by_fields = defaultdict(list)
+        for drift in chunk:
+            by_fields[tuple(sorted(drift.changes))].append(
+                model(pk=drift.pk, **{field: expected for field, (_, expected) in drift.changes.items()})
+            )
+        with transaction.atomic():
+            for fields, objs in by_fields.items():
+                model.objects.bulk_update(objs, fields, batch_size=chunk_size)
+
+
+def reconcile(families=None, dry_run=False, chunk_size=RECONCILE_CHUNK_SIZE):
+    """Concilia las familias indicadas (todas por defecto); devuelve un FamilyReport por familia"""
+    reports = []
+    for name in families or FAMILIES:
+        model, check = FAMILIES[name]
+        checked, drifts = check(chunk_size=chunk_size)
+        if drifts and not dry_run:
+            apply_drifts(model, drifts, chunk_size=chunk_size)
+        reports.append(FamilyReport(name, checked, drifts, dry_run))
+    return reports
@@ -40,6 +40,8 @@ INSTALLED_APPS = [
     'django_htmx',
     'team',
     'initiatives',
+    'jobs',
+    'activity',
 ]
 
 MIDDLEWARE = [
@@ -51,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
+    'activity.middleware.ActivityActorMiddleware',
 ]
 
 ROOT_URLCONF = 'boss_core.urls'
@@ -65,6 +68,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'activity.context_processors.activity',
             ],
         },
     },
@@ -134,3 +138,38 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Tareas operativas: minutos de tolerancia para considerar una ejecución a tiempo
+OPERATIONAL_TASK_GRACE_MINUTES = 60
+
+# Vacaciones por antigüedad: (años de servicio mínimos, días). Por defecto la tabla
+# del artículo 76 de la LFT; descomentar para personalizar.
+# VACATION_ENTITLEMENT_TIERS = [(1, 12), (2, 14), (3, 16), (4, 18), (5, 20), (6, 22), (11, 24)]
+
+# Arrastre de vacaciones al año siguiente: tope de días (None = sin tope) y meses
+# del nuevo año para usarlos antes de que venzan (None = no vencen)
+VACATION_CARRYOVER_MAX_DAYS = 10
+VACATION_CARRYOVER_EXPIRY_MONTHS = 6
+
+# Horas laborables por día hábil para el cálculo de capacidad de los sprints
+WORKDAY_HOURS = 8
+
+# Cola de trabajos: con JOBS_EAGER = True los trabajos se ejecutan en línea sin
+# workers (por defecto en desarrollo); en producción se requiere run_workers
+JOBS_EAGER = DEBUG
+# Reintentos con backoff exponencial (segundos)
+JOBS_RETRY_BACKOFF_SECONDS = 30
+JOBS_RETRY_BACKOFF_MAX_SECONDS = 3600
+
+# Archivo: periodos (Q) recientes que archive_quarters conserva en las tablas de trabajo
+ARCHIVE_KEEP_QUARTERS = 4
+
+# Adjuntos: contenido guardado una vez por SHA-256 bajo ATTACHMENTS_ROOT
+ATTACHMENTS_ROOT = MEDIA_ROOT / 'attachments'
+ATTACHMENTS_MAX_BYTES = 100 * 1024 * 1024
+# Descarga delegada al servidor web: None (la sirve Django, con soporte de Range),
+# 'x-sendfile' (Apache mod_xsendfile, lighttpd), 'x-accel-redirect' (nginx; location
+# interna ATTACHMENTS_SENDFILE_URL apuntando a ATTACHMENTS_ROOT) o la ruta de una
+# función propia (attachment, path) -> HttpResponse
+ATTACHMENTS_SENDFILE = None
+ATTACHMENTS_SENDFILE_URL = '/protected-attachments/'
@@ -0,0 +1,100 @@
+"""
+Efectos secundarios diferidos para operaciones masivas.
+
+Guardar una ausencia, una tarea o una historia dispara recálculos (vacaciones
+del empleado, progreso de la iniciativa, ausentes del día por departamento).
+Dentro de `defer_side_effects()` esos ganchos solo anotan qué quedó
+pendiente; al salir del bloque cada clave se procesa una sola vez:
+
+    from boss_core.side_effects import defer_side_effects
+
+    with transaction.atomic(), defer_side_effects():
+        for absence in absences:
+            absence.save()      # ni consultas de vacaciones ni trabajos por fila
+    # al salir: un recálculo por (empleado, año)
+
+Los ganchos consultan `deferred()`: si hay un bloque activo registran la
+clave y regresan. Los bloques anidados se unen al exterior. Si el bloque
+termina con una excepción los pendientes se descartan.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_active = ContextVar('deferred_side_effects', default=None)
+
+
+class DeferredEffects:
+    """Claves pendientes acumuladas dentro de un bloque defer_side_effects()"""
+
+    def __init__(self):
+        # (employee_id, absence_type_id, año) de ausencias guardadas o eliminadas
+        self.absences = set()
+        self.initiatives = set()
+        # Historias con tareas modificadas; se resuelven a iniciativas al final
+        self.stories = set()
+        # Alguna ausencia del día cambió: vence el conteo de ausentes por departamento
+        self.absent_today = False
+        # Cambió alguna ausencia o empleado: nueva versión del mapa de calor
+        self.heatmap = False
+
+    def __bool__(self):
+        return bool(self.absences or self.initiatives or self.stories or self.absent_today or self.heatmap)
+
+    def flush(self):
+        """Ejecuta una vez cada efecto pendiente; se llama fuera del bloque"""
+        from django.db import transaction
+
+        from initiatives.models import UserStory, schedule_initiative_progress
+        from team.departments import mark_absent_today_stale
+        from team.entitlements import refresh_vacations
+        from team.heatmap import heatmap_changed
+        from team.models import AbsenceType
+
+        if self.absences:
+            vacation_type = AbsenceType.objects.filter(code='VAC').values_list('pk', flat=True).first()
+            pairs = {
+                (employee_id, year)
+                for employee_id, absence_type_id, year in self.absences
+                if absence_type_id == vacation_type
+            }
+            if pairs:
+                # Igual que las señales: al confirmar, para ver los datos guardados
+                transaction.on_commit(lambda: refresh_vacations(pairs))
+
+        initiatives = set(self.initiatives)
+        if self.stories:
+            initiatives.update(
+                UserStory.objects.filter(pk__in=self.stories, initiative__isnull=False)
+                .values_list('initiative_id', flat=True)
+            )
+        for initiative_id in initiatives:
+            schedule_initiative_progress(initiative_id)
+
+        if self.absent_today:
+            mark_absent_today_stale()
+
+        if self.heatmap:
+            transaction.on_commit(heatmap_changed)
+
+
+def deferred():
+    """Colector del bloque activo, o None si los efectos se ejecutan en el momento"""
+    return _active.get()
+
+
+@contextmanager
+def defer_side_effects():
+    """Suspende los recálculos por registro y los ejecuta una vez al salir del bloque"""
+    if _active.get() is not None:
+        yield _active.get()
+        return
+
+    effects = DeferredEffects()
+    token = _active.set(effects)
+    try:
+        yield effects
+    finally:
+        _active.reset(token)
+    if effects:
+        effects.flush()
@@ -0,0 +1,332 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from initiatives.models import Initiative, InitiativeType, OperationalTask, Quarter, Sprint, Task, UserStory
+from jobs.models import Job
+from team.models import Absence, AbsenceType, Department, Employee, Vacation
+
+from .admin_utils import EstimatedCountPaginator, estimated_table_count
+from .exports import export_response
+from .feeds import feed_etag, feed_token, read_feed_token
+from .reconcile import reconcile
+from .side_effects import deferred, defer_side_effects
+
+
+def make_employee(username='ana', **fields):
+    user = User.objects.create_user(username=username, password='x', first_name=username.title(), last_name='Prueba')
+    defaults = {
+        'employee_id': username.upper(),
+        'birth_date': date(1990, 1, 1),
+        'hire_date': date(2015, 3, 1),
+        'position': 'Analista',
+    }
+    defaults.update(fields)
+    return Employee.objects.create(user=user, **defaults)
+
+
+def streamed(response):
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.department = Department.objects.create(name='Tecnología')
+        self.ana = make_employee('ana', department=self.department)
+        self.absence = Absence.objects.create(
+            employee=self.ana, absence_type=AbsenceType.objects.create(name='Vacaciones', code='VAC'),
+            start_date=self.today + timedelta(days=3), end_date=self.today + timedelta(days=4),
+        )
+        self.url = reverse('calendar_feed', args=[feed_token('user', self.ana.user_id)])
+
+    def test_tokens_are_signed(self):
+        self.assertEqual(read_feed_token(feed_token('department', self.department.pk)), ('department', self.department.pk))
+        self.assertIsNone(read_feed_token(feed_token('user', 1) + 'x'))
+        self.assertIsNone(read_feed_token(feed_token('admin', 1)))
+        self.assertEqual(self.client.get(reverse('calendar_feed', args=['basura'])).status_code, 404)
+
+    def test_feed_lists_events_and_revalidates(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        text = streamed(response)
+        self.assertIn('Ana Prueba - Vacaciones', text)
+        self.assertIn('Cumpleaños de Ana Prueba', text)
+
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_etag_follows_the_data(self):
+        etag = feed_etag('user', self.ana.user_id)
+        self.assertEqual(feed_etag('user', self.ana.user_id), etag)
+
+        # Sin señales: el ETag sale de los datos, no de una versión en caché
+        Absence.objects.filter(pk=self.absence.pk).update(end_date=self.today + timedelta(days=5), updated_at=timezone.now())
+        changed = feed_etag('user', self.ana.user_id)
+        self.assertNotEqual(changed, etag)
+
+        quarter = Quarter.objects.create(year=self.today.year, quarter=(self.today.month - 1) // 3 + 1)
+        Sprint.objects.create(
+            name='Sprint 1', quarter=quarter, sprint_number=1, start_date=self.today, end_date=self.today + timedelta(days=13),
+        )
+        self.assertNotEqual(feed_etag('user', self.ana.user_id), changed)
+        changed = feed_etag('user', self.ana.user_id)
+
+        User.objects.filter(pk=self.ana.user_id).update(first_name='Anabel')
+        self.assertNotEqual(feed_etag('user', self.ana.user_id), changed)
+
+    def test_department_feed(self):
+        make_employee('beto', department=self.department)
+        url = reverse('calendar_feed', args=[feed_token('department', self.department.pk)])
+        self.assertIn('Cumpleaños de Beto Prueba', streamed(self.client.get(url)))
+
+        self.assertIsNone(feed_etag('department', 0))
+        self.assertEqual(self.client.get(reverse('calendar_feed', args=[feed_token('department', 0)])).status_code, 404)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.admin)
+        self.vacation = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        with self.captureOnCommitCallbacks(execute=True):
+            for username in ('ana', 'beto'):
+                employee = make_employee(username)
+                Absence.objects.create(employee=employee, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 3))
+
+    def test_paginator_caps_the_count(self):
+        class SmallPaginator(EstimatedCountPaginator):
+            count_limit = 1
+
+        self.assertEqual(SmallPaginator(Absence.objects.order_by('pk'), 10).count, 2)
+        self.assertEqual(EstimatedCountPaginator(Absence.objects.order_by('pk'), 10).count, 2)
+        self.assertIsNone(estimated_table_count(Absence.objects.filter(reason='x')))
+
+    def test_pages_beyond_a_capped_count_can_be_browsed(self):
+        class SmallPaginator(EstimatedCountPaginator):
+            count_limit = 0
+
+        paginator = SmallPaginator(Absence.objects.order_by('pk'), 1)
+        self.assertEqual(paginator.count, 1)
+        self.assertEqual(list(paginator.page(2).object_list), [Absence.objects.order_by('pk').last()])
+        self.assertFalse(paginator.page(3).object_list)
+        with self.assertRaises(EmptyPage):
+            paginator.page(0)
+        with self.assertRaises(EmptyPage):
+            EstimatedCountPaginator(Absence.objects.order_by('pk'), 1).page(3)
+
+    def test_changelists_render(self):
+        for name in ('initiatives_initiative', 'initiatives_userstory', 'initiatives_task', 'team_absence'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(f'admin:{name}_changelist')).status_code, 200)
+
+    def test_employee_input_filter(self):
+        response = self.client.get(reverse('admin:team_absence_changelist'), {'employee_q': 'beto prueba'})
+        self.assertEqual([absence.employee.employee_id for absence in response.context['cl'].result_list], ['BETO'])
+
+    def test_bulk_delete_recalculates_vacations_once_at_the_end(self):
+        self.assertEqual(list(Vacation.objects.values_list('days_taken', flat=True)), [2, 2])
+        absences = Absence.objects.all()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(reverse('admin:team_absence_changelist'), {
+                'action': 'delete_selected', 'post': 'yes',
+                '_selected_action': [str(pk) for pk in absences.values_list('pk', flat=True)],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Absence.objects.exists())
+        # Un recálculo de vacaciones y una versión nueva del mapa de calor
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(list(Vacation.objects.values_list('days_taken', flat=True)), [0, 0])
+
+
+class ExportTests(TestCase):
+    header = ['Nombre', 'Motivo', 'Días']
+    rows = [
+        ['Ana', '=HYPERLINK("http://example.com","clic")', 3],
+        ['Beto', 'Cita\x07 médica\x1b', -2],
+        ['@Carla', '+52 55 1234', 1],
+    ]
+
+    def test_csv_neutralizes_formulas(self):
+        text = streamed(export_response('csv', 'prueba', self.header, self.rows))
+        lines = list(csv.reader(io.StringIO(text.lstrip('\ufeff'))))
+        self.assertEqual(lines[0], self.header)
+        self.assertEqual(lines[1], ['Ana', '\'=HYPERLINK("http://example.com","clic")', '3'])
+        self.assertEqual(lines[2][2], '-2')
+        self.assertEqual(lines[3][:2], ["'@Carla", "'+52 55 1234"])
+
+    def test_xlsx_writes_text_cells_without_control_characters(self):
+        response = export_response('xlsx', 'prueba', self.header, self.rows)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = [[(cell.value, cell.data_type) for cell in row] for row in sheet.iter_rows(min_row=2)]
+
+        self.assertEqual(rows[0][1], ('=HYPERLINK("http://example.com","clic")', 's'))
+        self.assertEqual(rows[1][1], ('Cita médica', 's'))
+        self.assertEqual(rows[1][2], (-2, 'n'))
+        self.assertEqual(rows[2][0], ('@Carla', 's'))
+
+    def test_absence_export_with_user_text(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        Absence.objects.create(
+            employee=make_employee('ana'), absence_type=AbsenceType.objects.create(name='Vacaciones', code='VAC'),
+            start_date=date(2026, 3, 2), end_date=date(2026, 3, 3), reason='=1+1\x00',
+        )
+        response = self.client.get(reverse('team:absence_list'), {'export': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet.cell(row=2, column=9).value, '=1+1')
+        self.assertEqual(sheet.cell(row=2, column=9).data_type, 's')
+
+    def test_vacation_export_filename_uses_a_valid_year(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        current = f'vacaciones_{date.today().year}.csv'
+        for year, filename in [('2026', 'vacaciones_2026.csv'), ('-5', current), ('99999999', current), ('x', current)]:
+            with self.subTest(year=year):
+                response = self.client.get(reverse('team:vacation_summary'), {'year': year, 'export': 'csv'})
+                self.assertEqual(response['Content-Disposition'], f'attachment; filename="{filename}"')
+
+    def test_csv_filename_is_quoted(self):
+        response = export_response('csv', 'año "final"', self.header, [])
+        self.assertEqual(response['Content-Disposition'], "attachment; filename*=utf-8''a%C3%B1o%20%22final%22.csv")
+
+
+@override_settings(JOBS_EAGER=False)
+class DeferredEffectsTests(TestCase):
+    def setUp(self):
+        self.ana = make_employee('ana')
+        self.vacation = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        self.sick = AbsenceType.objects.create(name='Enfermedad', code='ENF')
+
+    def test_absences_refresh_vacations_once(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with defer_side_effects():
+                for day in (2, 9, 16):
+                    Absence.objects.create(
+                        employee=self.ana, absence_type=self.vacation,
+                        start_date=date(2026, 3, day), end_date=date(2026, 3, day + 1),
+                    )
+                Absence.objects.create(employee=self.ana, absence_type=self.sick, start_date=date(2026, 4, 6), end_date=date(2026, 4, 6))
+                self.assertEqual(callbacks, [])
+
+        # Un recálculo de vacaciones y una versión nueva del mapa de calor
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(Vacation.objects.get(employee=self.ana, year=2026).days_taken, 6)
+
+    def test_updated_absences_skip_the_previous_range_lookup(self):
+        absence = Absence.objects.create(employee=self.ana, absence_type=self.sick, start_date=date(2026, 4, 6), end_date=date(2026, 4, 6))
+        with self.captureOnCommitCallbacks(execute=True), defer_side_effects() as effects:
+            absence.reason = 'Consulta'
+            # El UPDATE y el evento de actividad; sin SELECT del rango anterior
+            with self.assertNumQueries(2):
+                absence.save()
+            self.assertTrue(effects.absent_today)
+
+    def test_tasks_enqueue_one_progress_job_per_initiative(self):
+        quarter = Quarter.objects.create(year=2026, quarter=1)
+        initiative = Initiative.objects.create(
+            title='Iniciativa', description='Descripción', owner=self.ana, quarter=quarter,
+            initiative_type=InitiativeType.objects.create(name='Operación', category='OPERATIONAL'),
+        )
+        story = UserStory.objects.create(initiative=initiative, title='Historia')
+        Job.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with defer_side_effects():
+                for n in range(3):
+                    Task.objects.create(user_story=story, title=f'Tarea {n}', status='DONE')
+
+        self.assertEqual(
+            list(Job.objects.values_list('name', 'payload')),
+            [('initiatives.update_initiative_progress', {'initiative_id': initiative.pk})],
+        )
+
+    def test_nested_blocks_join_the_outer_one(self):
+        with defer_side_effects() as outer:
+            with defer_side_effects() as inner:
+                self.assertIs(inner, outer)
+            self.assertIs(deferred(), outer)
+        self.assertIsNone(deferred())
+
+    def test_pending_effects_are_dropped_on_error(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(ValueError), defer_side_effects():
+                Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 3))
+                raise ValueError
+        self.assertEqual(callbacks, [])
+        self.assertIsNone(deferred())
+
+
+@override_settings(JOBS_EAGER=True)
+class ReconcileTests(TestCase):
+    def setUp(self):
+        self.ana = make_employee('ana')
+        vacation = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        with self.captureOnCommitCallbacks(execute=True):
+            Absence.objects.create(employee=self.ana, absence_type=vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 4))
+        self.vacation = Vacation.objects.get(employee=self.ana, year=2026)
+
+        self.initiative = Initiative.objects.create(
+            title='Iniciativa', description='Descripción', owner=self.ana,
+            quarter=Quarter.objects.create(year=2026, quarter=1),
+            initiative_type=InitiativeType.objects.create(name='Operación', category='OPERATIONAL'),
+        )
+        story = UserStory.objects.create(initiative=self.initiative, title='Historia')
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user_story=story, title='Hecha', status='DONE')
+            Task.objects.create(user_story=story, title='Pendiente')
+
+    def test_consistent_data_has_no_drift(self):
+        reports = reconcile(['vacations', 'progress'])
+        self.assertEqual([(report.checked, report.drifts) for report in reports], [(1, []), (1, [])])
+
+    def test_dry_run_reports_without_writing(self):
+        Vacation.objects.filter(pk=self.vacation.pk).update(days_taken=9, days_pending=0)
+        Initiative.objects.filter(pk=self.initiative.pk).update(progress=0)
+
+        vacations, progress = reconcile(['vacations', 'progress'], dry_run=True)
+        self.assertEqual(vacations.drifts[0].changes, {
+            'days_taken': (9, 3), 'days_pending': (0, self.vacation.days_entitled + self.vacation.days_carried_over - 3),
+        })
+        self.assertEqual(progress.drifts[0].changes, {'progress': (0, 50)})
+        self.assertEqual(Vacation.objects.get(pk=self.vacation.pk).days_taken, 9)
+
+        reconcile(['vacations', 'progress'], chunk_size=1)
+        self.assertEqual(Vacation.objects.get(pk=self.vacation.pk).days_taken, 3)
+        self.assertEqual(Initiative.objects.get(pk=self.initiative.pk).progress, 50)
+
+    def test_next_execution(self):
+        now = timezone.make_aware(datetime(2026, 3, 4, 12))
+        other = Initiative.objects.create(
+            title='Otra', description='Descripción', owner=self.ana,
+            quarter=self.initiative.quarter, initiative_type=self.initiative.initiative_type,
+        )
+        on_demand = OperationalTask.objects.create(initiative=self.initiative, frequency='ON_DEMAND')
+        weekly = OperationalTask.objects.create(initiative=other, frequency='WEEKLY', day_of_week=0, time_of_day=time(9))
+        OperationalTask.objects.filter(pk=on_demand.pk).update(next_execution=now)
+        OperationalTask.objects.filter(pk=weekly.pk).update(next_execution=None)
+
+        report, = reconcile(['operational'])
+        self.assertEqual(len(report.drifts), 2)
+        self.assertIsNone(OperationalTask.objects.get(pk=on_demand.pk).next_execution)
+        self.assertGreater(OperationalTask.objects.get(pk=weekly.pk).next_execution, timezone.now() - timedelta(days=1))
+
+    def test_command_writes_json_report(self):
+        Vacation.objects.filter(pk=self.vacation.pk).update(days_taken=9)
+        out = io.StringIO()
+        call_command('boss_reconcile', only=['vacations'], dry_run=True, report='-', stdout=out)
+
+        data = json.loads(out.getvalue())
+        self.assertTrue(data['dry_run'])
+        self.assertEqual(data['families']['vacations']['drifted'], 1)
+        self.assertEqual(data['families']['vacations']['corrected'], 0)
+        self.assertEqual(data['families']['vacations']['records'][0]['changes']['days_taken'], {'stored': 9, 'expected': 3})
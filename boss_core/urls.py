@@ -23,8 +23,11 @@ from . import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
+    path('calendar/', views.calendar_subscriptions, name='calendar_subscriptions'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     path('team/', include('team.urls')),
     path('initiatives/', include('initiatives.urls')),
+    path('activity/', include('activity.urls')),
     path('accounts/', include('django.contrib.auth.urls')),
 ]
 
@@ -1,8 +1,14 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import condition
 from datetime import date, timedelta
-from team.models import Employee, Absence, Birthday
-from initiatives.models import Initiative, Quarter, InitiativeUpdate
+from team.models import Department, Employee, Absence, Birthday
+from initiatives.models import Initiative, Quarter
+from activity.feed import feed_page
+from .feeds import feed_etag, feed_events, feed_token, read_feed_token
+from .ical import iter_calendar
 
 
 @login_required
@@ -43,10 +49,8 @@ def home(request):
     # Próximos cumpleaños (7 días)
     upcoming_birthdays = Birthday.get_upcoming_birthdays(days=7)[:5]
     
-    # Actualizaciones recientes
-    recent_updates = InitiativeUpdate.objects.select_related(
-        'initiative', 'created_by'
-    ).order_by('-created_at')[:5]
+    # Actividad reciente (actualizaciones, cambios de estado y ausencias)
+    recent_activity, _ = feed_page(limit=5)
     
     # Mis iniciativas (si es empleado)
     my_initiatives = []
@@ -61,8 +65,53 @@ def home(request):
         'active_quarter': active_quarter,
         'stats': stats,
         'upcoming_birthdays': upcoming_birthdays,
-        'recent_updates': recent_updates,
+        'recent_activity': recent_activity,
         'my_initiatives': my_initiatives,
     }
     
     return render(request, 'home.html', context)
+
+
+def _calendar_feed_etag(request, token):
+    scope = read_feed_token(token)
+    return feed_etag(*scope) if scope else None
+
+
+@condition(etag_func=_calendar_feed_etag)
+def calendar_feed(request, token):
+    """
+    Feed iCalendar de suscripción. No requiere sesión: el token firmado de la
+    URL determina el alcance. Si el ETag coincide se responde 304 sin generar el calendario.
+    """
+    scope = read_feed_token(token)
+    feed = feed_events(*scope) if scope else None
+    if feed is None:
+        raise Http404('Calendario no encontrado')
+    
+    name, events = feed
+    response = StreamingHttpResponse(iter_calendar(events, name), content_type='text/calendar; charset=utf-8')
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
+@login_required
+def calendar_subscriptions(request):
+    """URLs de suscripción a los calendarios del usuario y de cada departamento"""
+    def feed_url(scope, value):
+        path = reverse('calendar_feed', args=[feed_token(scope, value)])
+        return request.build_absolute_uri(path)
+    
+    try:
+        current_employee = request.user.employee_profile
+    except Employee.DoesNotExist:
+        current_employee = None
+    
+    departments = Department.objects.filter(headcount__gt=0)
+    
+    context = {
+        'current_employee': current_employee,
+        'personal_url': feed_url('user', request.user.pk) if current_employee else None,
+        'department_urls': [(department.name, feed_url('department', department.pk)) for department in departments],
+    }
+    
+    return render(request, 'calendar_subscriptions.html', context)
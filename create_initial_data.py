@@ -12,6 +12,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'boss_core.settings')
 django.setup()
 
 from django.contrib.auth.models import User
+from django.db import transaction
+from boss_core.side_effects import defer_side_effects
 from team.models import Employee, AbsenceType, Absence, Vacation
 from initiatives.models import Quarter, InitiativeType, Initiative, Sprint
 
@@ -105,7 +107,9 @@ def create_initial_data():
             user.set_password('password123')
             user.save()
         
-        employee_data = {k: emp_data[k] for k in ['employee_id', 'position', 'department', 'birth_date', 'hire_date']}
+        employee_data = {k: emp_data[k] for k in ['employee_id', 'position', 'birth_date', 'hire_date']}
+        # Employee.save() resuelve (o crea) el departamento por nombre
+        employee_data['department_name'] = emp_data['department']
         employee, _ = Employee.objects.get_or_create(
             user=user,
             defaults=employee_data
@@ -213,4 +217,6 @@ def create_initial_data():
     print("- Usuarios de ejemplo: jperez, mgarcia, clopez, amartinez (contraseña: password123)")
 
 if __name__ == '__main__':
-    create_initial_data()
+    # Un recálculo por empleado e iniciativa al final, no uno por registro
+    with transaction.atomic(), defer_side_effects():
+        create_initial_data()
@@ -1,14 +1,26 @@
 from django.contrib import admin
+
+from boss_core.admin_utils import EmployeeInputFilter, EstimatedCountPaginator
+from boss_core.dependencies import count_subquery
 from .models import (
     Quarter, InitiativeType, Initiative, OperationalTask, 
-    Sprint, InitiativeUpdate, InitiativeMetric, UserStory, Task
+    Sprint, InitiativeUpdate, InitiativeMetric, UserStory, Task,
+    OperationalTaskExecution, OperationalTaskCompliance, OperationalOwnerCompliance,
+    ArchivedRecord, Attachment, AttachmentBlob
 )
 
 
+@admin.display(description='Prioridad', ordering='priority_rank')
+def priority_label(obj):
+    # Ordena la columna por rango y no alfabéticamente por código
+    return obj.get_priority_display()
+
+
 @admin.register(Quarter)
 class QuarterAdmin(admin.ModelAdmin):
-    list_display = ['__str__', 'start_date', 'end_date', 'is_active']
-    list_filter = ['year', 'is_active']
+    list_display = ['__str__', 'start_date', 'end_date', 'is_active', 'is_archived']
+    list_filter = ['year', 'is_active', 'is_archived']
+    readonly_fields = ['is_archived', 'archived_at']
     ordering = ['-year', '-quarter']
 
 
@@ -21,12 +33,13 @@ class InitiativeTypeAdmin(admin.ModelAdmin):
 
 @admin.register(Initiative)
 class InitiativeAdmin(admin.ModelAdmin):
-    list_display = ['title', 'owner', 'initiative_type', 'quarter', 'status', 'priority', 'progress']
+    list_display = ['title', 'owner', 'initiative_type', 'quarter', 'status', priority_label, 'progress']
     list_filter = ['status', 'priority', 'initiative_type', 'quarter', 'is_operational']
     search_fields = ['title', 'description', 'owner__user__first_name', 'owner__user__last_name']
     date_hierarchy = 'created_at'
-    ordering = ['-priority', '-created_at']
-    filter_horizontal = ['collaborators']
+    ordering = ['-priority_rank', '-created_at']
+    list_select_related = ['owner__user', 'initiative_type', 'quarter']
+    autocomplete_fields = ['owner', 'collaborators']
     
     fieldsets = (
         ('Información General', {
@@ -49,6 +62,7 @@ class OperationalTaskAdmin(admin.ModelAdmin):
     list_display = ['initiative', 'frequency', 'last_execution', 'next_execution']
     list_filter = ['frequency']
     search_fields = ['initiative__title']
+    list_select_related = ['initiative__owner__user']
     
     fieldsets = (
         ('Iniciativa', {
@@ -63,6 +77,30 @@ class OperationalTaskAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(OperationalTaskExecution)
+class OperationalTaskExecutionAdmin(admin.ModelAdmin):
+    list_display = ['task', 'owner', 'scheduled_for', 'executed_at', 'status', 'delay_minutes', 'duration_hours']
+    list_filter = ['status', 'is_on_time']
+    search_fields = ['task__initiative__title']
+    date_hierarchy = 'scheduled_for'
+    list_select_related = ['task__initiative', 'owner__user']
+    readonly_fields = ['task', 'owner', 'scheduled_for', 'executed_at', 'executed_by', 'delay_minutes', 'is_on_time', 'status']
+
+
+@admin.register(OperationalTaskCompliance)
+class OperationalTaskComplianceAdmin(admin.ModelAdmin):
+    list_display = ['task', 'total_runs', 'on_time_runs', 'late_runs', 'missed_runs', 'on_time_percentage']
+    search_fields = ['task__initiative__title']
+    list_select_related = ['task__initiative']
+
+
+@admin.register(OperationalOwnerCompliance)
+class OperationalOwnerComplianceAdmin(admin.ModelAdmin):
+    list_display = ['owner', 'total_runs', 'on_time_runs', 'late_runs', 'missed_runs', 'on_time_percentage']
+    search_fields = ['owner__user__first_name', 'owner__user__last_name']
+    list_select_related = ['owner__user']
+
+
 @admin.register(Sprint)
 class SprintAdmin(admin.ModelAdmin):
     list_display = ['name', 'quarter', 'sprint_number', 'start_date', 'end_date', 'is_active']
@@ -79,6 +117,8 @@ class InitiativeUpdateAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description', 'initiative__title']
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    list_select_related = ['initiative__owner__user', 'created_by']
+    autocomplete_fields = ['initiative']
     
     fieldsets = (
         ('Información General', {
@@ -108,15 +148,23 @@ class InitiativeMetricAdmin(admin.ModelAdmin):
     search_fields = ['metric_name', 'initiative__title']
     date_hierarchy = 'measured_at'
     ordering = ['initiative', 'metric_name']
+    list_select_related = ['initiative__owner__user']
+    autocomplete_fields = ['initiative']
 
 
 @admin.register(UserStory)
 class UserStoryAdmin(admin.ModelAdmin):
-    list_display = ['__str__', 'initiative', 'status', 'priority', 'story_points', 'assignee', 'sprint', 'progress_percentage']
-    list_filter = ['status', 'priority', 'story_points', 'initiative__quarter', 'sprint']
+    list_display = ['__str__', 'initiative', 'status', priority_label, 'story_points', 'assignee', 'sprint', 'progress']
+    list_filter = [
+        'status', 'priority', 'story_points', 'initiative__quarter', 'sprint',
+        EmployeeInputFilter.for_field('assignee', 'Asignado a'), 'created_at',
+    ]
     search_fields = ['title', 'description', 'initiative__title', 'assignee__user__first_name', 'assignee__user__last_name']
-    date_hierarchy = 'created_at'
-    ordering = ['-priority', '-created_at']
+    ordering = ['-priority_rank', '-created_at']
+    list_select_related = ['initiative__owner__user', 'assignee__user', 'sprint__quarter']
+    autocomplete_fields = ['initiative', 'assignee', 'sprint']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Información General', {
@@ -132,15 +180,36 @@ class UserStoryAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['started_at', 'completed_at']
+    
+    def get_queryset(self, request):
+        # El progreso sale de dos subconsultas en lugar de dos COUNT por fila
+        tasks = Task.objects.all()
+        return super().get_queryset(request).annotate(
+            total_tasks=count_subquery(tasks, 'user_story'),
+            done_tasks=count_subquery(tasks.filter(status='DONE'), 'user_story'),
+        )
+    
+    @admin.display(description='Progreso')
+    def progress(self, obj):
+        # Mismo cálculo que UserStory.progress_percentage
+        if obj.total_tasks == 0:
+            return 0 if obj.status != 'DONE' else 100
+        return round((obj.done_tasks / obj.total_tasks) * 100, 2)
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ['__str__', 'user_story', 'task_type', 'status', 'assignee', 'estimated_hours', 'actual_hours']
-    list_filter = ['task_type', 'status', 'user_story__initiative__quarter']
+    list_filter = [
+        'task_type', 'status', 'user_story__initiative__quarter',
+        EmployeeInputFilter.for_field('assignee', 'Asignado a'), 'created_at',
+    ]
     search_fields = ['title', 'description', 'user_story__title', 'assignee__user__first_name', 'assignee__user__last_name']
-    date_hierarchy = 'created_at'
     ordering = ['status', '-created_at']
+    list_select_related = ['user_story', 'assignee__user']
+    autocomplete_fields = ['user_story', 'assignee']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Información General', {
@@ -158,4 +227,57 @@ class TaskAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['started_at', 'completed_at']
\ No newline at end of file
+    readonly_fields = ['started_at', 'completed_at']
+
+
+@admin.register(ArchivedRecord)
+class ArchivedRecordAdmin(admin.ModelAdmin):
+    """Solo lectura: el archivo se modifica con archive_quarters y restore_quarter"""
+    list_display = ['label', 'model', 'object_id', 'initiative_id', 'quarter', 'archived_at']
+    list_filter = ['model', 'quarter']
+    search_fields = ['label']
+    list_select_related = ['quarter']
+    readonly_fields = ['quarter', 'model', 'object_id', 'initiative_id', 'label', 'data', 'archived_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Attachment)
+class AttachmentAdmin(admin.ModelAdmin):
+    """Los adjuntos se suben desde el detalle de cada registro; aquí solo se renombran o eliminan"""
+    list_display = ['filename', 'initiative', 'user_story', 'task', 'content_type', 'uploaded_by', 'created_at']
+    search_fields = ['filename', 'initiative__title', 'blob__sha256']
+    date_hierarchy = 'created_at'
+    list_select_related = ['initiative', 'user_story', 'task', 'uploaded_by']
+    readonly_fields = ['blob', 'initiative', 'user_story', 'task', 'content_type', 'uploaded_by', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AttachmentBlob)
+class AttachmentBlobAdmin(admin.ModelAdmin):
+    """Solo lectura: los contenidos sin adjuntos se eliminan con purge_attachments"""
+    list_display = ['sha256', 'size', 'attachments_total', 'created_at', 'updated_at']
+    search_fields = ['sha256']
+    readonly_fields = ['sha256', 'size', 'created_at', 'updated_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(attachments_total=count_subquery(Attachment.objects.all(), 'blob'))
+    
+    @admin.display(description='Adjuntos', ordering='attachments_total')
+    def attachments_total(self, obj):
+        return obj.attachments_total
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,332 @@
+"""
+Archivo de periodos cerrados.
+
+Las iniciativas de un Q cerrado, junto con sus historias, tareas,
+actualizaciones, métricas y adjuntos, se copian a `ArchivedRecord` (un renglón JSON por
+registro) y se eliminan de las tablas de trabajo, que así conservan solo los
+últimos periodos. Cada lote de iniciativas se mueve en una transacción, de modo
+que un registro está en la tabla de trabajo o en el archivo, nunca en ambos.
+
+Las iniciativas operativas (con tarea recurrente) no se archivan: su
+calendario de ejecuciones sigue vigente aunque el Q haya terminado.
+
+La restauración reinserta los registros con sus IDs originales.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from team.models import Employee
+
+from .models import (
+    ArchivedRecord, Attachment, AttachmentBlob, Initiative, InitiativeMetric, InitiativeType, InitiativeUpdate,
+    Quarter, Sprint, Task, UserStory, priority_rank,
+)
+
+
+# Orden de restauración: los padres antes que los hijos
+ARCHIVE_MODELS = {
+    'initiative': Initiative,
+    'initiativeupdate': InitiativeUpdate,
+    'initiativemetric': InitiativeMetric,
+    'userstory': UserStory,
+    'task': Task,
+    # Solo la fila: el contenido queda en disco y purge_attachments no lo borra
+    'attachment': Attachment,
+}
+
+# Referencias que deben existir para restaurar; las opcionales se dejan en nulo
+REQUIRED_REFERENCES = {
+    'initiative': {'owner_id': Employee, 'initiative_type_id': InitiativeType},
+    'initiativeupdate': {'created_by_id': User},
+    'attachment': {'blob_id': AttachmentBlob},
+}
+OPTIONAL_REFERENCES = {
+    'userstory': {'assignee_id': Employee, 'sprint_id': Sprint},
+    'task': {'assignee_id': Employee},
+    'attachment': {'uploaded_by_id': User},
+}
+
+COLLABORATORS_KEY = '_collaborators'
+
+
+class ArchiveError(Exception):
+    """El periodo no puede archivarse o restaurarse"""
+
+
+class ArchiveResult(NamedTuple):
+    quarter: Quarter
+    counts: dict
+
+
+def archivable_quarters(keep=None, today=None):
+    """
+    Periodos cerrados que aún no se archivan, excluyendo los `keep` más
+    recientes (por defecto ARCHIVE_KEEP_QUARTERS) para conservar a mano el
+    historial inmediato.
+    """
+    today = today or date.today()
+    if keep is None:
+        keep = getattr(settings, 'ARCHIVE_KEEP_QUARTERS', 4)
+
+    recent = list(Quarter.objects.order_by('-year', '-quarter').values_list('pk', flat=True)[:keep])
+    return Quarter.objects.filter(
+        is_archived=False, is_active=False, end_date__lt=today
+    ).exclude(pk__in=recent).order_by('year', 'quarter')
+
+
+def _values(model, queryset):
+    return list(queryset.values(*[field.attname for field in model._meta.concrete_fields]))
+
+
+def _id_chunks(values_queryset, chunk_size):
+    """Recorre una lista plana de IDs por lotes usando paginación por clave"""
+    last_id = 0
+    while True:
+        chunk = list(values_queryset.filter(pk__gt=last_id).order_by('pk')[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def _label(data):
+    return (data.get('title') or data.get('metric_name') or data.get('filename') or '')[:200]
+
+
+def archive_quarter(quarter, chunk_size=200, dry_run=False, today=None, stdout=None):
+    """
+    Mueve al archivo las iniciativas no operativas de `quarter` y todo lo que
+    cuelga de ellas. Devuelve un ArchiveResult con los registros movidos por
+    modelo; con `dry_run` solo cuenta.
+    """
+    today = today or date.today()
+    if quarter.is_active:
+        raise ArchiveError(f'{quarter} es el periodo activo y no puede archivarse.')
+    if quarter.end_date >= today:
+        raise ArchiveError(f'{quarter} no ha terminado (cierra el {quarter.end_date:%d/%m/%Y}).')
+
+    initiative_ids = Initiative.objects.filter(
+        quarter=quarter, operational_details__isnull=True
+    ).values_list('pk', flat=True)
+    collaborators = Initiative.collaborators.through.objects
+
+    counts = dict.fromkeys(ARCHIVE_MODELS, 0)
+    for chunk in _id_chunks(initiative_ids, chunk_size):
+        rows = {
+            'initiative': _values(Initiative, Initiative.objects.filter(pk__in=chunk)),
+            'initiativeupdate': _values(InitiativeUpdate, InitiativeUpdate.objects.filter(initiative_id__in=chunk)),
+            'initiativemetric': _values(InitiativeMetric, InitiativeMetric.objects.filter(initiative_id__in=chunk)),
+            'userstory': _values(UserStory, UserStory.objects.filter(initiative_id__in=chunk)),
+            'task': _values(Task, Task.objects.filter(user_story__initiative_id__in=chunk)),
+            'attachment': _values(Attachment, Attachment.objects.filter(initiative_id__in=chunk)),
+        }
+        for key, model_rows in rows.items():
+            counts[key] += len(model_rows)
+        if dry_run:
+            continue
+
+        members = defaultdict(list)
+        for initiative_id, employee_id in collaborators.filter(
+            initiative_id__in=chunk
+        ).values_list('initiative_id', 'employee_id'):
+            members[initiative_id].append(employee_id)
+        for data in rows['initiative']:
+            data[COLLABORATORS_KEY] = members.get(data['id'], [])
+
+        story_initiative = {data['id']: data['initiative_id'] for data in rows['userstory']}
+        records = []
+        for key, model_rows in rows.items():
+            for data in model_rows:
+                if key == 'initiative':
+                    initiative_id = data['id']
+                elif key == 'task':
+                    initiative_id = story_initiative[data['user_story_id']]
+                else:
+                    initiative_id = data['initiative_id']
+                records.append(ArchivedRecord(
+                    quarter=quarter, model=key, object_id=data['id'],
+                    initiative_id=initiative_id, label=_label(data), data=data,
+                ))
+
+        with transaction.atomic():
+            ArchivedRecord.objects.bulk_create(records, batch_size=500)
+            # Las historias, tareas, actualizaciones y métricas se eliminan en cascada
+            Initiative.objects.filter(pk__in=chunk).delete()
+
+        if stdout:
+            stdout.write(f'  {counts["initiative"]} iniciativa(s) archivada(s)...')
+
+    if not dry_run:
+        Quarter.objects.filter(pk=quarter.pk).update(is_archived=True, archived_at=timezone.now())
+    return ArchiveResult(quarter, counts)
+
+
+def _build(model, data):
+    """Reconstruye una instancia a partir de su copia JSON"""
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.attname in data:
+            values[field.attname] = field.to_python(data[field.attname])
+    obj = model(**values)
+    if 'priority' in values:
+        # bulk_create no pasa por save(); las copias anteriores no traen el rango
+        obj.priority_rank = priority_rank(obj.priority)
+    return obj
+
+
+def _existing_ids(references):
+    return {
+        attname: set(related.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        for attname, (related, ids) in references.items()
+    }
+
+
+def _missing_references(records):
+    """Referencias obligatorias del archivo que ya no existen en las tablas de trabajo"""
+    wanted = defaultdict(lambda: defaultdict(set))
+    for key, data in records.filter(model__in=REQUIRED_REFERENCES).values_list('model', 'data').iterator():
+        for attname in REQUIRED_REFERENCES[key]:
+            wanted[key][attname].add(data[attname])
+
+    missing = []
+    for key, attnames in wanted.items():
+        for attname, ids in attnames.items():
+            related = REQUIRED_REFERENCES[key][attname]
+            found = set(related.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            for pk in sorted(ids - found):
+                missing.append(f'{related._meta.verbose_name} #{pk}')
+    return missing
+
+
+def restore_quarter(quarter, chunk_size=200, dry_run=False, stdout=None):
+    """
+    Devuelve a las tablas de trabajo todo lo archivado de `quarter`. Las
+    referencias opcionales que ya no existen (sprint, asignado) quedan vacías;
+    si falta una obligatoria (responsable, tipo, autor) no se restaura nada.
+    """
+    records = ArchivedRecord.objects.filter(quarter=quarter)
+    missing = _missing_references(records)
+    if missing:
+        raise ArchiveError(
+            f'No se puede restaurar {quarter}; ya no existen: {", ".join(missing[:10])}'
+            + ('...' if len(missing) > 10 else '')
+        )
+
+    initiative_ids = records.filter(model='initiative').values_list('object_id', flat=True)
+    collaborators = Initiative.collaborators.through
+
+    counts = dict.fromkeys(ARCHIVE_MODELS, 0)
+    last_id = 0
+    while True:
+        chunk = list(initiative_ids.filter(object_id__gt=last_id).order_by('object_id')[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1]
+
+        grouped = defaultdict(list)
+        for key, data in records.filter(initiative_id__in=chunk).values_list('model', 'data'):
+            grouped[key].append(data)
+        for key, model_rows in grouped.items():
+            counts[key] += len(model_rows)
+        if dry_run:
+            continue
+
+        with transaction.atomic():
+            for key, model in ARCHIVE_MODELS.items():
+                model_rows = grouped.get(key, [])
+                if not model_rows:
+                    continue
+                optional = OPTIONAL_REFERENCES.get(key, {})
+                existing = _existing_ids({
+                    attname: (related, {data[attname] for data in model_rows if data.get(attname)})
+                    for attname, related in optional.items()
+                })
+                for data in model_rows:
+                    for attname in optional:
+                        if data.get(attname) not in existing[attname]:
+                            data[attname] = None
+
+                objs = [_build(model, data) for data in model_rows]
+                model.objects.bulk_create(objs, batch_size=500)
+                # bulk_create sella auto_now/auto_now_add con la hora actual
+                stamped = [
+                    field.name for field in model._meta.concrete_fields
+                    if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+                ]
+                if stamped:
+                    for obj, data in zip(objs, model_rows):
+                        for name in stamped:
+                            setattr(obj, name, model._meta.get_field(name).to_python(data[name]))
+                    model.objects.bulk_update(objs, stamped, batch_size=500)
+
+            active_employees = set(Employee.objects.filter(
+                pk__in={pk for data in grouped['initiative'] for pk in data.get(COLLABORATORS_KEY, [])}
+            ).values_list('pk', flat=True))
+            collaborators.objects.bulk_create([
+                collaborators(initiative_id=data['id'], employee_id=employee_id)
+                for data in grouped['initiative']
+                for employee_id in data.get(COLLABORATORS_KEY, [])
+                if employee_id in active_employees
+            ], batch_size=500)
+
+            records.filter(initiative_id__in=chunk).delete()
+
+        if stdout:
+            stdout.write(f'  {counts["initiative"]} iniciativa(s) restaurada(s)...')
+
+    if not dry_run:
+        Quarter.objects.filter(pk=quarter.pk).update(is_archived=False, archived_at=None)
+    return ArchiveResult(quarter, counts)
+
+
+def archive_overview():
+    """Registros archivados por periodo y modelo, en una sola consulta"""
+    annotations = {
+        f'{key}_count': Count('archived_records', filter=Q(archived_records__model=key))
+        for key in ARCHIVE_MODELS
+    }
+    return Quarter.objects.filter(is_archived=True).annotate(**annotations).order_by('-year', '-quarter')
+
+
+def archived_initiatives(quarter):
+    """Iniciativas archivadas de un periodo con el número de registros hijos"""
+    children = dict(
+        ArchivedRecord.objects.filter(quarter=quarter).exclude(model='initiative')
+        .values_list('initiative_id').annotate(total=Count('pk')).order_by()
+    )
+    initiatives = ArchivedRecord.objects.filter(quarter=quarter, model='initiative').order_by('label', 'object_id')
+    return initiatives, children
+
+
+def archived_initiative(quarter, initiative_id):
+    """Copia archivada de una iniciativa agrupada por modelo, o None si no existe"""
+    grouped = defaultdict(list)
+    for key, data in ArchivedRecord.objects.filter(
+        quarter=quarter, initiative_id=initiative_id
+    ).order_by('object_id').values_list('model', 'data'):
+        grouped[key].append(data)
+    if not grouped.get('initiative'):
+        return None
+    return grouped
+
+
+def with_display(key, data):
+    """
+    Convierte los valores JSON a sus tipos (fechas, decimales) y agrega
+    `<campo>_display` a los campos con opciones para mostrarlos en plantillas
+    """
+    model = ARCHIVE_MODELS[key]
+    for field in model._meta.concrete_fields:
+        if field.attname not in data:
+            continue
+        data[field.attname] = field.to_python(data[field.attname])
+        if field.choices:
+            data[f'{field.attname}_display'] = dict(field.flatchoices).get(data[field.attname], data[field.attname])
+    return data
@@ -0,0 +1,470 @@
+"""
+Adjuntos de iniciativas, historias y tareas.
+
+El contenido se guarda una sola vez por su SHA-256 (AttachmentBlob) en
+ATTACHMENTS_ROOT/blobs/<ab>/<hash>; cada Attachment solo guarda el nombre, el
+destino y la referencia al contenido. Subir el mismo archivo muchas veces no
+ocupa más espacio.
+
+Subidas:
+
+- Formulario (multipart): Django ya escribe a disco por partes los archivos
+  grandes; save_uploaded_file() los copia calculando el hash en la misma pasada.
+- Por partes, reanudable: start_upload() crea una AttachmentUpload y
+  append_chunk() agrega cada parte en orden (Content-Range). Al recibir el
+  último byte se calcula el hash y se crea el adjunto. Si el cliente envía el
+  SHA-256 y ese contenido ya existe, el adjunto se crea sin transferir nada;
+  si no existe, al terminar se rechaza el archivo que no coincida con él.
+
+Descargas: attachment_response() transmite el archivo con soporte de Range o,
+con ATTACHMENTS_SENDFILE, delega el envío al servidor web.
+
+Las señales ajustan attachment_count del registro dueño; purge_attachments()
+elimina los contenidos sin adjuntos y las subidas abandonadas.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.utils.module_loading import import_string
+
+from .models import ArchivedRecord, Attachment, AttachmentBlob, AttachmentUpload, Initiative, Task, UserStory
+
+
+READ_CHUNK_SIZE = 64 * 1024
+# Tamaño de parte sugerido al cliente y máximo aceptado por petición
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+UPLOAD_CHUNK_MAX_BYTES = 16 * 1024 * 1024
+UPLOAD_EXPIRY = timedelta(hours=24)
+BLOB_GRACE = timedelta(hours=1)
+CACHE_SECONDS = 365 * 24 * 3600
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class AttachmentError(Exception):
+    """Subida o adjunto inválido; el mensaje se muestra al usuario"""
+
+
+class ChunkOffsetError(AttachmentError):
+    """La parte no empieza donde terminó la anterior; `received` indica dónde continuar"""
+    def __init__(self, received):
+        super().__init__(f'La parte debe empezar en el byte {received}.')
+        self.received = received
+
+
+class Target(NamedTuple):
+    """Registro dueño del adjunto: la iniciativa y, si aplica, la historia y la tarea"""
+    initiative_id: int
+    user_story_id: Optional[int] = None
+    task_id: Optional[int] = None
+
+
+class PurgeResult(NamedTuple):
+    uploads: int
+    blobs: int
+    bytes: int
+
+
+def attachments_root():
+    return Path(getattr(settings, 'ATTACHMENTS_ROOT', Path(settings.MEDIA_ROOT) / 'attachments'))
+
+
+def max_bytes():
+    return getattr(settings, 'ATTACHMENTS_MAX_BYTES', 100 * 1024 * 1024)
+
+
+def blob_relative_path(sha256):
+    return f'blobs/{sha256[:2]}/{sha256}'
+
+
+def blob_path(sha256):
+    return attachments_root() / blob_relative_path(sha256)
+
+
+def upload_path(upload_id):
+    return attachments_root() / 'uploads' / f'{upload_id}.part'
+
+
+def _id(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        raise AttachmentError('Identificador inválido.')
+
+
+def resolve_target(initiative=None, user_story=None, task=None):
+    """Target a partir del registro más específico indicado (IDs de iniciativa, historia o tarea)"""
+    task, user_story, initiative = _id(task), _id(user_story), _id(initiative)
+    if task:
+        row = Task.objects.filter(pk=task).values_list('user_story__initiative_id', 'user_story_id').first()
+        if row is None:
+            raise AttachmentError('La tarea no existe.')
+        return Target(row[0], row[1], task)
+    if user_story:
+        initiative_id = UserStory.objects.filter(pk=user_story).values_list('initiative_id', flat=True).first()
+        if initiative_id is None:
+            raise AttachmentError('La historia de usuario no existe.')
+        return Target(initiative_id, user_story)
+    if initiative and Initiative.objects.filter(pk=initiative).exists():
+        return Target(initiative)
+    raise AttachmentError('La iniciativa no existe.')
+
+
+def clean_filename(name):
+    """Nombre sin rutas (algunos navegadores envían la ruta completa)"""
+    name = os.path.basename(str(name or '').replace('\\', '/')).strip()
+    return name[:255] or 'archivo'
+
+
+def guess_content_type(filename, declared=None):
+    content_type = (declared or '').split(';')[0].strip()
+    if not content_type or content_type == 'application/octet-stream':
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return content_type[:100]
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _touch(blob):
+    AttachmentBlob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+
+
+def _store_blob(temp_path, sha256, size):
+    """
+    Mueve el archivo temporal a su ruta por hash (o lo descarta si ya existe) y
+    devuelve su AttachmentBlob. Se llama dentro de una transacción: la fila
+    queda bloqueada hasta confirmar, así purge_attachments() no puede borrarla
+    entre tanto, y si un purgado anterior quitó el archivo se vuelve a escribir.
+    """
+    blob, created = AttachmentBlob.objects.select_for_update().get_or_create(sha256=sha256, defaults={'size': size})
+    final = blob_path(sha256)
+    if final.exists():
+        temp_path.unlink(missing_ok=True)
+    else:
+        final.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, final)
+    if not created:
+        _touch(blob)
+    return blob
+
+
+def create_attachment(target, blob, filename, content_type, user):
+    return Attachment.objects.create(
+        blob=blob,
+        initiative_id=target.initiative_id,
+        user_story_id=target.user_story_id,
+        task_id=target.task_id,
+        filename=clean_filename(filename),
+        content_type=guess_content_type(filename, content_type),
+        uploaded_by=user,
+    )
+
+
+def save_uploaded_file(uploaded, target, user):
+    """Adjunto a partir de un archivo de formulario (UploadedFile)"""
+    if uploaded.size > max_bytes():
+        raise AttachmentError(f'{uploaded.name}: supera el máximo de {max_bytes() // (1024 * 1024)} MB.')
+
+    temp_path = attachments_root() / 'uploads' / f'{uuid.uuid4()}.part'
+    temp_path.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, 'wb') as out:
+            for chunk in uploaded.chunks(READ_CHUNK_SIZE):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        with transaction.atomic():
+            blob = _store_blob(temp_path, digest.hexdigest(), size)
+            return create_attachment(target, blob, uploaded.name, uploaded.content_type, user)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def start_upload(target, filename, size, content_type, user, sha256=None):
+    """
+    Inicia una subida por partes. Devuelve (AttachmentUpload, None), o
+    (None, Attachment) si el contenido ya existía o el archivo está vacío.
+    """
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise AttachmentError('Tamaño inválido.')
+    if size < 0 or size > max_bytes():
+        raise AttachmentError(f'El archivo supera el máximo de {max_bytes() // (1024 * 1024)} MB.')
+
+    sha256 = str(sha256 or '').strip().lower()
+    if sha256 and not SHA256_RE.match(sha256):
+        raise AttachmentError('SHA-256 inválido.')
+    if sha256:
+        # Todos los usuarios con sesión ven todos los adjuntos: conocer el hash no da acceso a nada nuevo
+        with transaction.atomic():
+            # Bloqueada para que purge_attachments() no la borre antes de enlazarla
+            blob = AttachmentBlob.objects.select_for_update().filter(sha256=sha256, size=size).first()
+            if blob and blob_path(blob.sha256).exists():
+                _touch(blob)
+                return None, create_attachment(target, blob, filename, content_type, user)
+
+    upload = AttachmentUpload.objects.create(
+        initiative_id=target.initiative_id,
+        user_story_id=target.user_story_id,
+        task_id=target.task_id,
+        filename=clean_filename(filename),
+        content_type=guess_content_type(filename, content_type),
+        size=size,
+        sha256=sha256,
+        uploaded_by=user,
+    )
+    path = upload_path(upload.pk)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    if size == 0:
+        return None, finish_upload(upload)
+    return upload, None
+
+
+def parse_content_range(header):
+    """(inicio, fin, total) de un encabezado Content-Range de subida"""
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        raise AttachmentError('Falta el encabezado Content-Range (bytes inicio-fin/total).')
+    start, end, total = map(int, match.groups())
+    if end < start:
+        raise AttachmentError('Content-Range inválido.')
+    return start, end, total
+
+
+def append_chunk(upload, start, length, stream):
+    """
+    Escribe `length` bytes de `stream` en la posición `start`, que debe ser
+    donde terminó la parte anterior (si una parte se corta, el cliente la
+    reenvía). Devuelve el Attachment al completar el archivo, o None.
+    """
+    if start != upload.received:
+        raise ChunkOffsetError(upload.received)
+    if length > UPLOAD_CHUNK_MAX_BYTES:
+        raise AttachmentError(f'Cada parte puede tener como máximo {UPLOAD_CHUNK_MAX_BYTES // (1024 * 1024)} MB.')
+    if start + length > upload.size:
+        raise AttachmentError('La parte excede el tamaño declarado del archivo.')
+
+    path = upload_path(upload.pk)
+    written = 0
+    with open(path, 'r+b') as out:
+        out.seek(start)
+        out.truncate(start)
+        while written < length:
+            data = stream.read(min(READ_CHUNK_SIZE, length - written))
+            if not data:
+                break
+            out.write(data)
+            written += len(data)
+        if written != length:
+            out.truncate(start)
+            raise AttachmentError('La parte llegó incompleta; reenvíela.')
+
+    updated = AttachmentUpload.objects.filter(pk=upload.pk, received=start).update(
+        received=start + length, updated_at=timezone.now()
+    )
+    if not updated:
+        raise ChunkOffsetError(AttachmentUpload.objects.filter(pk=upload.pk).values_list('received', flat=True).first() or 0)
+    upload.received = start + length
+    if upload.received == upload.size:
+        return finish_upload(upload)
+    return None
+
+
+def finish_upload(upload):
+    """
+    Convierte la subida completa en adjunto. Si el cliente declaró el SHA-256
+    y el contenido recibido no coincide, la subida se descarta.
+    """
+    path = upload_path(upload.pk)
+    sha256 = _hash_file(path)
+    if upload.sha256 and sha256 != upload.sha256:
+        upload.delete()
+        path.unlink(missing_ok=True)
+        raise AttachmentError('El archivo recibido no coincide con el SHA-256 declarado; vuelva a subirlo.')
+    # La tarea o la historia pudo cambiar de dueño durante la subida
+    target = resolve_target(upload.initiative_id, upload.user_story_id, upload.task_id)
+    with transaction.atomic():
+        blob = _store_blob(path, sha256, upload.size)
+        attachment = create_attachment(target, blob, upload.filename, upload.content_type, upload.uploaded_by)
+        upload.delete()
+    return attachment
+
+
+def adjust_attachment_count(attachment, delta):
+    """Ajusta con UPDATE ... ± 1 el contador del registro al que pertenece directamente el adjunto"""
+    if attachment.task_id:
+        queryset = Task.objects.filter(pk=attachment.task_id)
+    elif attachment.user_story_id:
+        queryset = UserStory.objects.filter(pk=attachment.user_story_id)
+    else:
+        queryset = Initiative.objects.filter(pk=attachment.initiative_id)
+    if delta < 0:
+        queryset = queryset.filter(attachment_count__gte=-delta)
+    queryset.update(attachment_count=F('attachment_count') + delta)
+
+
+def direct_attachments(queryset, **target):
+    """Adjuntos propios del registro indicado (sin los de sus historias o tareas)"""
+    if 'initiative' in target:
+        queryset = queryset.filter(user_story__isnull=True, task__isnull=True)
+    elif 'user_story' in target:
+        queryset = queryset.filter(task__isnull=True)
+    return queryset.filter(**target).select_related('blob', 'uploaded_by')
+
+
+def parse_range(header, size):
+    """
+    (inicio, fin) inclusivos de un encabezado Range de un solo intervalo.
+    None si no hay encabezado o no se reconoce (se envía el archivo completo);
+    ValueError si el intervalo queda fuera del archivo.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Sufijo: los últimos N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError('Rango no satisfacible')
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError('Rango no satisfacible')
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(READ_CHUNK_SIZE, length))
+            if not data:
+                return
+            length -= len(data)
+            yield data
+
+
+def _sendfile_response(mode, attachment, path):
+    """Respuesta vacía con la ruta para que el servidor web envíe el archivo"""
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=attachment.content_type)
+        response['X-Sendfile'] = str(path)
+    elif mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=attachment.content_type)
+        prefix = getattr(settings, 'ATTACHMENTS_SENDFILE_URL', '/protected-attachments/').rstrip('/')
+        response['X-Accel-Redirect'] = f'{prefix}/{blob_relative_path(attachment.blob.sha256)}'
+    else:
+        response = import_string(mode)(attachment, path)
+    return response
+
+
+def attachment_response(request, attachment):
+    """
+    Descarga del adjunto: completa, parcial (206) si pide un Range válido, o
+    delegada al servidor web si ATTACHMENTS_SENDFILE está configurado.
+    Lanza FileNotFoundError si falta el contenido en disco.
+    """
+    blob = attachment.blob
+    path = blob_path(blob.sha256)
+    if not path.exists():
+        raise FileNotFoundError(path)
+
+    sendfile = getattr(settings, 'ATTACHMENTS_SENDFILE', None)
+    if sendfile:
+        response = _sendfile_response(sendfile, attachment, path)
+    else:
+        # If-Range con otro ETag: el archivo cambió para el cliente, se envía completo
+        if_range = request.headers.get('If-Range')
+        byte_range = None
+        if not if_range or if_range == f'"{blob.sha256}"':
+            try:
+                byte_range = parse_range(request.headers.get('Range'), blob.size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{blob.size}'
+                return response
+
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(path, start, end - start + 1), status=206, content_type=attachment.content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{blob.size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=attachment.content_type)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(True, attachment.filename)
+    response['X-Content-Type-Options'] = 'nosniff'
+    # El contenido de un adjunto nunca cambia
+    response['Cache-Control'] = f'private, max-age={CACHE_SECONDS}, immutable'
+    return response
+
+
+def purge_attachments(dry_run=False, now=None):
+    """
+    Elimina las subidas por partes sin actividad en UPLOAD_EXPIRY y los
+    contenidos que ningún adjunto (ni el archivo de periodos) usa desde hace
+    BLOB_GRACE, con sus archivos.
+    """
+    now = now or timezone.now()
+    stale_uploads = list(AttachmentUpload.objects.filter(updated_at__lt=now - UPLOAD_EXPIRY).values_list('pk', flat=True))
+
+    archived = {
+        str(blob_id) for blob_id in ArchivedRecord.objects.filter(model='attachment').values_list('data__blob_id', flat=True)
+    }
+    orphans = [
+        (pk, sha256, size)
+        for pk, sha256, size in AttachmentBlob.objects.filter(
+            attachments__isnull=True, updated_at__lt=now - BLOB_GRACE
+        ).values_list('pk', 'sha256', 'size')
+        if str(pk) not in archived
+    ]
+    result = PurgeResult(len(stale_uploads), len(orphans), sum(size for _, _, size in orphans))
+    if dry_run:
+        return result
+
+    AttachmentUpload.objects.filter(pk__in=stale_uploads).delete()
+    for upload_id in stale_uploads:
+        upload_path(upload_id).unlink(missing_ok=True)
+
+    # Se vuelve a comprobar con la fila bloqueada: _store_blob() la bloquea
+    # también, así que no puede reutilizarse entre la comprobación y el borrado
+    deleted = set()
+    for pk, sha256, _ in orphans:
+        with transaction.atomic():
+            blob = AttachmentBlob.objects.select_for_update().filter(pk=pk, updated_at__lt=now - BLOB_GRACE).first()
+            if blob is None or Attachment.objects.filter(blob_id=pk).exists():
+                continue
+            blob.delete()
+            blob_path(sha256).unlink(missing_ok=True)
+            deleted.add(sha256)
+    return result._replace(blobs=len(deleted), bytes=sum(size for _, sha256, size in orphans if sha256 in deleted))
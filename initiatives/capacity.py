@@ -0,0 +1,179 @@
+"""
+Capacidad del equipo por sprint.
+
+Para cada empleado se intersectan sus ausencias con el rango del sprint
+(en días hábiles) y se descuentan las horas estimadas de las tareas que
+tiene asignadas en el sprint. Todo el equipo se calcula con tres consultas:
+empleados, ausencias ordenadas por (empleado, inicio) y horas asignadas
+agrupadas por empleado. Las ausencias se recorren una sola vez con un
+barrido de intervalos que fusiona solapamientos, para no descontar dos
+veces el mismo día; los días hábiles de todos los intervalos fusionados
+se cuentan con una sola llamada a business_days_array.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import Sum
+
+from team.models import Absence, Employee
+from team.workdays import business_days_array, total_business_days
+
+from .models import Task
+
+
+class EmployeeCapacity(NamedTuple):
+    employee: Employee
+    business_days: int
+    absent_days: int
+    capacity_hours: Decimal
+    assigned_hours: Decimal
+
+    @property
+    def available_days(self):
+        return self.business_days - self.absent_days
+
+    @property
+    def free_hours(self):
+        return self.capacity_hours - self.assigned_hours
+
+    @property
+    def utilization(self):
+        if not self.capacity_hours:
+            return 100 if self.assigned_hours else 0
+        return round(self.assigned_hours / self.capacity_hours * 100, 1)
+
+    @property
+    def is_overbooked(self):
+        return self.free_hours < 0
+
+
+class DepartmentCapacity(NamedTuple):
+    department: str
+    headcount: int
+    absent_days: int
+    capacity_hours: Decimal
+    assigned_hours: Decimal
+
+    @property
+    def free_hours(self):
+        return self.capacity_hours - self.assigned_hours
+
+    @property
+    def utilization(self):
+        if not self.capacity_hours:
+            return 100 if self.assigned_hours else 0
+        return round(self.assigned_hours / self.capacity_hours * 100, 1)
+
+
+def workday_hours():
+    return Decimal(str(getattr(settings, 'WORKDAY_HOURS', 8)))
+
+
+def merge_intervals(intervals, start, end):
+    """
+    Unión de `intervals` recortada a [start, end], como lista de pares
+    (inicio, fin) sin solapamientos. Deben venir ordenados por fecha de inicio.
+    """
+    merged = []
+    for interval_start, interval_end in intervals:
+        interval_start = max(interval_start, start)
+        interval_end = min(interval_end, end)
+        if interval_end < interval_start:
+            continue
+        if merged and interval_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], interval_end))
+        else:
+            merged.append((interval_start, interval_end))
+    return merged
+
+
+def merged_absent_days(intervals, start, end):
+    """
+    Días hábiles cubiertos por la unión de `intervals` dentro de [start, end].
+    Los intervalos deben venir ordenados por fecha de inicio.
+    """
+    return total_business_days(merge_intervals(intervals, start, end))
+
+
+def sprint_capacity(sprint, department=None):
+    """
+    Devuelve (capacidad_por_empleado, capacidad_por_departamento) para el
+    sprint, opcionalmente filtrado por el id de departamento.
+    """
+    employees = Employee.objects.filter(is_active=True).select_related('user')
+    if department:
+        employees = employees.filter(department_id=department)
+    employees = list(employees.order_by('department_name', 'user__first_name', 'user__last_name'))
+
+    employee_ids = [employee.pk for employee in employees]
+
+    absences = Absence.objects.filter(
+        employee_id__in=employee_ids,
+        start_date__lte=sprint.end_date,
+        end_date__gte=sprint.start_date,
+    ).order_by('employee_id', 'start_date').values_list('employee_id', 'start_date', 'end_date')
+
+    intervals_by_employee = defaultdict(list)
+    for employee_id, start_date, end_date in absences:
+        intervals_by_employee[employee_id].append((start_date, end_date))
+
+    assigned_hours = dict(
+        Task.objects.filter(
+            user_story__sprint=sprint,
+            assignee_id__in=employee_ids,
+        ).exclude(
+            user_story__status='CANCELLED'
+        ).values('assignee_id').annotate(
+            hours=Sum('estimated_hours')
+        ).values_list('assignee_id', 'hours')
+    )
+
+    # Rango del sprint y todos los intervalos fusionados en una sola llamada
+    ranges = [(sprint.start_date, sprint.end_date)]
+    owners = [None]
+    for employee_id, intervals in intervals_by_employee.items():
+        for interval in merge_intervals(intervals, sprint.start_date, sprint.end_date):
+            ranges.append(interval)
+            owners.append(employee_id)
+    starts, ends = zip(*ranges)
+    counts = business_days_array(starts, ends)
+    business_days = int(counts[0])
+    absent_by_employee = defaultdict(int)
+    for employee_id, days in zip(owners[1:], counts[1:]):
+        absent_by_employee[employee_id] += int(days)
+
+    hours_per_day = workday_hours()
+    rows = []
+    for employee in employees:
+        absent_days = absent_by_employee.get(employee.pk, 0)
+        rows.append(EmployeeCapacity(
+            employee=employee,
+            business_days=business_days,
+            absent_days=absent_days,
+            capacity_hours=hours_per_day * (business_days - absent_days),
+            assigned_hours=assigned_hours.get(employee.pk) or Decimal('0'),
+        ))
+
+    return rows, department_totals(rows)
+
+
+def department_totals(rows):
+    """Agrega la capacidad por departamento"""
+    totals = {}
+    for row in rows:
+        department = row.employee.department_name
+        current = totals.get(department)
+        if current is None:
+            totals[department] = DepartmentCapacity(
+                department, 1, row.absent_days, row.capacity_hours, row.assigned_hours
+            )
+        else:
+            totals[department] = current._replace(
+                headcount=current.headcount + 1,
+                absent_days=current.absent_days + row.absent_days,
+                capacity_hours=current.capacity_hours + row.capacity_hours,
+                assigned_hours=current.assigned_hours + row.assigned_hours,
+            )
+    return list(totals.values())
@@ -0,0 +1,140 @@
+"""
+Registro de ejecuciones de tareas operativas y mantenimiento incremental de
+los resúmenes de cumplimiento (por tarea y por responsable).
+
+Los resúmenes se actualizan con expresiones F() en la misma transacción que
+el historial, por lo que las vistas leen porcentajes sin recorrer el historial.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    OperationalTaskExecution, OperationalTaskCompliance, OperationalOwnerCompliance
+)
+from .recurrence import iter_occurrences, last_occurrence_until
+
+
+def on_time_deadline(task, scheduled_for):
+    """Límite para considerar una ejecución a tiempo"""
+    if task.time_of_day is None:
+        # Sin hora definida basta con ejecutarla el mismo día
+        local_day = timezone.localtime(scheduled_for).date()
+        return timezone.make_aware(datetime.combine(local_day, time.max))
+    grace = getattr(settings, 'OPERATIONAL_TASK_GRACE_MINUTES', 60)
+    return scheduled_for + timedelta(minutes=grace)
+
+
+def execution_slot(task, now):
+    """
+    Ocurrencia a la que corresponde una ejecución marcada en `now` y las
+    anteriores que se dieron por perdidas, igual que el planificador: si
+    `next_execution` ya pasó, la ejecución cuenta para la última ocurrencia
+    vencida y las intermedias quedan como MISSED.
+    """
+    rule = task.recurrence_rule
+    scheduled_for = task.next_execution
+    if scheduled_for is None or not rule.is_recurring or scheduled_for > now:
+        return scheduled_for, []
+    current = last_occurrence_until(rule, scheduled_for, now) or scheduled_for
+    return current, [o for o in iter_occurrences(rule, scheduled_for, current) if o < current]
+
+
+def already_executed(task, now):
+    """
+    True si la ocurrencia que viene ya se cubrió: no ha vencido y la última
+    ejecución es posterior a la ocurrencia anterior (p. ej. un doble clic)
+    """
+    rule = task.recurrence_rule
+    if not rule.is_recurring or task.next_execution is None or task.last_execution is None:
+        return False
+    if task.next_execution <= now:
+        return False
+    step = timedelta(microseconds=1)
+    return last_occurrence_until(rule, task.last_execution + step, task.next_execution - step) is None
+
+
+def build_execution(task, executed_at, scheduled_for=None, executed_by=None, duration_hours=None):
+    """Crea (sin guardar) la ejecución de una tarea comparándola con lo programado"""
+    if scheduled_for is None or executed_at <= on_time_deadline(task, scheduled_for):
+        status = 'ON_TIME'
+    else:
+        status = 'LATE'
+
+    delay_minutes = 0
+    if scheduled_for is not None and executed_at > scheduled_for:
+        delay_minutes = int((executed_at - scheduled_for).total_seconds() // 60)
+
+    return OperationalTaskExecution(
+        task=task,
+        owner_id=task.initiative.owner_id,
+        scheduled_for=scheduled_for,
+        executed_at=executed_at,
+        executed_by=executed_by,
+        duration_hours=duration_hours if duration_hours is not None else task.duration_hours,
+        delay_minutes=delay_minutes,
+        is_on_time=status == 'ON_TIME',
+        status=status,
+    )
+
+
+def build_missed_execution(task, scheduled_for):
+    """Crea (sin guardar) el registro de una ejecución programada que no se realizó"""
+    return OperationalTaskExecution(
+        task=task,
+        owner_id=task.initiative.owner_id,
+        scheduled_for=scheduled_for,
+        is_on_time=False,
+        status='MISSED',
+    )
+
+
+STATUS_COUNTERS = {
+    'ON_TIME': 'on_time_runs',
+    'LATE': 'late_runs',
+    'MISSED': 'missed_runs',
+}
+
+
+def _apply_counters(model, key_field, deltas):
+    """Suma los contadores agrupados por clave con una sentencia UPDATE por grupo"""
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**{key_field: key}) for key in deltas],
+        ignore_conflicts=True,
+    )
+    # Agrupar claves con el mismo incremento para minimizar sentencias
+    by_delta = {}
+    for key, counter in deltas.items():
+        by_delta.setdefault(tuple(sorted(counter.items())), []).append(key)
+
+    for delta, keys in by_delta.items():
+        updates = {'total_runs': F('total_runs') + sum(count for _, count in delta)}
+        for status, count in delta:
+            field = STATUS_COUNTERS[status]
+            updates[field] = F(field) + count
+        model.objects.filter(**{f'{key_field}__in': keys}).update(updated_at=timezone.now(), **updates)
+
+
+def record_executions(executions):
+    """Guarda el historial en bloque y actualiza los resúmenes de cumplimiento"""
+    if not executions:
+        return []
+
+    by_task = {}
+    by_owner = {}
+    for execution in executions:
+        by_task.setdefault(execution.task_id, Counter())[execution.status] += 1
+        if execution.owner_id:
+            by_owner.setdefault(execution.owner_id, Counter())[execution.status] += 1
+
+    with transaction.atomic():
+        created = OperationalTaskExecution.objects.bulk_create(executions)
+        _apply_counters(OperationalTaskCompliance, 'task_id', by_task)
+        _apply_counters(OperationalOwnerCompliance, 'owner_id', by_owner)
+    return created
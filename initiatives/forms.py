@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.models import User
+from django.db.models import Q
 from datetime import date
 from .models import (
     Initiative, Quarter, Sprint, InitiativeUpdate, 
@@ -39,7 +40,10 @@ class InitiativeForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['owner'].queryset = Employee.objects.filter(is_active=True).select_related('user')
         self.fields['collaborators'].queryset = Employee.objects.filter(is_active=True).select_related('user')
-        self.fields['quarter'].queryset = Quarter.objects.all().order_by('-year', '-quarter')
+        # Los periodos archivados no reciben trabajo nuevo
+        self.fields['quarter'].queryset = Quarter.objects.filter(
+            Q(is_archived=False) | Q(pk=self.instance.quarter_id)
+        ).order_by('-year', '-quarter')
         
         self.fields['owner'].empty_label = "Seleccionar responsable..."
         self.fields['initiative_type'].empty_label = "Seleccionar tipo..."
@@ -149,7 +153,10 @@ class SprintForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['quarter'].queryset = Quarter.objects.all().order_by('-year', '-quarter')
+        # Los periodos archivados no reciben trabajo nuevo
+        self.fields['quarter'].queryset = Quarter.objects.filter(
+            Q(is_archived=False) | Q(pk=self.instance.quarter_id)
+        ).order_by('-year', '-quarter')
         self.fields['quarter'].empty_label = "Seleccionar periodo..."
         
         # Preseleccionar Q activo si es nuevo
@@ -211,6 +218,36 @@ class OperationalTaskForm(forms.ModelForm):
         # Configurar etiquetas y ayuda
         self.fields['initiative'].label = 'Iniciativa Operativa'
         self.fields['initiative'].empty_label = 'Seleccionar iniciativa operativa...'
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        
+        # Programar la primera ejecución si no se indicó una
+        if not cleaned_data.get('next_execution') and cleaned_data.get('frequency'):
+            task = OperationalTask(
+                frequency=cleaned_data['frequency'],
+                day_of_week=cleaned_data.get('day_of_week'),
+                day_of_month=cleaned_data.get('day_of_month'),
+                time_of_day=cleaned_data.get('time_of_day'),
+                last_execution=cleaned_data.get('last_execution'),
+                initiative=cleaned_data.get('initiative'),
+            )
+            cleaned_data['next_execution'] = task.calculate_next_execution()
+        
+        return cleaned_data
+
+
+class OperationalTaskExecutionForm(forms.Form):
+    """Datos opcionales al marcar una tarea operativa como ejecutada"""
+    
+    # Mismos límites que OperationalTaskExecution.duration_hours; rechaza NaN e infinitos
+    duration_hours = forms.DecimalField(
+        required=False,
+        min_value=0,
+        max_digits=5,
+        decimal_places=2,
+        label='Duración (horas)'
+    )
 
 
 class InitiativeUpdateForm(forms.ModelForm):
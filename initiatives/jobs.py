@@ -0,0 +1,12 @@
+"""Trabajos en segundo plano de iniciativas"""
+from jobs.queue import job
+
+from .models import UserStory
+
+
+@job('initiatives.update_initiative_progress')
+def update_initiative_progress(initiative_id):
+    """Recalcula el progreso de la iniciativa a partir de sus historias de usuario"""
+    story = UserStory.objects.filter(initiative_id=initiative_id).select_related('initiative').first()
+    if story:
+        story.update_initiative_progress()
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from initiatives.archive import ArchiveError, archivable_quarters, archive_quarter
+from initiatives.models import Quarter
+
+
+class Command(BaseCommand):
+    help = 'Mueve al archivo las iniciativas de los periodos (Q) cerrados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Año del periodo a archivar')
+        parser.add_argument('--quarter', type=int, choices=[1, 2, 3, 4], help='Trimestre del periodo a archivar')
+        parser.add_argument('--keep', type=int, default=None,
+                            help='Periodos recientes que se conservan en las tablas de trabajo '
+                                 '(por defecto ARCHIVE_KEEP_QUARTERS)')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Iniciativas por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar lo que se archivaría sin mover nada')
+
+    def handle(self, *args, **options):
+        if (options['year'] is None) != (options['quarter'] is None):
+            raise CommandError('Indica --year y --quarter juntos, o ninguno para usar --keep.')
+
+        if options['year'] is not None:
+            try:
+                quarters = [Quarter.objects.get(year=options['year'], quarter=options['quarter'])]
+            except Quarter.DoesNotExist:
+                raise CommandError(f'No existe el periodo Q{options["quarter"]} {options["year"]}.')
+        else:
+            quarters = list(archivable_quarters(keep=options['keep']))
+
+        if not quarters:
+            self.stdout.write('No hay periodos por archivar.')
+            return
+
+        suffix = ' (sin guardar)' if options['dry_run'] else ''
+        for quarter in quarters:
+            self.stdout.write(f'Archivando {quarter}...')
+            try:
+                result = archive_quarter(
+                    quarter,
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'],
+                    stdout=self.stdout if options['verbosity'] > 1 else None,
+                )
+            except ArchiveError as e:
+                raise CommandError(str(e))
+
+            counts = result.counts
+            self.stdout.write(self.style.SUCCESS(
+                f'{quarter}: {counts["initiative"]} iniciativa(s), {counts["userstory"]} historia(s), '
+                f'{counts["task"]} tarea(s), {counts["initiativeupdate"]} actualización(es), '
+                f'{counts["initiativemetric"]} métrica(s) y {counts["attachment"]} adjunto(s) archivados{suffix}'
+            ))
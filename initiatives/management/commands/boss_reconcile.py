@@ -0,0 +1,43 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management.base import BaseCommand
+
+from boss_core.reconcile import FAMILIES, RECONCILE_CHUNK_SIZE, reconcile
+
+
+class Command(BaseCommand):
+    help = ('Recalcula los valores derivados (vacaciones, progreso de iniciativas, próxima ejecución '
+            'de tareas operativas) y corrige los que no coinciden')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=sorted(FAMILIES), action='append',
+                            help='Familia a conciliar (repetible; por defecto todas)')
+        parser.add_argument('--chunk-size', type=int, default=RECONCILE_CHUNK_SIZE, help='Registros por lote de bulk_update')
+        parser.add_argument('--dry-run', action='store_true', help='Reportar las diferencias sin corregirlas')
+        parser.add_argument('--report', metavar='PATH', help='Guardar el detalle en JSON ("-" para la salida estándar)')
+
+    def handle(self, *args, **options):
+        reports = reconcile(options['only'], dry_run=options['dry_run'], chunk_size=options['chunk_size'])
+
+        if options['report']:
+            data = json.dumps(
+                {'dry_run': options['dry_run'], 'families': {report.name: report.as_dict() for report in reports}},
+                cls=DjangoJSONEncoder, ensure_ascii=False, indent=2,
+            )
+            if options['report'] == '-':
+                self.stdout.write(data)
+                return
+            with open(options['report'], 'w', encoding='utf-8') as file:
+                file.write(data)
+
+        verb = 'con diferencias (sin guardar)' if options['dry_run'] else 'corregido(s)'
+        for report in reports:
+            if options['verbosity'] > 1:
+                for drift in report.drifts:
+                    changes = ', '.join(
+                        f'{field}: {stored} → {expected}' for field, (stored, expected) in drift.changes.items()
+                    )
+                    self.stdout.write(f'  [{report.name}] #{drift.pk} {drift.label}: {changes}')
+            style = self.style.WARNING if report.drifts else self.style.SUCCESS
+            self.stdout.write(style(f'{report.name}: {report.checked} revisado(s), {len(report.drifts)} {verb}'))
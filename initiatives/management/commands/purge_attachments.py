@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from initiatives.attachments import purge_attachments
+
+
+class Command(BaseCommand):
+    help = 'Elimina los contenidos de adjuntos que ya no se usan y las subidas por partes abandonadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar lo que se eliminaría sin borrar nada')
+
+    def handle(self, *args, **options):
+        result = purge_attachments(dry_run=options['dry_run'])
+        suffix = ' (sin borrar)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.uploads} subida(s) abandonada(s) y {result.blobs} contenido(s) sin adjuntos '
+            f'({filesizeformat(result.bytes)}) eliminados{suffix}'
+        ))
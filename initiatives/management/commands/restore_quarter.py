@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from initiatives.archive import ArchiveError, restore_quarter
+from initiatives.models import Quarter
+
+
+class Command(BaseCommand):
+    help = 'Devuelve a las tablas de trabajo las iniciativas archivadas de un periodo (Q)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True, help='Año del periodo')
+        parser.add_argument('--quarter', type=int, required=True, choices=[1, 2, 3, 4], help='Trimestre del periodo')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Iniciativas por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar lo que se restauraría sin mover nada')
+
+    def handle(self, *args, **options):
+        try:
+            quarter = Quarter.objects.get(year=options['year'], quarter=options['quarter'])
+        except Quarter.DoesNotExist:
+            raise CommandError(f'No existe el periodo Q{options["quarter"]} {options["year"]}.')
+
+        self.stdout.write(f'Restaurando {quarter}...')
+        try:
+            result = restore_quarter(
+                quarter,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+                stdout=self.stdout if options['verbosity'] > 1 else None,
+            )
+        except ArchiveError as e:
+            raise CommandError(str(e))
+
+        suffix = ' (sin guardar)' if options['dry_run'] else ''
+        counts = result.counts
+        self.stdout.write(self.style.SUCCESS(
+            f'{quarter}: {counts["initiative"]} iniciativa(s), {counts["userstory"]} historia(s), '
+            f'{counts["task"]} tarea(s), {counts["initiativeupdate"]} actualización(es), '
+            f'{counts["initiativemetric"]} métrica(s) y {counts["attachment"]} adjunto(s) restaurados{suffix}'
+        ))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from initiatives.scheduler import OperationalTaskScheduler
+
+
+class Command(BaseCommand):
+    help = 'Reprograma las tareas operativas vencidas usando el motor de recurrencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Procesar lo vencido y terminar (modo cron)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Tareas por lote de bulk_update')
+        parser.add_argument('--horizon', type=int, default=3600, help='Ventana de carga en segundos')
+        parser.add_argument('--max-sleep', type=int, default=300, help='Máximo de segundos entre revisiones')
+
+    def handle(self, *args, **options):
+        scheduler = OperationalTaskScheduler(
+            batch_size=options['batch_size'],
+            horizon=timedelta(seconds=options['horizon']),
+            stdout=self.stdout,
+        )
+
+        if options['once']:
+            processed = scheduler.run_pending()
+            self.stdout.write(self.style.SUCCESS(f'{processed} tarea(s) operativa(s) reprogramada(s)'))
+            return
+
+        self.stdout.write('Planificador de tareas operativas iniciado (Ctrl+C para detener)')
+        try:
+            scheduler.run_forever(max_sleep=options['max_sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Planificador detenido')
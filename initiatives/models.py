@@ -1,8 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from team.models import Employee
+from boss_core.side_effects import deferred
 from django.core.validators import MinValueValidator, MaxValueValidator
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+import uuid
 
 
 class Quarter(models.Model):
@@ -12,6 +15,8 @@ class Quarter(models.Model):
     start_date = models.DateField(verbose_name='Fecha de Inicio')
     end_date = models.DateField(verbose_name='Fecha de Fin')
     is_active = models.BooleanField(default=False, verbose_name='Activo')
+    is_archived = models.BooleanField(default=False, verbose_name='Archivado')
+    archived_at = models.DateTimeField(null=True, blank=True, verbose_name='Archivado el')
     
     class Meta:
         verbose_name = 'Periodo (Q)'
@@ -73,6 +78,59 @@ class InitiativeType(models.Model):
         return f"{self.get_category_display()} - {self.name}"
 
 
+# Rango numérico de cada prioridad: ordenar por el código de texto daría
+# MEDIUM > LOW > HIGH > CRITICAL y no podría combinarse con los índices
+PRIORITY_RANKS = {
+    'LOW': 1,
+    'MEDIUM': 2,
+    'HIGH': 3,
+    'CRITICAL': 4,
+}
+
+
+def priority_rank(priority):
+    return PRIORITY_RANKS.get(priority, 0)
+
+
+def _with_priority_rank(instance, kwargs):
+    """Sincroniza priority_rank antes de guardar, también con update_fields"""
+    instance.priority_rank = priority_rank(instance.priority)
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'priority' in update_fields:
+        kwargs['update_fields'] = {*update_fields, 'priority_rank'}
+    return kwargs
+
+
+# Contadores que las señales mantienen con UPDATE ... SET campo = campo ± 1
+COUNTER_FIELDS = ('attachment_count',)
+
+
+def _without_counters(instance, kwargs):
+    """
+    Al reescribir una fila completa omite los contadores: la copia en memoria
+    puede estar vencida si otro proceso los incrementó mientras tanto
+    """
+    if not instance._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+        # Como save() sin update_fields: tampoco se escriben los campos diferidos
+        deferred = instance.get_deferred_fields()
+        kwargs['update_fields'] = [
+            field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in COUNTER_FIELDS and field.attname not in deferred
+        ]
+    return kwargs
+
+
+def _parent_changed(instance, attname, kwargs):
+    """
+    True si el guardado puede haber cambiado la llave `attname`: se incluye en
+    update_fields y difiere de la que se leyó de la base (o no se conoce)
+    """
+    if attname.removesuffix('_id') not in (kwargs.get('update_fields') or [attname.removesuffix('_id')]):
+        return False
+    loaded = getattr(instance, '_loaded_parent_id', None)
+    return loaded is None or loaded != getattr(instance, attname)
+
+
 class Initiative(models.Model):
     """Modelo principal para iniciativas y temas"""
     STATUS_CHOICES = [
@@ -99,22 +157,32 @@ class Initiative(models.Model):
     quarter = models.ForeignKey(Quarter, on_delete=models.DO_NOTHING, verbose_name='Periodo (Q)')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='BACKLOG', verbose_name='Estado')
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='MEDIUM', verbose_name='Prioridad')
+    priority_rank = models.PositiveSmallIntegerField(default=PRIORITY_RANKS['MEDIUM'], editable=False, verbose_name='Rango de Prioridad')
     start_date = models.DateField(null=True, blank=True, verbose_name='Fecha de Inicio')
     target_date = models.DateField(null=True, blank=True, verbose_name='Fecha Objetivo')
     completion_date = models.DateField(null=True, blank=True, verbose_name='Fecha de Completado')
     progress = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(100)], verbose_name='Progreso (%)')
     is_operational = models.BooleanField(default=False, verbose_name='Es Operativo')
+    attachment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Adjuntos')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = 'Iniciativa'
         verbose_name_plural = 'Iniciativas'
-        ordering = ['-priority', '-created_at']
+        ordering = ['-priority_rank', '-created_at']
+        indexes = [
+            # Listas y tableros del Q, con o sin filtro de estado, en orden de prioridad
+            models.Index(fields=['quarter', '-priority_rank', '-created_at'], name='initiative_q_rank_idx'),
+            models.Index(fields=['quarter', 'status', '-priority_rank', '-created_at'], name='initiative_q_status_rank_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.owner.full_name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **_with_priority_rank(self, _without_counters(self, kwargs)))
+
 
 class OperationalTask(models.Model):
     """Tareas operativas recurrentes"""
@@ -140,38 +208,122 @@ class OperationalTask(models.Model):
     class Meta:
         verbose_name = 'Tarea Operativa'
         verbose_name_plural = 'Tareas Operativas'
+        indexes = [
+            models.Index(fields=['next_execution'], name='optask_next_execution_idx'),
+        ]
 
     def __str__(self):
         return f"{self.initiative.title} - {self.get_frequency_display()}"
 
-    def calculate_next_execution(self):
-        """Calcula la próxima ejecución basada en la frecuencia"""
-        from datetime import datetime, time
+    @property
+    def recurrence_rule(self):
+        """Regla de recurrencia de la tarea para el motor de calendario"""
+        from django.utils import timezone
+        from .recurrence import RecurrenceRule
         
-        if not self.last_execution:
-            base_date = datetime.now()
+        # El ancla define el día por defecto cuando no se configuró uno explícito
+        if self.last_execution:
+            anchor = timezone.localtime(self.last_execution).date()
+        elif self.initiative_id and self.initiative.start_date:
+            anchor = self.initiative.start_date
         else:
-            base_date = self.last_execution
-        
-        if self.frequency == 'DAILY':
-            next_date = base_date + timedelta(days=1)
-        elif self.frequency == 'WEEKLY':
-            next_date = base_date + timedelta(weeks=1)
-        elif self.frequency == 'BIWEEKLY':
-            next_date = base_date + timedelta(weeks=2)
-        elif self.frequency == 'MONTHLY':
-            next_date = base_date + timedelta(days=30)  # Aproximado
-        elif self.frequency == 'QUARTERLY':
-            next_date = base_date + timedelta(days=90)  # Aproximado
-        elif self.frequency == 'YEARLY':
-            next_date = base_date + timedelta(days=365)
-        else:  # ON_DEMAND
-            return None
+            anchor = timezone.localdate()
         
-        if self.time_of_day:
-            next_date = datetime.combine(next_date.date(), self.time_of_day)
+        return RecurrenceRule(
+            frequency=self.frequency,
+            day_of_week=self.day_of_week,
+            day_of_month=self.day_of_month,
+            time_of_day=self.time_of_day,
+            anchor=anchor,
+        )
+
+    def calculate_next_execution(self, after=None):
+        """Calcula la próxima ejecución según el calendario de la frecuencia"""
+        from django.utils import timezone
+        from .recurrence import next_occurrence
         
-        return next_date
+        base_date = after or self.last_execution or timezone.now()
+        return next_occurrence(self.recurrence_rule, base_date)
+
+
+class OperationalTaskExecution(models.Model):
+    """Historial de ejecuciones (y ejecuciones perdidas) de tareas operativas"""
+    STATUS_CHOICES = [
+        ('ON_TIME', 'A Tiempo'),
+        ('LATE', 'Con Retraso'),
+        ('MISSED', 'No Ejecutada'),
+    ]
+    
+    task = models.ForeignKey(OperationalTask, on_delete=models.CASCADE, related_name='executions', verbose_name='Tarea Operativa')
+    owner = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='operational_executions', verbose_name='Responsable')
+    scheduled_for = models.DateTimeField(null=True, blank=True, verbose_name='Programada para')
+    executed_at = models.DateTimeField(null=True, blank=True, verbose_name='Ejecutada el')
+    executed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Ejecutada por')
+    duration_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name='Duración (horas)')
+    delay_minutes = models.IntegerField(default=0, verbose_name='Retraso (minutos)')
+    is_on_time = models.BooleanField(default=False, verbose_name='A Tiempo')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, verbose_name='Estado')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Ejecución de Tarea Operativa'
+        verbose_name_plural = 'Ejecuciones de Tareas Operativas'
+        ordering = ['-scheduled_for', '-created_at']
+        indexes = [
+            models.Index(fields=['task', '-scheduled_for'], name='optask_exec_task_sched_idx'),
+        ]
+        constraints = [
+            # Una sola ejecución (o pérdida) por ocurrencia programada
+            models.UniqueConstraint(
+                fields=['task', 'scheduled_for'], condition=models.Q(scheduled_for__isnull=False),
+                name='unique_optask_exec_slot',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task.initiative.title} - {self.get_status_display()}"
+
+
+class ComplianceCounters(models.Model):
+    """Contadores de cumplimiento mantenidos de forma incremental"""
+    total_runs = models.PositiveIntegerField(default=0, verbose_name='Ejecuciones Programadas')
+    on_time_runs = models.PositiveIntegerField(default=0, verbose_name='A Tiempo')
+    late_runs = models.PositiveIntegerField(default=0, verbose_name='Con Retraso')
+    missed_runs = models.PositiveIntegerField(default=0, verbose_name='No Ejecutadas')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+
+    @property
+    def on_time_percentage(self):
+        if self.total_runs == 0:
+            return None
+        return round((self.on_time_runs / self.total_runs) * 100, 1)
+
+
+class OperationalTaskCompliance(ComplianceCounters):
+    """Resumen de cumplimiento por tarea operativa"""
+    task = models.OneToOneField(OperationalTask, on_delete=models.CASCADE, related_name='compliance', verbose_name='Tarea Operativa')
+    
+    class Meta:
+        verbose_name = 'Cumplimiento de Tarea Operativa'
+        verbose_name_plural = 'Cumplimiento de Tareas Operativas'
+
+    def __str__(self):
+        return f"{self.task} ({self.on_time_percentage or 0}%)"
+
+
+class OperationalOwnerCompliance(ComplianceCounters):
+    """Resumen de cumplimiento de tareas operativas por responsable"""
+    owner = models.OneToOneField(Employee, on_delete=models.CASCADE, related_name='operational_compliance', verbose_name='Responsable')
+    
+    class Meta:
+        verbose_name = 'Cumplimiento por Responsable'
+        verbose_name_plural = 'Cumplimiento por Responsable'
+
+    def __str__(self):
+        return f"{self.owner.full_name} ({self.on_time_percentage or 0}%)"
 
 
 class Sprint(models.Model):
@@ -246,6 +398,26 @@ class InitiativeMetric(models.Model):
         return round((self.current_value / self.target_value) * 100, 2)
 
 
+def schedule_initiative_progress(initiative_id):
+    """
+    Encola el recálculo del progreso de una iniciativa al confirmar la
+    transacción; los recálculos repetidos se colapsan en uno. Dentro de
+    defer_side_effects() solo se anota y se encola al salir del bloque.
+    """
+    from django.db import transaction
+    from jobs.queue import enqueue
+    
+    effects = deferred()
+    if effects is not None:
+        effects.initiatives.add(initiative_id)
+        return
+    transaction.on_commit(lambda: enqueue(
+        'initiatives.update_initiative_progress',
+        {'initiative_id': initiative_id},
+        dedupe_key=f'initiative-progress:{initiative_id}',
+    ))
+
+
 class UserStory(models.Model):
     """Historias de usuario asociadas a iniciativas (épicas)"""
     STATUS_CHOICES = [
@@ -281,9 +453,11 @@ class UserStory(models.Model):
     acceptance_criteria = models.TextField(blank=True, verbose_name='Criterios de Aceptación')
     story_points = models.IntegerField(choices=STORY_POINTS_CHOICES, null=True, blank=True, verbose_name='Story Points')
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='MEDIUM', verbose_name='Prioridad')
+    priority_rank = models.PositiveSmallIntegerField(default=PRIORITY_RANKS['MEDIUM'], editable=False, verbose_name='Rango de Prioridad')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='BACKLOG', verbose_name='Estado')
     assignee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_stories', verbose_name='Asignado a')
     sprint = models.ForeignKey(Sprint, on_delete=models.SET_NULL, null=True, blank=True, related_name='user_stories', verbose_name='Sprint')
+    attachment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Adjuntos')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     started_at = models.DateTimeField(null=True, blank=True, verbose_name='Iniciado el')
@@ -292,7 +466,14 @@ class UserStory(models.Model):
     class Meta:
         verbose_name = 'Historia de Usuario'
         verbose_name_plural = 'Historias de Usuario'
-        ordering = ['-priority', '-created_at']
+        ordering = ['-priority_rank', '-created_at']
+        indexes = [
+            # Orden por defecto del changelist: la primera página sale del índice
+            models.Index(fields=['-priority_rank', '-created_at'], name='story_rank_created_idx'),
+            # Historias de una iniciativa y del sprint por estado, en orden de prioridad
+            models.Index(fields=['initiative', '-priority_rank', '-created_at'], name='story_initiative_rank_idx'),
+            models.Index(fields=['sprint', 'status', '-priority_rank'], name='story_sprint_status_rank_idx'),
+        ]
     
     def __str__(self):
         return f"US-{self.pk}: {self.title}"
@@ -307,6 +488,13 @@ class UserStory(models.Model):
         completed_tasks = self.tasks.filter(status='DONE').count()
         return round((completed_tasks / total_tasks) * 100, 2)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Iniciativa con la que se leyó: save() solo mueve adjuntos si cambia
+        instance._loaded_parent_id = instance.__dict__.get('initiative_id')
+        return instance
+    
     def save(self, *args, **kwargs):
         from django.utils import timezone
         
@@ -318,10 +506,25 @@ class UserStory(models.Model):
         elif self.status not in ['DONE'] and self.completed_at:
             self.completed_at = None
         
+        adding = self._state.adding
+        kwargs = _with_priority_rank(self, _without_counters(self, kwargs))
+        moved = not adding and _parent_changed(self, 'initiative_id', kwargs)
         super().save(*args, **kwargs)
+        self._loaded_parent_id = self.initiative_id
+        
+        if moved:
+            # Historia movida a otra iniciativa: sus adjuntos y los de sus tareas la siguen
+            Attachment.objects.filter(user_story_id=self.pk).exclude(initiative_id=self.initiative_id).update(
+                initiative_id=self.initiative_id
+            )
         
-        # Actualizar progreso de la iniciativa padre
-        self.update_initiative_progress()
+        # Actualizar progreso de la iniciativa padre en segundo plano
+        self.schedule_initiative_progress()
+    
+    def schedule_initiative_progress(self):
+        """Encola el recálculo del progreso de la iniciativa padre"""
+        if self.initiative_id:
+            schedule_initiative_progress(self.initiative_id)
     
     def update_initiative_progress(self):
         """Actualiza el progreso de la iniciativa basado en las historias de usuario"""
@@ -363,6 +566,7 @@ class Task(models.Model):
     assignee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_tasks', verbose_name='Asignado a')
     estimated_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name='Horas Estimadas')
     actual_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name='Horas Reales')
+    attachment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Adjuntos')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     started_at = models.DateTimeField(null=True, blank=True, verbose_name='Iniciado el')
@@ -373,10 +577,20 @@ class Task(models.Model):
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
         ordering = ['status', '-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='task_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"T-{self.pk}: {self.title}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Historia con la que se leyó: save() solo mueve adjuntos si cambia
+        instance._loaded_parent_id = instance.__dict__.get('user_story_id')
+        return instance
+    
     def save(self, *args, **kwargs):
         from django.utils import timezone
         
@@ -388,8 +602,133 @@ class Task(models.Model):
         elif self.status not in ['DONE'] and self.completed_at:
             self.completed_at = None
         
+        adding = self._state.adding
+        kwargs = _without_counters(self, kwargs)
+        moved = not adding and _parent_changed(self, 'user_story_id', kwargs)
         super().save(*args, **kwargs)
+        self._loaded_parent_id = self.user_story_id
+        
+        if moved:
+            # Tarea movida a otra historia: sus adjuntos pasan a la historia y a su iniciativa
+            Attachment.objects.filter(task_id=self.pk).exclude(user_story_id=self.user_story_id).update(
+                user_story_id=self.user_story_id,
+                initiative_id=models.Subquery(UserStory.objects.filter(pk=self.user_story_id).values('initiative_id')[:1]),
+            )
         
         # Actualizar progreso de la historia de usuario padre
-        if self.user_story:
-            self.user_story.save()  # Esto activará update_initiative_progress
\ No newline at end of file
+        effects = deferred()
+        if effects is not None:
+            effects.stories.add(self.user_story_id)
+        elif self.user_story:
+            self.user_story.save()  # Esto encolará el recálculo del progreso
+
+
+class AttachmentBlob(models.Model):
+    """
+    Contenido de un adjunto, guardado una sola vez por su SHA-256 aunque se
+    suba muchas veces (initiatives/attachments.py)
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    size = models.PositiveBigIntegerField(verbose_name='Tamaño (bytes)')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Última vez que se enlazó a un adjunto; purge_attachments respeta un margen desde aquí
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Contenido de Adjunto'
+        verbose_name_plural = 'Contenidos de Adjuntos'
+    
+    def __str__(self):
+        return self.sha256
+
+
+class Attachment(models.Model):
+    """
+    Archivo adjunto a una iniciativa, historia o tarea. `initiative` siempre
+    es la iniciativa dueña; `user_story` y `task` indican si el adjunto es de
+    una historia o tarea suya.
+    """
+    blob = models.ForeignKey(AttachmentBlob, on_delete=models.PROTECT, related_name='attachments', verbose_name='Contenido')
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='attachments', verbose_name='Iniciativa')
+    user_story = models.ForeignKey(UserStory, on_delete=models.CASCADE, null=True, blank=True, related_name='attachments', verbose_name='Historia de Usuario')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True, related_name='attachments', verbose_name='Tarea')
+    filename = models.CharField(max_length=255, verbose_name='Nombre')
+    content_type = models.CharField(max_length=100, default='application/octet-stream', verbose_name='Tipo de Contenido')
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='attachments', verbose_name='Subido por')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Subido el')
+    
+    class Meta:
+        verbose_name = 'Adjunto'
+        verbose_name_plural = 'Adjuntos'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return self.filename
+    
+    @property
+    def target(self):
+        """Registro al que pertenece directamente (y cuyo contador incrementa)"""
+        return self.task or self.user_story or self.initiative
+
+
+class AttachmentUpload(models.Model):
+    """Subida por partes en curso; el archivo parcial vive en ATTACHMENTS_ROOT/uploads/"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='+')
+    user_story = models.ForeignKey(UserStory, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, default='application/octet-stream')
+    size = models.PositiveBigIntegerField()
+    # SHA-256 declarado por el cliente; finish_upload() rechaza el archivo si no coincide
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Subida en Curso'
+        verbose_name_plural = 'Subidas en Curso'
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    """Como DjangoJSONEncoder, pero conserva los microsegundos para restaurar fechas exactas"""
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class ArchivedRecord(models.Model):
+    """Copia de solo lectura de un registro movido al archivo al cerrar un Q"""
+    MODEL_CHOICES = [
+        ('initiative', 'Iniciativa'),
+        ('userstory', 'Historia de Usuario'),
+        ('task', 'Tarea'),
+        ('initiativeupdate', 'Actualización'),
+        ('initiativemetric', 'Métrica'),
+        ('attachment', 'Adjunto'),
+    ]
+    
+    quarter = models.ForeignKey(Quarter, on_delete=models.PROTECT, related_name='archived_records', verbose_name='Periodo (Q)')
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES, verbose_name='Modelo')
+    object_id = models.BigIntegerField(verbose_name='ID Original')
+    initiative_id = models.BigIntegerField(verbose_name='ID de la Iniciativa')
+    label = models.CharField(max_length=200, verbose_name='Título')
+    data = models.JSONField(encoder=ArchiveJSONEncoder, verbose_name='Datos')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Archivado el')
+    
+    class Meta:
+        verbose_name = 'Registro Archivado'
+        verbose_name_plural = 'Registros Archivados'
+        ordering = ['quarter', 'initiative_id', 'model', 'object_id']
+        indexes = [
+            models.Index(fields=['quarter', 'model', 'initiative_id'], name='archive_quarter_model_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='unique_archived_object'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_model_display()} #{self.object_id}: {self.label}"
@@ -0,0 +1,78 @@
+"""
+Proyección de las ocurrencias esperadas de las tareas operativas.
+
+Cada tarea aporta un generador perezoso de ocurrencias y `heapq.merge`
+los intercala en orden cronológico, por lo que solo se mantiene en memoria
+una ocurrencia pendiente por tarea, sin importar el tamaño del rango.
+"""
+import heapq
+from datetime import timedelta
+from itertools import islice
+from operator import itemgetter
+from typing import NamedTuple
+
+from boss_core.ical import CalendarEvent
+
+from .models import OperationalTask
+from .recurrence import iter_occurrences
+
+
+class Occurrence(NamedTuple):
+    start: object
+    task: OperationalTask
+
+    @property
+    def end(self):
+        if self.task.duration_hours:
+            return self.start + timedelta(hours=float(self.task.duration_hours))
+        return None
+
+
+def projected_tasks(frequency=None, owner_id=None):
+    """Tareas recurrentes con lo necesario para proyectarlas"""
+    tasks = OperationalTask.objects.exclude(frequency='ON_DEMAND').select_related(
+        'initiative', 'initiative__owner__user'
+    ).order_by('pk')
+    if frequency:
+        tasks = tasks.filter(frequency=frequency)
+    if owner_id:
+        tasks = tasks.filter(initiative__owner_id=owner_id)
+    return tasks
+
+
+def _task_occurrences(task, start, end):
+    for occurrence in iter_occurrences(task.recurrence_rule, start, end):
+        yield Occurrence(occurrence, task)
+
+
+def project_occurrences(tasks, start, end):
+    """Intercala en orden cronológico las ocurrencias de todas las tareas en [start, end]"""
+    streams = [_task_occurrences(task, start, end) for task in tasks]
+    return heapq.merge(*streams, key=itemgetter(0))
+
+
+def paginate_occurrences(occurrences, page, page_size):
+    """
+    Devuelve (ocurrencias_de_la_página, hay_siguiente) consumiendo solo lo
+    necesario del flujo intercalado.
+    """
+    offset = (page - 1) * page_size
+    items = list(islice(occurrences, offset, offset + page_size + 1))
+    return items[:page_size], len(items) > page_size
+
+
+def occurrence_events(occurrences):
+    """Convierte ocurrencias en eventos iCalendar"""
+    for occurrence in occurrences:
+        task = occurrence.task
+        all_day = task.time_of_day is None
+        start = occurrence.start.date() if all_day else occurrence.start
+        yield CalendarEvent(
+            uid=f'optask-{task.pk}-{occurrence.start:%Y%m%dT%H%M}@boss',
+            summary=task.initiative.title,
+            start=start,
+            end=None if all_day else occurrence.end,
+            description=f'{task.get_frequency_display()} - {task.initiative.owner.full_name}',
+            all_day=all_day,
+            categories='Tarea Operativa',
+        )
@@ -0,0 +1,141 @@
+"""
+Motor de recurrencia para tareas operativas.
+
+Calcula las ocurrencias de una tarea operativa respetando el calendario real:
+meses de distinta longitud, años bisiestos, día de la semana y día del mes
+configurados. Todas las fechas se calculan en la zona horaria local del
+proyecto y se devuelven como datetimes conscientes de zona horaria.
+"""
+import calendar
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, NamedTuple, Optional
+
+from django.utils import timezone
+
+
+# Lunes de referencia para alinear las semanas de las tareas quincenales.
+# Las ocurrencias quincenales caen siempre en semanas pares desde esta fecha.
+BIWEEKLY_EPOCH = date(2020, 1, 6)
+
+# Meses en los que inicia cada trimestre (igual que Quarter)
+QUARTER_START_MONTHS = (1, 4, 7, 10)
+
+
+class RecurrenceRule(NamedTuple):
+    """Regla de recurrencia independiente del modelo"""
+    frequency: str
+    day_of_week: Optional[int] = None
+    day_of_month: Optional[int] = None
+    time_of_day: Optional[time] = None
+    anchor: Optional[date] = None
+
+    @property
+    def is_recurring(self):
+        return self.frequency in RECURRING_FREQUENCIES
+
+    @property
+    def weekday(self):
+        if self.day_of_week is not None:
+            return self.day_of_week
+        return (self.anchor or date.today()).weekday()
+
+    @property
+    def monthday(self):
+        if self.day_of_month:
+            return self.day_of_month
+        return (self.anchor or date.today()).day
+
+    @property
+    def month(self):
+        return (self.anchor or date.today()).month
+
+
+RECURRING_FREQUENCIES = ('DAILY', 'WEEKLY', 'BIWEEKLY', 'MONTHLY', 'QUARTERLY', 'YEARLY')
+
+
+def _clamped_date(year, month, day):
+    """Fecha con el día ajustado al último día del mes (31 -> 30, 29 de feb...)"""
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def _add_months(year, month, months):
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def _candidate_dates(rule, from_date):
+    """Genera en orden las fechas de ocurrencia a partir de from_date (inclusive)"""
+    frequency = rule.frequency
+
+    if frequency == 'DAILY':
+        current = from_date
+        while True:
+            yield current
+            current += timedelta(days=1)
+
+    elif frequency in ('WEEKLY', 'BIWEEKLY'):
+        current = from_date + timedelta(days=(rule.weekday - from_date.weekday()) % 7)
+        step = 7
+        if frequency == 'BIWEEKLY':
+            step = 14
+            if ((current - BIWEEKLY_EPOCH).days // 7) % 2:
+                current += timedelta(days=7)
+        while True:
+            yield current
+            current += timedelta(days=step)
+
+    elif frequency in ('MONTHLY', 'QUARTERLY', 'YEARLY'):
+        if frequency == 'MONTHLY':
+            year, month, step = from_date.year, from_date.month, 1
+        elif frequency == 'QUARTERLY':
+            month = max(m for m in QUARTER_START_MONTHS if m <= from_date.month)
+            year, step = from_date.year, 3
+        else:
+            year, month, step = from_date.year, rule.month, 12
+            if month > from_date.month:
+                year -= 1
+        while True:
+            current = _clamped_date(year, month, rule.monthday)
+            if current >= from_date:
+                yield current
+            year, month = _add_months(year, month, step)
+
+
+def _combine(day, rule, tz):
+    return timezone.make_aware(datetime.combine(day, rule.time_of_day or time.min), tz)
+
+
+def iter_occurrences(rule, start, end=None) -> Iterator[datetime]:
+    """
+    Genera perezosamente las ocurrencias de la regla en el rango [start, end].
+    Si end es None el generador es infinito.
+    """
+    if not rule.is_recurring:
+        return
+    tz = timezone.get_current_timezone()
+    start = timezone.localtime(start, tz)
+    end = timezone.localtime(end, tz) if end is not None else None
+
+    for day in _candidate_dates(rule, start.date()):
+        occurrence = _combine(day, rule, tz)
+        if occurrence < start:
+            continue
+        if end is not None and occurrence > end:
+            return
+        yield occurrence
+
+
+def next_occurrence(rule, after):
+    """Primera ocurrencia estrictamente posterior a after, o None si no es recurrente"""
+    for occurrence in iter_occurrences(rule, after):
+        if occurrence > after:
+            return occurrence
+    return None
+
+
+def last_occurrence_until(rule, start, end):
+    """Última ocurrencia en el rango [start, end], o None si no hay ninguna"""
+    last = None
+    for last in iter_occurrences(rule, start, end):
+        pass
+    return last
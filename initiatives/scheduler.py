@@ -0,0 +1,155 @@
+"""
+Planificador de tareas operativas basado en una cola de prioridad (min-heap).
+
+Solo se cargan las tareas cuyo `next_execution` cae dentro de una ventana
+próxima (consulta indexada), de modo que el costo depende de las tareas por
+vencer y no del tamaño total de la tabla.
+
+Una ejecución programada vence cuando llega la siguiente ocurrencia sin que
+la tarea haya sido marcada como ejecutada. En ese momento el planificador
+avanza `next_execution` a la ocurrencia vigente y registra las ejecuciones
+perdidas en el historial de cumplimiento.
+"""
+import heapq
+import time as time_module
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .compliance import build_missed_execution, record_executions
+from .models import OperationalTask
+from .recurrence import iter_occurrences, last_occurrence_until, next_occurrence
+
+
+class OperationalTaskScheduler:
+    """Cola de tareas operativas ordenada por el momento en que requieren atención"""
+
+    def __init__(self, batch_size=500, horizon=timedelta(hours=1), stdout=None):
+        self.batch_size = batch_size
+        self.horizon = horizon
+        self.stdout = stdout
+        self.heap = []
+        self.refresh_at = None
+
+    def _queryset(self):
+        return OperationalTask.objects.exclude(frequency='ON_DEMAND').select_related('initiative').only(
+            'frequency', 'day_of_week', 'day_of_month', 'time_of_day',
+            'last_execution', 'next_execution', 'initiative__start_date', 'initiative__owner',
+        )
+
+    @staticmethod
+    def due_at(task, now):
+        """Momento en que la tarea requiere atención del planificador"""
+        if task.next_execution is None:
+            return now
+        return next_occurrence(task.recurrence_rule, task.next_execution)
+
+    def refresh(self, now):
+        """Recarga la cola con las tareas que pueden vencer dentro del horizonte"""
+        self.heap = []
+        window_end = now + self.horizon
+        tasks = self._queryset().filter(
+            Q(next_execution__isnull=True) | Q(next_execution__lte=window_end)
+        )
+        for task in tasks.iterator(chunk_size=self.batch_size):
+            due_at = self.due_at(task, now)
+            if due_at is not None and due_at <= window_end:
+                self.heap.append((due_at, task.pk))
+        heapq.heapify(self.heap)
+        self.refresh_at = window_end
+
+    def pop_due(self, now):
+        """Extrae de la cola hasta batch_size tareas vencidas"""
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            due.append(heapq.heappop(self.heap)[1])
+        return due
+
+    def advance(self, task, now):
+        """
+        Avanza next_execution a la ocurrencia vigente. Devuelve la lista de
+        ejecuciones programadas que se dieron por perdidas.
+        """
+        rule = task.recurrence_rule
+        if task.next_execution is None:
+            task.next_execution = next_occurrence(rule, now)
+            return []
+
+        missed = [task.next_execution]
+        first_pending = next_occurrence(rule, task.next_execution)
+        current = last_occurrence_until(rule, first_pending, now) or first_pending
+        missed.extend(o for o in iter_occurrences(rule, first_pending, current) if o < current)
+        task.next_execution = current
+        return missed
+
+    def process_batch(self, task_ids, now):
+        """
+        Procesa un lote de tareas vencidas y guarda los cambios con bulk_update.
+        Las filas quedan bloqueadas hasta guardar, igual que al marcar una
+        tarea como ejecutada, para no dar por perdida una ejecución recién hecha.
+        """
+        with transaction.atomic():
+            tasks = self._queryset().select_for_update().in_bulk(task_ids)
+            changed, missed = self._advance_due(tasks.values(), now)
+            if changed:
+                OperationalTask.objects.bulk_update(changed, ['next_execution'], batch_size=self.batch_size)
+                record_executions(missed)
+        return changed
+
+    def _advance_due(self, tasks, now):
+        changed = []
+        missed = []
+        for task in tasks:
+            # La tarea pudo ejecutarse o editarse después de entrar en la cola
+            due_at = self.due_at(task, now)
+            if due_at is None:
+                continue
+            if due_at > now:
+                self._push(task, due_at)
+                continue
+            missed.extend(
+                build_missed_execution(task, scheduled_for)
+                for scheduled_for in self.advance(task, now)
+            )
+            changed.append(task)
+            self._push(task, self.due_at(task, now))
+        return changed, missed
+
+    def _push(self, task, due_at):
+        if due_at is not None and self.refresh_at and due_at <= self.refresh_at:
+            heapq.heappush(self.heap, (due_at, task.pk))
+
+    def run_pending(self, now=None):
+        """Procesa todo lo vencido; devuelve el número de tareas actualizadas"""
+        now = now or timezone.now()
+        if self.refresh_at is None or now >= self.refresh_at:
+            self.refresh(now)
+
+        processed = 0
+        while True:
+            batch = self.pop_due(now)
+            if not batch:
+                break
+            processed += len(self.process_batch(batch, now))
+        return processed
+
+    def seconds_until_next(self, now=None, max_sleep=None):
+        """Segundos hasta la siguiente tarea vencida o la siguiente recarga"""
+        now = now or timezone.now()
+        wake_at = self.refresh_at
+        if self.heap:
+            wake_at = min(wake_at, self.heap[0][0])
+        seconds = max(0.0, (wake_at - now).total_seconds())
+        if max_sleep is not None:
+            seconds = min(seconds, max_sleep)
+        return seconds
+
+    def run_forever(self, max_sleep=300):
+        while True:
+            processed = self.run_pending()
+            if processed and self.stdout:
+                self.stdout.write(f'{processed} tarea(s) operativa(s) reprogramada(s)')
+            time_module.sleep(self.seconds_until_next(max_sleep=max_sleep))
+
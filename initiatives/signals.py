@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .attachments import adjust_attachment_count
+from .models import Attachment
+
+
+@receiver(post_save, sender=Attachment)
+def count_attachment_on_create(sender, instance, created, **kwargs):
+    if created:
+        adjust_attachment_count(instance, 1)
+
+
+@receiver(post_delete, sender=Attachment)
+def count_attachment_on_delete(sender, instance, **kwargs):
+    adjust_attachment_count(instance, -1)
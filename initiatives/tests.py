@@ -1,3 +1,554 @@
-from django.test import TestCase
+import hashlib
+import io
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from team.models import Absence, AbsenceType, Department, Employee, Holiday
+from .archive import ArchiveError, archive_quarter, restore_quarter
+from .attachments import (
+    BLOB_GRACE, AttachmentError, Target, append_chunk, blob_path, purge_attachments, save_uploaded_file, start_upload,
+)
+from .capacity import merged_absent_days, sprint_capacity
+from .compliance import build_execution, record_executions
+from .models import (
+    ArchivedRecord, Attachment, AttachmentBlob, AttachmentUpload, Initiative, InitiativeType, InitiativeUpdate, OperationalOwnerCompliance, OperationalTask,
+    OperationalTaskCompliance, OperationalTaskExecution, Quarter, Sprint, Task, UserStory, priority_rank,
+)
+from .projection import paginate_occurrences, project_occurrences, projected_tasks
+from .recurrence import RecurrenceRule, iter_occurrences, next_occurrence
+from .scheduler import OperationalTaskScheduler
+
+
+def make_employee(username='ana', **fields):
+    user = User.objects.create_user(username=username, password='x', first_name=username.title(), last_name='Prueba')
+    defaults = {
+        'employee_id': username.upper(),
+        'birth_date': date(1990, 1, 1),
+        'hire_date': date(2015, 3, 1),
+        'position': 'Analista',
+    }
+    defaults.update(fields)
+    return Employee.objects.create(user=user, **defaults)
+
+
+def make_initiative(owner, quarter=None, **fields):
+    if quarter is None:
+        quarter = Quarter.objects.get_or_create(year=2026, quarter=4, defaults={'is_active': True})[0]
+    initiative_type = InitiativeType.objects.get_or_create(name='Operación', category='OPERATIONAL')[0]
+    defaults = {'title': 'Iniciativa', 'description': 'Descripción'}
+    defaults.update(fields)
+    return Initiative.objects.create(owner=owner, quarter=quarter, initiative_type=initiative_type, **defaults)
+
+
+def local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class RecurrenceTests(TestCase):
+    def test_monthly_day_is_clamped_to_month_length(self):
+        rule = RecurrenceRule('MONTHLY', day_of_month=31, time_of_day=time(9))
+        occurrences = list(iter_occurrences(rule, local(2028, 1, 1), local(2028, 4, 30, 23)))
+        self.assertEqual(
+            [o.date() for o in occurrences],
+            [date(2028, 1, 31), date(2028, 2, 29), date(2028, 3, 31), date(2028, 4, 30)],
+        )
+        self.assertEqual(timezone.localtime(occurrences[0]).time(), time(9))
+
+    def test_next_occurrence_is_strictly_after(self):
+        rule = RecurrenceRule('DAILY', time_of_day=time(8))
+        self.assertEqual(next_occurrence(rule, local(2026, 3, 2, 8)), local(2026, 3, 3, 8))
+        self.assertEqual(next_occurrence(rule, local(2026, 3, 2, 7)), local(2026, 3, 2, 8))
+
+    def test_weekly_uses_configured_weekday(self):
+        rule = RecurrenceRule('WEEKLY', day_of_week=4)
+        occurrence = next_occurrence(rule, local(2026, 3, 2))
+        self.assertEqual(occurrence.date(), date(2026, 3, 6))
+
+    def test_biweekly_keeps_week_parity(self):
+        rule = RecurrenceRule('BIWEEKLY', day_of_week=0)
+        first = next_occurrence(rule, local(2026, 3, 1))
+        second = next_occurrence(rule, first)
+        self.assertEqual(second - first, timedelta(days=14))
+        # Desde un día intermedio se obtiene la misma serie
+        self.assertEqual(next_occurrence(rule, first + timedelta(days=3)), second)
+
+    def test_quarterly_and_yearly(self):
+        quarterly = RecurrenceRule('QUARTERLY', day_of_month=15)
+        self.assertEqual(next_occurrence(quarterly, local(2026, 4, 20)).date(), date(2026, 7, 15))
+        yearly = RecurrenceRule('YEARLY', day_of_month=29, anchor=date(2024, 2, 29))
+        self.assertEqual(next_occurrence(yearly, local(2026, 1, 1)).date(), date(2026, 2, 28))
+
+    def test_on_demand_has_no_occurrences(self):
+        rule = RecurrenceRule('ON_DEMAND')
+        self.assertIsNone(next_occurrence(rule, local(2026, 1, 1)))
+
+
+class OperationalTaskSchedulerTests(TestCase):
+    def setUp(self):
+        self.owner = make_employee()
+        self.initiative = make_initiative(self.owner, is_operational=True)
+
+    def test_overdue_task_advances_and_records_missed_runs(self):
+        task = OperationalTask.objects.create(
+            initiative=self.initiative, frequency='DAILY', time_of_day=time(9),
+            next_execution=local(2026, 3, 2, 9),
+        )
+        processed = OperationalTaskScheduler().run_pending(now=local(2026, 3, 5, 12))
+
+        self.assertEqual(processed, 1)
+        task.refresh_from_db()
+        self.assertEqual(task.next_execution, local(2026, 3, 5, 9))
+        missed = OperationalTaskExecution.objects.filter(task=task, status='MISSED')
+        self.assertEqual(
+            sorted(missed.values_list('scheduled_for', flat=True)),
+            [local(2026, 3, 2, 9), local(2026, 3, 3, 9), local(2026, 3, 4, 9)],
+        )
+        self.assertEqual(OperationalTaskCompliance.objects.get(task=task).missed_runs, 3)
+
+    def test_task_within_window_is_left_alone(self):
+        task = OperationalTask.objects.create(
+            initiative=self.initiative, frequency='DAILY', time_of_day=time(9),
+            next_execution=local(2026, 3, 5, 9),
+        )
+        self.assertEqual(OperationalTaskScheduler().run_pending(now=local(2026, 3, 5, 12)), 0)
+        task.refresh_from_db()
+        self.assertEqual(task.next_execution, local(2026, 3, 5, 9))
+
+    def test_unscheduled_task_gets_next_execution(self):
+        task = OperationalTask.objects.create(initiative=self.initiative, frequency='WEEKLY', day_of_week=0)
+        OperationalTaskScheduler().run_pending(now=local(2026, 3, 4, 12))
+        task.refresh_from_db()
+        self.assertEqual(task.next_execution, local(2026, 3, 9))
+        self.assertFalse(OperationalTaskExecution.objects.filter(task=task).exists())
+
+
+class OperationalComplianceTests(TestCase):
+    def setUp(self):
+        self.owner = make_employee()
+        self.task = OperationalTask.objects.create(
+            initiative=make_initiative(self.owner, is_operational=True),
+            frequency='DAILY', time_of_day=time(9), next_execution=local(2026, 3, 2, 9),
+        )
+
+    def test_status_depends_on_grace_period(self):
+        on_time = build_execution(self.task, local(2026, 3, 2, 9, 30), scheduled_for=local(2026, 3, 2, 9))
+        late = build_execution(self.task, local(2026, 3, 2, 11), scheduled_for=local(2026, 3, 2, 9))
+        self.assertEqual((on_time.status, on_time.delay_minutes), ('ON_TIME', 30))
+        self.assertEqual((late.status, late.delay_minutes), ('LATE', 120))
+
+    def test_record_executions_updates_task_and_owner_rollups(self):
+        record_executions([
+            build_execution(self.task, local(2026, 3, 2, 9), scheduled_for=local(2026, 3, 2, 9)),
+            build_execution(self.task, local(2026, 3, 3, 12), scheduled_for=local(2026, 3, 3, 9)),
+        ])
+        compliance = OperationalTaskCompliance.objects.get(task=self.task)
+        self.assertEqual((compliance.total_runs, compliance.on_time_runs, compliance.late_runs), (2, 1, 1))
+        self.assertEqual(compliance.on_time_percentage, 50.0)
+        self.assertEqual(OperationalOwnerCompliance.objects.get(owner=self.owner).total_runs, 2)
+
+
+class MarkExecutedViewTests(TestCase):
+    def setUp(self):
+        self.owner = make_employee()
+        self.client.force_login(self.owner.user)
+        self.task = OperationalTask.objects.create(
+            initiative=make_initiative(self.owner, is_operational=True),
+            frequency='DAILY', next_execution=timezone.now() + timedelta(minutes=10),
+        )
+        self.url = reverse('initiatives:operational_task_mark_executed', args=[self.task.pk])
+
+    def test_marks_execution_and_reschedules(self):
+        scheduled_for = self.task.next_execution
+        response = self.client.post(self.url, {'duration_hours': '1.5'})
+
+        self.assertTrue(response.json()['success'])
+        execution = OperationalTaskExecution.objects.get(task=self.task)
+        self.assertEqual((execution.status, execution.duration_hours), ('ON_TIME', Decimal('1.50')))
+        self.task.refresh_from_db()
+        self.assertGreater(self.task.next_execution, scheduled_for)
+        self.assertEqual(OperationalTaskCompliance.objects.get(task=self.task).on_time_runs, 1)
+
+    def test_rejects_invalid_durations(self):
+        for value in ['abc', 'NaN', 'Infinity', '-1', '1000', '1.234']:
+            with self.subTest(value=value):
+                response = self.client.post(self.url, {'duration_hours': value})
+                self.assertFalse(response.json()['success'])
+        self.assertFalse(OperationalTaskExecution.objects.exists())
+        self.assertFalse(OperationalTaskCompliance.objects.exists())
+
+    def test_overdue_task_records_missed_runs(self):
+        self.task.time_of_day = time(9)
+        self.task.next_execution = local(2026, 3, 2, 9)
+        self.task.save()
+        with mock.patch('django.utils.timezone.now', return_value=local(2026, 3, 5, 12)):
+            self.assertTrue(self.client.post(self.url).json()['success'])
+
+        executions = OperationalTaskExecution.objects.filter(task=self.task).order_by('scheduled_for')
+        self.assertEqual(
+            [(e.scheduled_for, e.status) for e in executions],
+            [(local(2026, 3, 2, 9), 'MISSED'), (local(2026, 3, 3, 9), 'MISSED'),
+             (local(2026, 3, 4, 9), 'MISSED'), (local(2026, 3, 5, 9), 'LATE')],
+        )
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.next_execution, local(2026, 3, 6, 9))
+
+    def test_second_click_does_not_record_another_run(self):
+        self.assertTrue(self.client.post(self.url).json()['success'])
+        self.assertFalse(self.client.post(self.url).json()['success'])
+        self.assertEqual(OperationalTaskExecution.objects.filter(task=self.task).count(), 1)
+
+
+class OperationalProjectionTests(TestCase):
+    def setUp(self):
+        self.owner = make_employee()
+        self.daily = OperationalTask.objects.create(
+            initiative=make_initiative(self.owner, title='Respaldo', is_operational=True),
+            frequency='DAILY', time_of_day=time(9),
+        )
+        self.weekly = OperationalTask.objects.create(
+            initiative=make_initiative(self.owner, title='Reporte', is_operational=True),
+            frequency='WEEKLY', day_of_week=2, time_of_day=time(8),
+        )
+        OperationalTask.objects.create(
+            initiative=make_initiative(self.owner, title='Manual', is_operational=True), frequency='ON_DEMAND',
+        )
+
+    def test_occurrences_are_merged_in_order(self):
+        occurrences = list(project_occurrences(projected_tasks(), local(2026, 3, 2), local(2026, 3, 8, 23)))
+        self.assertEqual(len(occurrences), 8)
+        self.assertEqual([o.start for o in occurrences], sorted(o.start for o in occurrences))
+        # El miércoles el reporte (8:00) va antes del respaldo (9:00)
+        wednesday = [o.task for o in occurrences if o.start.date() == date(2026, 3, 4)]
+        self.assertEqual(wednesday, [self.weekly, self.daily])
+
+    def test_pagination_consumes_only_one_extra_item(self):
+        occurrences = project_occurrences(projected_tasks(), local(2026, 3, 2), local(2026, 3, 8, 23))
+        page, has_next = paginate_occurrences(occurrences, page=2, page_size=3)
+        self.assertEqual(len(page), 3)
+        self.assertTrue(has_next)
+
+    def test_calendar_views_ignore_invalid_parameters(self):
+        self.client.force_login(self.owner.user)
+        for url in [reverse('initiatives:operational_calendar'), reverse('initiatives:operational_calendar_ics')]:
+            for query in [
+                {'quarter': 'abc'}, {'start': '2026-13-45'}, {'end': 'mañana'},
+                {'owner': 'x'}, {'start': '2026-03-02', 'end': '2026-03-03'},
+            ]:
+                with self.subTest(url=url, query=query):
+                    response = self.client.get(url, query)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_ics_feed_contains_projected_events(self):
+        self.client.force_login(self.owner.user)
+        response = self.client.get(
+            reverse('initiatives:operational_calendar_ics'), {'start': '2026-03-02', 'end': '2026-03-03'}
+        )
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('SUMMARY:Respaldo', body)
+
+
+class SprintCapacityTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Tecnología')
+        self.ana = make_employee('ana', department=self.department)
+        self.beto = make_employee('beto', department=self.department)
+        quarter = Quarter.objects.create(year=2026, quarter=1)
+        # Dos semanas: 10 días hábiles, menos un festivo
+        self.sprint = Sprint.objects.create(
+            name='Sprint 1', quarter=quarter, sprint_number=1,
+            start_date=date(2026, 3, 2), end_date=date(2026, 3, 13),
+        )
+        Holiday.objects.create(date=date(2026, 3, 12), name='Festivo')
+        self.story = UserStory.objects.create(
+            initiative=make_initiative(self.ana, quarter=quarter), title='Historia', description='d', sprint=self.sprint,
+        )
+
+    def test_merged_absent_days_does_not_count_overlaps_twice(self):
+        intervals = [
+            (date(2026, 3, 3), date(2026, 3, 5)),
+            (date(2026, 3, 4), date(2026, 3, 6)),
+            (date(2026, 3, 20), date(2026, 3, 25)),
+        ]
+        self.assertEqual(merged_absent_days(intervals, date(2026, 3, 2), date(2026, 3, 13)), 4)
+
+    def test_capacity_subtracts_absences_and_assigned_hours(self):
+        absence_type = AbsenceType.objects.create(name='Personal', code='PER')
+        for start, end in [(date(2026, 3, 3), date(2026, 3, 5)), (date(2026, 3, 4), date(2026, 3, 6))]:
+            Absence.objects.create(employee=self.ana, absence_type=absence_type, start_date=start, end_date=end)
+        Task.objects.create(user_story=self.story, title='A', assignee=self.ana, estimated_hours=Decimal('30'))
+        Task.objects.create(user_story=self.story, title='B', assignee=self.ana, estimated_hours=Decimal('20'))
+        cancelled = UserStory.objects.create(
+            initiative=self.story.initiative, title='Cancelada', description='d', sprint=self.sprint, status='CANCELLED',
+        )
+        Task.objects.create(user_story=cancelled, title='C', assignee=self.beto, estimated_hours=Decimal('10'))
+
+        rows, departments = sprint_capacity(self.sprint)
+
+        ana, beto = sorted(rows, key=lambda row: row.employee.employee_id)
+        self.assertEqual((ana.business_days, ana.absent_days, ana.available_days), (9, 4, 5))
+        self.assertEqual((ana.capacity_hours, ana.assigned_hours), (Decimal('40'), Decimal('50')))
+        self.assertTrue(ana.is_overbooked)
+        self.assertEqual((beto.capacity_hours, beto.assigned_hours), (Decimal('72'), Decimal('0')))
+        self.assertEqual(len(departments), 1)
+        self.assertEqual((departments[0].headcount, departments[0].capacity_hours), (2, Decimal('112')))
+
+    def test_query_count_does_not_grow_with_the_team(self):
+        absence_type = AbsenceType.objects.create(name='Personal', code='PER')
+        for n in range(10):
+            employee = make_employee(f'persona{n}', department=self.department)
+            for start, end in [(date(2026, 3, 3), date(2026, 3, 3)), (date(2026, 3, 9), date(2026, 3, 10))]:
+                Absence.objects.create(employee=employee, absence_type=absence_type, start_date=start, end_date=end)
+        # Con el calendario ya construido: empleados, ausencias, horas y versión de festivos
+        sprint_capacity(self.sprint)
+        with self.assertNumQueries(4):
+            rows, _ = sprint_capacity(self.sprint)
+        self.assertEqual(sorted({row.absent_days for row in rows}), [0, 3])
+
+    def test_view_filters_by_department(self):
+        make_employee('carla', department=Department.objects.create(name='Ventas'))
+        self.client.force_login(self.ana.user)
+        response = self.client.get(
+            reverse('initiatives:sprint_capacity_detail', args=[self.sprint.pk]), {'department': self.department.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['rows']), 2)
+
+
+class ArchiveTests(TestCase):
+    today = date(2026, 10, 19)
+
+    def setUp(self):
+        self.ana = make_employee('ana')
+        self.beto = make_employee('beto')
+        self.quarter = Quarter.objects.create(year=2025, quarter=1)
+        self.initiative = make_initiative(self.ana, quarter=self.quarter, title='Migración', priority='HIGH')
+        self.initiative.collaborators.add(self.beto)
+        self.story = UserStory.objects.create(initiative=self.initiative, title='Historia', description='d', assignee=self.beto)
+        self.task = Task.objects.create(user_story=self.story, title='Tarea', estimated_hours=Decimal('4.50'))
+        InitiativeUpdate.objects.create(
+            initiative=self.initiative, update_type='PROGRESS', title='Avance', description='d', created_by=self.ana.user,
+        )
+        self.operational = make_initiative(self.ana, quarter=self.quarter, title='Respaldo')
+        OperationalTask.objects.create(initiative=self.operational, frequency='WEEKLY', day_of_week=0)
+
+    def test_archive_moves_closed_quarter_and_keeps_operational(self):
+        result = archive_quarter(self.quarter, today=self.today)
+
+        self.assertEqual(result.counts['initiative'], 1)
+        self.assertEqual(result.counts['userstory'], 1)
+        self.assertEqual(result.counts['task'], 1)
+        self.assertEqual(result.counts['initiativeupdate'], 1)
+        self.assertFalse(Initiative.objects.filter(pk=self.initiative.pk).exists())
+        self.assertFalse(Task.objects.filter(pk=self.task.pk).exists())
+        self.assertTrue(Initiative.objects.filter(pk=self.operational.pk).exists())
+        self.assertEqual(ArchivedRecord.objects.filter(initiative_id=self.initiative.pk).count(), 4)
+        self.quarter.refresh_from_db()
+        self.assertTrue(self.quarter.is_archived)
+
+    def test_dry_run_and_open_quarters(self):
+        self.assertEqual(archive_quarter(self.quarter, dry_run=True, today=self.today).counts['initiative'], 1)
+        self.assertFalse(ArchivedRecord.objects.exists())
+
+        with self.assertRaises(ArchiveError):
+            archive_quarter(self.quarter, today=date(2025, 3, 31))
+        current = Quarter.objects.create(year=2026, quarter=4, is_active=True)
+        with self.assertRaises(ArchiveError):
+            archive_quarter(current, today=self.today)
+
+    def test_restore_reinserts_original_rows(self):
+        created_at = Initiative.objects.get(pk=self.initiative.pk).created_at
+        archive_quarter(self.quarter, today=self.today)
+
+        result = restore_quarter(self.quarter)
+
+        self.assertEqual(result.counts['initiative'], 1)
+        initiative = Initiative.objects.get(pk=self.initiative.pk)
+        self.assertEqual(initiative.title, 'Migración')
+        self.assertEqual(initiative.created_at, created_at)
+        self.assertEqual(initiative.priority_rank, priority_rank('HIGH'))
+        self.assertEqual(list(initiative.collaborators.all()), [self.beto])
+        self.assertEqual(Task.objects.get(pk=self.task.pk).estimated_hours, Decimal('4.50'))
+        self.assertEqual(UserStory.objects.get(pk=self.story.pk).assignee, self.beto)
+        self.assertFalse(ArchivedRecord.objects.exists())
+        self.quarter.refresh_from_db()
+        self.assertFalse(self.quarter.is_archived)
+
+    def test_restore_clears_missing_optional_references(self):
+        archive_quarter(self.quarter, today=self.today)
+        self.beto.delete()
+
+        restore_quarter(self.quarter)
+
+        self.assertIsNone(UserStory.objects.get(pk=self.story.pk).assignee)
+        self.assertFalse(Initiative.objects.get(pk=self.initiative.pk).collaborators.exists())
+
+    def test_restore_requires_owner(self):
+        archive_quarter(self.quarter, today=self.today)
+        InitiativeUpdate.objects.filter(created_by=self.ana.user).delete()
+        Initiative.objects.filter(owner=self.ana).delete()
+        self.ana.delete()
+
+        with self.assertRaises(ArchiveError):
+            restore_quarter(self.quarter)
+        self.assertEqual(ArchivedRecord.objects.filter(initiative_id=self.initiative.pk).count(), 4)
+
+
+class PriorityRankTests(TestCase):
+    def setUp(self):
+        self.owner = make_employee()
+
+    def test_default_ordering_follows_rank(self):
+        for priority in ('MEDIUM', 'CRITICAL', 'LOW', 'HIGH'):
+            make_initiative(self.owner, title=priority, priority=priority)
+        self.assertEqual(
+            list(Initiative.objects.values_list('title', flat=True)),
+            ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW'],
+        )
+
+    def test_rank_follows_priority_with_update_fields(self):
+        initiative = make_initiative(self.owner, priority='LOW')
+        story = UserStory.objects.create(initiative=initiative, title='Historia', priority='HIGH')
+        self.assertEqual((initiative.priority_rank, story.priority_rank), (1, 3))
+
+        initiative.priority = 'CRITICAL'
+        initiative.save(update_fields=['priority'])
+        story.priority = 'LOW'
+        story.save(update_fields=['priority'])
+
+        self.assertEqual(Initiative.objects.get(pk=initiative.pk).priority_rank, 4)
+        self.assertEqual(UserStory.objects.get(pk=story.pk).priority_rank, 1)
+
+    def test_admin_sorts_priority_column_by_rank(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        for priority in ('MEDIUM', 'CRITICAL', 'LOW'):
+            make_initiative(self.owner, title=priority, priority=priority)
+
+        # Columna de prioridad (tras la casilla de acciones) en orden ascendente
+        response = self.client.get(reverse('admin:initiatives_initiative_changelist'), {'o': '6'})
+        self.assertEqual([initiative.title for initiative in response.context['cl'].result_list], ['LOW', 'MEDIUM', 'CRITICAL'])
+
+
+class AttachmentTests(TestCase):
+    content = b'contenido de prueba ' * 100
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(ATTACHMENTS_ROOT=root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.owner = make_employee()
+        self.initiative = make_initiative(self.owner)
+        self.story = UserStory.objects.create(initiative=self.initiative, title='Historia')
+        self.task = Task.objects.create(user_story=self.story, title='Tarea')
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def upload(self, target, name='notas.txt', content=None):
+        uploaded = SimpleUploadedFile(name, self.content if content is None else content, content_type='text/plain')
+        return save_uploaded_file(uploaded, target, self.owner.user)
+
+    def test_same_content_is_stored_once(self):
+        first = self.upload(Target(self.initiative.pk))
+        second = self.upload(Target(self.initiative.pk, self.story.pk, self.task.pk), name='copia.txt')
+
+        self.assertEqual(first.blob, second.blob)
+        self.assertEqual(AttachmentBlob.objects.get().sha256, self.sha256)
+        self.assertTrue(blob_path(self.sha256).exists())
+        self.assertEqual(Initiative.objects.get(pk=self.initiative.pk).attachment_count, 1)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).attachment_count, 1)
+
+    def test_download_supports_ranges(self):
+        attachment = self.upload(Target(self.initiative.pk))
+        self.client.force_login(self.owner.user)
+        url = reverse('initiatives:attachment_download', args=[attachment.pk])
+
+        response = self.client.get(url, headers={'Range': 'bytes=0-9'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[:10])
+        self.assertEqual(self.client.get(url, headers={'Range': f'bytes={len(self.content)}-'}).status_code, 416)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': f'"{self.sha256}"'}).status_code, 304)
+
+    def test_chunked_upload_checks_declared_hash(self):
+        target = Target(self.initiative.pk)
+        upload, _ = start_upload(target, 'notas.txt', len(self.content), 'text/plain', self.owner.user, sha256=self.sha256.upper())
+        self.assertIsNone(append_chunk(upload, 0, 1000, io.BytesIO(self.content[:1000])))
+        attachment = append_chunk(upload, 1000, len(self.content) - 1000, io.BytesIO(self.content[1000:]))
+        self.assertEqual(attachment.blob.sha256, self.sha256)
+        self.assertFalse(AttachmentUpload.objects.exists())
+
+        # Contenido conocido: el adjunto se crea sin transferir nada
+        upload, attachment = start_upload(target, 'otra.txt', len(self.content), None, self.owner.user, sha256=self.sha256)
+        self.assertIsNone(upload)
+        self.assertEqual(attachment.content_type, 'text/plain')
+
+        other = b'x' * 10
+        upload, _ = start_upload(target, 'mala.txt', len(other), None, self.owner.user, sha256='0' * 64)
+        with self.assertRaises(AttachmentError):
+            append_chunk(upload, 0, len(other), io.BytesIO(other))
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertEqual(Attachment.objects.count(), 2)
+
+        with self.assertRaises(AttachmentError):
+            start_upload(target, 'mala.txt', 10, None, self.owner.user, sha256='no-es-hash')
+
+    def test_attachments_follow_moved_stories_and_tasks(self):
+        story_attachment = self.upload(Target(self.initiative.pk, self.story.pk))
+        task_attachment = self.upload(Target(self.initiative.pk, self.story.pk, self.task.pk))
+        other = make_initiative(self.owner, title='Otra')
+
+        self.story.initiative = other
+        self.story.save()
+        self.assertEqual(set(Attachment.objects.values_list('initiative_id', flat=True)), {other.pk})
+
+        back = UserStory.objects.create(initiative=self.initiative, title='De vuelta')
+        self.task.user_story = back
+        self.task.save()
+        task_attachment.refresh_from_db()
+        self.assertEqual((task_attachment.initiative_id, task_attachment.user_story_id), (self.initiative.pk, back.pk))
+        story_attachment.refresh_from_db()
+        self.assertEqual((story_attachment.initiative_id, story_attachment.user_story_id), (other.pk, self.story.pk))
+
+    def test_saving_without_moving_leaves_attachments_alone(self):
+        self.upload(Target(self.initiative.pk, self.story.pk, self.task.pk))
+        for instance in (UserStory.objects.get(pk=self.story.pk), Task.objects.get(pk=self.task.pk)):
+            instance.status = 'IN_PROGRESS'
+            with self.captureOnCommitCallbacks(), CaptureQueriesContext(connection) as queries:
+                instance.save()
+            self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "initiatives_attachment"')])
+
+    def test_purge_removes_unused_content(self):
+        attachment = self.upload(Target(self.initiative.pk))
+        attachment.delete()
+        later = timezone.now() + BLOB_GRACE + timedelta(minutes=1)
+
+        self.assertEqual(purge_attachments(dry_run=True, now=later).blobs, 1)
+        self.assertTrue(blob_path(self.sha256).exists())
+        self.assertEqual(purge_attachments(now=timezone.now()).blobs, 0)
+
+        result = purge_attachments(now=later)
+        self.assertEqual((result.blobs, result.bytes), (1, len(self.content)))
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertFalse(blob_path(self.sha256).exists())
+
+    def test_missing_file_is_written_again(self):
+        self.upload(Target(self.initiative.pk))
+        # Como si un purgado hubiera borrado el archivo sin llegar a borrar la fila
+        blob_path(self.sha256).unlink()
+
+        self.upload(Target(self.initiative.pk), name='otra vez.txt')
+        self.assertEqual(AttachmentBlob.objects.count(), 1)
+        self.assertEqual(blob_path(self.sha256).read_bytes(), self.content)
@@ -25,6 +25,11 @@ urlpatterns = [
     path('quarters/edit/<int:pk>/', views.quarter_edit, name='quarter_edit'),
     path('quarters/delete/<int:pk>/', views.quarter_delete, name='quarter_delete'),
     
+    # Archivo de periodos cerrados (solo lectura)
+    path('archive/', views.archive_list, name='archive_list'),
+    path('archive/<int:pk>/', views.archive_quarter, name='archive_quarter'),
+    path('archive/<int:pk>/<int:initiative_id>/', views.archive_initiative, name='archive_initiative'),
+    
     # CRUD Initiative Types
     path('types/', views.initiative_type_list, name='initiative_type_list'),
     path('types/create/', views.initiative_type_create, name='initiative_type_create'),
@@ -36,6 +41,8 @@ urlpatterns = [
     path('sprints/create/', views.sprint_create, name='sprint_create'),
     path('sprints/edit/<int:pk>/', views.sprint_edit, name='sprint_edit'),
     path('sprints/delete/<int:pk>/', views.sprint_delete, name='sprint_delete'),
+    path('sprints/capacity/', views.sprint_capacity, name='sprint_capacity'),
+    path('sprints/capacity/<int:pk>/', views.sprint_capacity, name='sprint_capacity_detail'),
     
     # CRUD Initiative Updates
     path('<int:initiative_pk>/updates/create/', views.initiative_update_create, name='initiative_update_create'),
@@ -52,6 +59,8 @@ urlpatterns = [
     path('operational/edit/<int:pk>/', views.operational_task_edit, name='operational_task_edit'),
     path('operational/delete/<int:pk>/', views.operational_task_delete, name='operational_task_delete'),
     path('operational/mark-executed/<int:pk>/', views.operational_task_mark_executed, name='operational_task_mark_executed'),
+    path('operational/calendar/', views.operational_calendar, name='operational_calendar'),
+    path('operational/calendar.ics', views.operational_calendar_ics, name='operational_calendar_ics'),
     
     # CRUD User Stories
     path('<int:initiative_pk>/stories/create/', views.user_story_create, name='user_story_create'),
@@ -67,6 +76,13 @@ urlpatterns = [
     path('tasks/delete/<int:pk>/', views.task_delete, name='task_delete'),
     path('tasks/quick-create/', views.quick_task_create, name='quick_task_create'),
     
+    # Adjuntos
+    path('attachments/upload/', views.attachment_upload, name='attachment_upload'),
+    path('attachments/uploads/', views.attachment_upload_start, name='attachment_upload_start'),
+    path('attachments/uploads/<uuid:upload_id>/', views.attachment_upload_chunk, name='attachment_upload_chunk'),
+    path('attachments/<int:pk>/', views.attachment_download, name='attachment_download'),
+    path('attachments/delete/<int:pk>/', views.attachment_delete, name='attachment_delete'),
+    
     # Vistas auxiliares AJAX
     path('change-status/<int:pk>/', views.initiative_change_status, name='initiative_change_status'),
     path('stories/change-status/<int:pk>/', views.user_story_change_status, name='user_story_change_status'),
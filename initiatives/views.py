@@ -3,19 +3,34 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, Count, Avg
 from django.urls import reverse
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_http_methods
+from django.db import transaction
 from datetime import date, timedelta
 from .models import (
     Initiative, Quarter, Sprint, InitiativeUpdate, 
     InitiativeMetric, OperationalTask, InitiativeType,
-    UserStory, Task
+    UserStory, Task, OperationalOwnerCompliance, ArchivedRecord,
+    Attachment, AttachmentUpload
 )
+from team.departments import departments_with_counts, parse_department
+from team.hierarchy import reporting_scope
 from team.models import Employee
+from activity.feed import feed_page
+from activity.models import ActivityEvent
+from boss_core.dependencies import Relation, inspect_dependencies
+from boss_core.exports import EXPORT_FORMATS, export_response, full_name, local_time
+from .attachments import (
+    UPLOAD_CHUNK_SIZE, AttachmentError, ChunkOffsetError, Target, append_chunk,
+    attachment_response, direct_attachments, parse_content_range, resolve_target,
+    save_uploaded_file, start_upload
+)
+from .capacity import sprint_capacity as compute_sprint_capacity
+from .compliance import already_executed, build_execution, build_missed_execution, execution_slot, record_executions
 from .forms import (
     InitiativeForm, QuarterForm, InitiativeTypeForm, SprintForm,
-    OperationalTaskForm, InitiativeUpdateForm, InitiativeMetricForm,
-    QuickInitiativeForm, UserStoryForm, TaskForm, QuickUserStoryForm, QuickTaskForm
+    OperationalTaskForm, OperationalTaskExecutionForm, InitiativeUpdateForm,
+    InitiativeMetricForm, QuickInitiativeForm, UserStoryForm, TaskForm, QuickUserStoryForm, QuickTaskForm
 )
 
 
@@ -24,12 +39,14 @@ def initiatives_dashboard(request):
     """Dashboard principal del módulo de iniciativas"""
     # Obtener Q activo
     active_quarter = Quarter.objects.filter(is_active=True).first()
+    # ?scope=mine: iniciativas cuyo responsable está a cargo del usuario
+    scope = reporting_scope(request)
     
     if active_quarter:
         # Iniciativas del Q activo
-        initiatives = Initiative.objects.filter(
+        initiatives = scope.apply(Initiative.objects.filter(
             quarter=active_quarter
-        ).select_related('owner', 'initiative_type')
+        ), employee_field='owner').select_related('owner', 'initiative_type')
         
         # Estadísticas
         stats = {
@@ -47,10 +64,12 @@ def initiatives_dashboard(request):
             is_active=True
         ).first()
         
-        # Actualizaciones recientes
-        recent_updates = InitiativeUpdate.objects.filter(
-            initiative__quarter=active_quarter
-        ).select_related('initiative', 'created_by')[:10]
+        # Actividad reciente de las iniciativas del Q
+        recent_activity, _ = feed_page(
+            limit=10, queryset=scope.apply(
+                ActivityEvent.objects.filter(initiative__quarter=active_quarter), employee_field='initiative__owner'
+            )
+        )
         
     else:
         initiatives = Initiative.objects.none()
@@ -63,63 +82,111 @@ def initiatives_dashboard(request):
             'avg_progress': 0,
         }
         active_sprint = None
-        recent_updates = []
+        recent_activity = []
     
     context = {
+        'scope': scope,
         'active_quarter': active_quarter,
         'initiatives': initiatives[:10],  # Últimas 10
         'stats': stats,
         'active_sprint': active_sprint,
-        'recent_updates': recent_updates,
+        'recent_activity': recent_activity,
     }
     
     return render(request, 'initiatives/dashboard.html', context)
 
 
-@login_required
-def initiative_list(request):
-    """Lista de iniciativas"""
-    queryset = Initiative.objects.select_related('owner', 'initiative_type', 'quarter')
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _filter_initiatives(request):
+    """Aplica los filtros de la lista de iniciativas; devuelve (queryset, filtros)"""
+    scope = reporting_scope(request)
+    queryset = scope.apply(
+        Initiative.objects.select_related('owner', 'initiative_type', 'quarter'), employee_field='owner'
+    )
     
-    # Filtros
-    quarter_id = request.GET.get('quarter', '')
-    status = request.GET.get('status', '')
-    priority = request.GET.get('priority', '')
-    owner_id = request.GET.get('owner', '')
-    initiative_type_id = request.GET.get('type', '')
-    search = request.GET.get('search', '')
+    filters = {
+        'scope': scope,
+        'quarter': request.GET.get('quarter', ''),
+        'status': request.GET.get('status', ''),
+        'priority': request.GET.get('priority', ''),
+        'owner': request.GET.get('owner', ''),
+        'type': request.GET.get('type', ''),
+        'search': request.GET.get('search', ''),
+    }
     
-    if quarter_id:
-        queryset = queryset.filter(quarter_id=quarter_id)
+    if filters['quarter']:
+        queryset = queryset.filter(quarter_id=filters['quarter'])
     else:
         # Por defecto mostrar Q activo
         active_quarter = Quarter.objects.filter(is_active=True).first()
         if active_quarter:
             queryset = queryset.filter(quarter=active_quarter)
     
-    if status:
-        queryset = queryset.filter(status=status)
+    if filters['status']:
+        queryset = queryset.filter(status=filters['status'])
     
-    if priority:
-        queryset = queryset.filter(priority=priority)
+    if filters['priority']:
+        queryset = queryset.filter(priority=filters['priority'])
     
-    if owner_id:
-        queryset = queryset.filter(owner_id=owner_id)
+    if filters['owner']:
+        queryset = queryset.filter(owner_id=filters['owner'])
     
-    if initiative_type_id:
-        queryset = queryset.filter(initiative_type_id=initiative_type_id)
+    if filters['type']:
+        queryset = queryset.filter(initiative_type_id=filters['type'])
     
-    if search:
+    if filters['search']:
         queryset = queryset.filter(
-            Q(title__icontains=search) |
-            Q(description__icontains=search)
+            Q(title__icontains=filters['search']) |
+            Q(description__icontains=filters['search'])
+        )
+    
+    return queryset, filters
+
+
+def _initiative_export_rows(initiatives):
+    status_labels = dict(Initiative.STATUS_CHOICES)
+    priority_labels = dict(Initiative.PRIORITY_CHOICES)
+    rows = initiatives.order_by('-priority_rank', '-created_at', 'pk').values_list(
+        'pk', 'title', 'initiative_type__name', 'owner__user__first_name', 'owner__user__last_name',
+        'quarter__year', 'quarter__quarter', 'status', 'priority', 'progress',
+        'start_date', 'target_date', 'completion_date',
+    )
+    for (pk, title, type_name, first_name, last_name, year, quarter, status, priority,
+         progress, start_date, target_date, completion_date) in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            pk, title, type_name, full_name(first_name, last_name), f'Q{quarter} {year}',
+            status_labels.get(status, status), priority_labels.get(priority, priority), progress,
+            start_date, target_date, completion_date,
+        ]
+
+
+@login_required
+def initiative_list(request):
+    """Lista de iniciativas"""
+    queryset, filters = _filter_initiatives(request)
+    
+    export = request.GET.get('export')
+    if export in EXPORT_FORMATS:
+        return export_response(
+            export, 'iniciativas',
+            ['ID', 'Título', 'Tipo', 'Responsable', 'Periodo', 'Estado', 'Prioridad', 'Progreso (%)',
+             'Inicio', 'Fecha Objetivo', 'Completada'],
+            _initiative_export_rows(queryset),
+            sheet_title='Iniciativas',
         )
     
     # Datos para filtros
     quarters = Quarter.objects.all().order_by('-year', '-quarter')
-    employees = Employee.objects.filter(is_active=True).select_related('user')
+    employees = filters['scope'].apply(
+        Employee.objects.filter(is_active=True), employee_field=None
+    ).select_related('user')
     initiative_types = InitiativeType.objects.all()
     
+    query_params = request.GET.copy()
+    query_params.pop('export', None)
+    
     context = {
         'initiatives': queryset,
         'quarters': quarters,
@@ -127,12 +194,14 @@ def initiative_list(request):
         'initiative_types': initiative_types,
         'status_choices': Initiative.STATUS_CHOICES,
         'priority_choices': Initiative.PRIORITY_CHOICES,
-        'selected_quarter': quarter_id,
-        'selected_status': status,
-        'selected_priority': priority,
-        'selected_owner': owner_id,
-        'selected_type': initiative_type_id,
-        'search': search,
+        'scope': filters['scope'],
+        'selected_quarter': filters['quarter'],
+        'selected_status': filters['status'],
+        'selected_priority': filters['priority'],
+        'selected_owner': filters['owner'],
+        'selected_type': filters['type'],
+        'search': filters['search'],
+        'query_string': query_params.urlencode(),
         'today': date.today(),
     }
     
@@ -151,7 +220,7 @@ def initiative_detail(request, pk):
     metrics = initiative.metrics.all().order_by('metric_name')
     
     # Historias de usuario
-    user_stories = initiative.user_stories.all().select_related('assignee', 'sprint').order_by('-priority', '-created_at')
+    user_stories = initiative.user_stories.all().select_related('assignee', 'sprint').order_by('-priority_rank', '-created_at')
     
     # Estadísticas de historias de usuario
     story_stats = {
@@ -178,6 +247,7 @@ def initiative_detail(request, pk):
         'user_stories': user_stories,
         'story_stats': story_stats,
         'operational_details': operational_details,
+        'attachments': direct_attachments(Attachment.objects.all(), initiative=initiative),
         'today': date.today(),
     }
     
@@ -188,7 +258,7 @@ def initiative_detail(request, pk):
 def operational_tasks(request):
     """Vista de tareas operativas"""
     tasks = OperationalTask.objects.select_related(
-        'initiative', 'initiative__owner'
+        'initiative', 'initiative__owner', 'initiative__owner__user', 'compliance'
     ).order_by('frequency', 'initiative__title')
     
     # Filtros
@@ -209,11 +279,18 @@ def operational_tasks(request):
             tasks_by_frequency[freq] = []
         tasks_by_frequency[freq].append(task)
     
+    # Cumplimiento por responsable (resúmenes precalculados)
+    owner_ids = {task.initiative.owner_id for group in tasks_by_frequency.values() for task in group}
+    owner_compliance = OperationalOwnerCompliance.objects.filter(
+        owner_id__in=owner_ids
+    ).select_related('owner__user').order_by('owner__user__first_name')
+    
     # Datos para filtros
     employees = Employee.objects.filter(is_active=True).select_related('user')
     
     context = {
         'tasks_by_frequency': tasks_by_frequency,
+        'owner_compliance': owner_compliance,
         'frequency_choices': OperationalTask.FREQUENCY_CHOICES,
         'employees': employees,
         'selected_frequency': frequency,
@@ -224,6 +301,130 @@ def operational_tasks(request):
     return render(request, 'initiatives/operational_tasks.html', context)
 
 
+def _query_date(request, name):
+    """Fecha ISO del querystring, o None si falta o no es una fecha válida"""
+    from django.utils.dateparse import parse_date
+    
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        # Formato correcto pero fecha inexistente (2026-13-45)
+        return None
+
+
+def _query_id(request, name):
+    """ID numérico del querystring, o '' si falta o no es válido"""
+    value = request.GET.get(name, '')
+    return value if value.isdigit() else ''
+
+
+def _projection_range(request):
+    """Rango de proyección: fechas explícitas o el Q seleccionado/activo"""
+    from datetime import datetime, time
+    from django.utils import timezone
+    
+    quarter = None
+    quarter_id = _query_id(request, 'quarter')
+    if quarter_id:
+        quarter = Quarter.objects.filter(pk=quarter_id).first()
+    if quarter is None:
+        quarter = Quarter.objects.filter(is_active=True).first()
+    
+    today = timezone.localdate()
+    start_day = _query_date(request, 'start') or (quarter.start_date if quarter else today)
+    end_day = _query_date(request, 'end') or (quarter.end_date if quarter else today + timedelta(days=90))
+    
+    start = timezone.make_aware(datetime.combine(start_day, time.min))
+    end = timezone.make_aware(datetime.combine(end_day, time.max))
+    return quarter, start, end
+
+
+@login_required
+def operational_calendar(request):
+    """Calendario proyectado de ejecuciones de tareas operativas (paginado)"""
+    from django.utils import timezone
+    from .projection import projected_tasks, project_occurrences, paginate_occurrences
+    
+    quarter, start, end = _projection_range(request)
+    frequency = request.GET.get('frequency', '')
+    owner_id = _query_id(request, 'owner')
+    
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+        page_size = min(500, max(1, int(request.GET.get('page_size', 100))))
+    except ValueError:
+        page, page_size = 1, 100
+    
+    occurrences = project_occurrences(projected_tasks(frequency, owner_id), start, end)
+    page_items, has_next = paginate_occurrences(occurrences, page, page_size)
+    
+    # Agrupar la página por día
+    occurrences_by_day = {}
+    for occurrence in page_items:
+        day = timezone.localtime(occurrence.start).date()
+        occurrences_by_day.setdefault(day, []).append(occurrence)
+    
+    query = request.GET.copy()
+    query.pop('page', None)
+    
+    context = {
+        'quarter': quarter,
+        'quarters': Quarter.objects.all().order_by('-year', '-quarter'),
+        'start': start,
+        'end': end,
+        'occurrences_by_day': occurrences_by_day,
+        'page': page,
+        'page_size': page_size,
+        'has_next': has_next,
+        'has_previous': page > 1,
+        'query_string': query.urlencode(),
+        'frequency_choices': OperationalTask.FREQUENCY_CHOICES,
+        'employees': Employee.objects.filter(is_active=True).select_related('user'),
+        'selected_frequency': frequency,
+        'selected_owner': owner_id,
+        'today': date.today(),
+    }
+    
+    return render(request, 'initiatives/operational_calendar.html', context)
+
+
+@login_required
+def operational_calendar_ics(request):
+    """Feed iCalendar con las ejecuciones proyectadas de tareas operativas"""
+    from django.http import StreamingHttpResponse
+    from boss_core.ical import iter_calendar
+    from .projection import projected_tasks, project_occurrences, occurrence_events
+    
+    quarter, start, end = _projection_range(request)
+    tasks = projected_tasks(request.GET.get('frequency', ''), _query_id(request, 'owner'))
+    events = occurrence_events(project_occurrences(tasks, start, end))
+    
+    response = StreamingHttpResponse(
+        iter_calendar(events, 'BOSS - Tareas Operativas'),
+        content_type='text/calendar; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'attachment; filename="tareas_operativas.ics"'
+    return response
+
+
+def _task_export_rows(tasks):
+    status_labels = dict(Task.STATUS_CHOICES)
+    type_labels = dict(Task.TASK_TYPE_CHOICES)
+    rows = tasks.order_by('status', '-created_at', 'pk').values_list(
+        'pk', 'title', 'task_type', 'status', 'user_story_id', 'user_story__title', 'user_story__initiative__title',
+        'assignee__user__first_name', 'assignee__user__last_name',
+        'estimated_hours', 'actual_hours', 'created_at', 'completed_at',
+    )
+    for (pk, title, task_type, status, story_id, story_title, initiative_title, first_name, last_name,
+         estimated, actual, created_at, completed_at) in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            pk, title, type_labels.get(task_type, task_type), status_labels.get(status, status),
+            f'US-{story_id}: {story_title}', initiative_title,
+            full_name(first_name or '', last_name or ''), estimated, actual,
+            local_time(created_at), local_time(completed_at),
+        ]
+
+
 @login_required
 def sprint_board(request):
     """Tablero de sprint (estilo Monday.com)"""
@@ -234,6 +435,16 @@ def sprint_board(request):
     else:
         active_sprint = Sprint.objects.filter(is_active=True).first()
     
+    export = request.GET.get('export')
+    if export in EXPORT_FORMATS and active_sprint:
+        return export_response(
+            export, f'tareas_{active_sprint.name}'.replace(' ', '_'),
+            ['ID', 'Tarea', 'Tipo', 'Estado', 'Historia', 'Iniciativa', 'Asignado a',
+             'Horas Estimadas', 'Horas Reales', 'Creada', 'Completada'],
+            _task_export_rows(Task.objects.filter(user_story__sprint=active_sprint)),
+            sheet_title=active_sprint.name,
+        )
+    
     # Obtener todos los sprints para el dropdown
     sprints = Sprint.objects.select_related('quarter').order_by('-quarter__year', '-quarter__quarter', '-sprint_number')
     
@@ -247,7 +458,7 @@ def sprint_board(request):
             'user_story__initiative', 
             'assignee__user', 
             'user_story__initiative__initiative_type'
-        ).order_by('status', '-created_at')
+        ).order_by('status', '-user_story__priority_rank', '-created_at')
         
         tasks_by_sprint[active_sprint] = tasks
         
@@ -296,6 +507,39 @@ def sprint_board(request):
     return render(request, 'initiatives/sprint_board.html', context)
 
 
+@login_required
+def sprint_capacity(request, pk=None):
+    """Capacidad libre por persona y por departamento en un sprint"""
+    pk = pk or request.GET.get('sprint')
+    if pk:
+        sprint = get_object_or_404(Sprint.objects.select_related('quarter'), pk=pk)
+    else:
+        sprint = Sprint.objects.filter(is_active=True).select_related('quarter').first()
+    
+    sprints = Sprint.objects.select_related('quarter').order_by('-quarter__year', '-quarter__quarter', '-sprint_number')
+    departments = departments_with_counts()
+    department_id = parse_department(request.GET.get('department'))
+    selected_department = next((d for d in departments if d.pk == department_id), None)
+    
+    rows, department_rows = [], []
+    if sprint:
+        rows, department_rows = compute_sprint_capacity(sprint, department=department_id)
+    
+    context = {
+        'sprint': sprint,
+        'sprints': sprints,
+        'departments': departments,
+        'selected_department': selected_department,
+        'rows': rows,
+        'department_rows': department_rows,
+        'total_capacity': sum(row.capacity_hours for row in rows),
+        'total_assigned': sum(row.assigned_hours for row in rows),
+        'total_free': sum(row.free_hours for row in rows),
+    }
+    
+    return render(request, 'initiatives/sprint_capacity.html', context)
+
+
 @login_required
 def quarter_summary(request, pk=None):
     """Resumen del Quarter"""
@@ -553,12 +797,20 @@ def quarter_delete(request, pk):
     """Eliminar quarter"""
     quarter = get_object_or_404(Quarter, pk=pk)
     
-    # Verificar si el quarter tiene iniciativas
-    initiatives_count = quarter.initiative_set.count()
+    # Verificar si el quarter tiene iniciativas (y cuántos sprints se eliminarán)
+    dependencies = inspect_dependencies(quarter, [
+        Relation('initiatives', Initiative.objects.all(), 'quarter', blocking=True,
+                 message='tiene {count} iniciativa(s) asociada(s)'),
+        Relation('sprints', Sprint.objects.all(), 'quarter',
+                 message='Se eliminarán {count} sprint(s)'),
+        Relation('archived', ArchivedRecord.objects.all(), 'quarter', blocking=True,
+                 message='tiene {count} registro(s) en el archivo'),
+    ])
+    initiatives_count = dependencies.counts['initiatives']
     
     if request.method == 'POST':
-        if initiatives_count > 0:
-            messages.error(request, f'No se puede eliminar {quarter} porque tiene {initiatives_count} iniciativas asociadas.')
+        if not dependencies.can_delete:
+            messages.error(request, f'No se puede eliminar {quarter} porque {"; ".join(dependencies.blocking_reasons)}.')
             return redirect('initiatives:quarter_list')
         
         quarter_name = str(quarter)
@@ -568,7 +820,95 @@ def quarter_delete(request, pk):
     
     return render(request, 'initiatives/quarter_confirm_delete.html', {
         'quarter': quarter,
-        'initiatives_count': initiatives_count
+        'initiatives_count': initiatives_count,
+        'dependencies': dependencies,
+    })
+
+
+# ============================================================================
+# ARCHIVO DE PERIODOS CERRADOS (SOLO LECTURA)
+# ============================================================================
+
+@login_required
+def archive_list(request):
+    """Periodos archivados con el número de registros por modelo"""
+    from .archive import archive_overview
+
+    return render(request, 'initiatives/archive_list.html', {
+        'quarters': archive_overview(),
+    })
+
+
+@login_required
+def archive_quarter(request, pk):
+    """Iniciativas archivadas de un periodo"""
+    from django.core.paginator import Paginator
+    from .archive import archived_initiatives, with_display
+
+    quarter = get_object_or_404(Quarter, pk=pk)
+    records, children = archived_initiatives(quarter)
+
+    search = request.GET.get('search', '').strip()
+    if search:
+        records = records.filter(label__icontains=search)
+
+    page_obj = Paginator(records.only('object_id', 'data'), 50).get_page(request.GET.get('page'))
+    owners = Employee.objects.select_related('user').in_bulk(
+        {record.data['owner_id'] for record in page_obj}
+    )
+    rows = [{
+        'initiative': with_display('initiative', record.data),
+        'owner': owners.get(record.data['owner_id']),
+        'children': children.get(record.object_id, 0),
+    } for record in page_obj]
+
+    return render(request, 'initiatives/archive_quarter.html', {
+        'quarter': quarter,
+        'rows': rows,
+        'page_obj': page_obj,
+        'search': search,
+    })
+
+
+@login_required
+def archive_initiative(request, pk, initiative_id):
+    """Copia archivada de una iniciativa con sus historias, tareas, actualizaciones, métricas y adjuntos"""
+    from .archive import archived_initiative, with_display
+
+    quarter = get_object_or_404(Quarter, pk=pk)
+    grouped = archived_initiative(quarter, initiative_id)
+    if grouped is None:
+        raise Http404('La iniciativa no está en el archivo de este periodo.')
+
+    for key, rows in grouped.items():
+        for data in rows:
+            with_display(key, data)
+    initiative = grouped['initiative'][0]
+
+    employee_ids = {initiative['owner_id'], *initiative.get('_collaborators', [])}
+    employee_ids.update(data['assignee_id'] for key in ('userstory', 'task') for data in grouped[key] if data['assignee_id'])
+    employees = Employee.objects.select_related('user').in_bulk(employee_ids)
+
+    tasks_by_story = {}
+    for data in grouped['task']:
+        data['assignee'] = employees.get(data['assignee_id'])
+        tasks_by_story.setdefault(data['user_story_id'], []).append(data)
+    stories = []
+    for data in grouped['userstory']:
+        data['assignee'] = employees.get(data['assignee_id'])
+        data['tasks'] = tasks_by_story.get(data['id'], [])
+        stories.append(data)
+
+    return render(request, 'initiatives/archive_initiative.html', {
+        'quarter': quarter,
+        'initiative': initiative,
+        'initiative_type': InitiativeType.objects.filter(pk=initiative['initiative_type_id']).first(),
+        'owner': employees.get(initiative['owner_id']),
+        'collaborators': [employees[pk] for pk in initiative.get('_collaborators', []) if pk in employees],
+        'stories': stories,
+        'updates': grouped['initiativeupdate'],
+        'metrics': grouped['initiativemetric'],
+        'attachments': grouped['attachment'],
     })
 
 
@@ -646,7 +986,11 @@ def initiative_type_delete(request, pk):
     initiative_type = get_object_or_404(InitiativeType, pk=pk)
     
     # Verificar si el tipo está siendo usado
-    initiatives_count = initiative_type.initiative_set.count()
+    dependencies = inspect_dependencies(initiative_type, [
+        Relation('initiatives', Initiative.objects.all(), 'initiative_type', blocking=True,
+                 message='está siendo usado en {count} iniciativa(s)'),
+    ])
+    initiatives_count = dependencies.counts['initiatives']
     
     if request.method == 'POST':
         if initiatives_count > 0:
@@ -660,7 +1004,8 @@ def initiative_type_delete(request, pk):
     
     return render(request, 'initiatives/initiative_type_confirm_delete.html', {
         'initiative_type': initiative_type,
-        'initiatives_count': initiatives_count
+        'initiatives_count': initiatives_count,
+        'dependencies': dependencies,
     })
 
 
@@ -970,19 +1315,46 @@ def operational_task_delete(request, pk):
 @require_http_methods(["POST"])
 def operational_task_mark_executed(request, pk):
     """Marcar tarea operativa como ejecutada (AJAX)"""
-    task = get_object_or_404(OperationalTask, pk=pk)
-    
-    # Actualizar última ejecución
-    from datetime import datetime
-    task.last_execution = datetime.now()
-    task.next_execution = task.calculate_next_execution()
-    task.save()
+    from django.utils import timezone
+    
+    # Duración reportada (opcional)
+    form = OperationalTaskExecutionForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'message': 'Duración no válida', 'errors': form.errors})
+    duration_hours = form.cleaned_data['duration_hours']
+    
+    with transaction.atomic():
+        # Bloqueada: un doble clic o el planificador esperan a que termine
+        task = get_object_or_404(OperationalTask.objects.select_for_update().select_related('initiative'), pk=pk)
+        now = timezone.now()
+        if already_executed(task, now):
+            return JsonResponse({
+                'success': False,
+                'message': f'La ejecución de "{task.initiative.title}" ya fue registrada.',
+            })
+        
+        # Registrar la ejecución contra la ocurrencia vigente y las perdidas entre tanto
+        scheduled_for, missed = execution_slot(task, now)
+        execution = build_execution(
+            task, now, scheduled_for=scheduled_for,
+            executed_by=request.user, duration_hours=duration_hours
+        )
+        
+        # Si se ejecuta antes de lo programado, cuenta como la ejecución programada
+        after = max(now, scheduled_for) if scheduled_for else now
+        task.last_execution = now
+        task.next_execution = task.calculate_next_execution(after=after)
+        
+        task.save(update_fields=['last_execution', 'next_execution'])
+        record_executions([build_missed_execution(task, slot) for slot in missed] + [execution])
     
     return JsonResponse({
         'success': True,
         'message': f'Tarea de "{task.initiative.title}" marcada como ejecutada.',
-        'last_execution': task.last_execution.strftime('%d/%m/%Y %H:%M') if task.last_execution else None,
-        'next_execution': task.next_execution.strftime('%d/%m/%Y %H:%M') if task.next_execution else None
+        'status': execution.get_status_display(),
+        'is_on_time': execution.is_on_time,
+        'last_execution': timezone.localtime(task.last_execution).strftime('%d/%m/%Y %H:%M') if task.last_execution else None,
+        'next_execution': timezone.localtime(task.next_execution).strftime('%d/%m/%Y %H:%M') if task.next_execution else None
     })
 
 
@@ -1073,6 +1445,7 @@ def user_story_detail(request, pk):
         'user_story': user_story,
         'tasks': tasks,
         'task_stats': task_stats,
+        'attachments': direct_attachments(Attachment.objects.all(), user_story=user_story),
         'today': date.today(),
     }
     
@@ -1222,6 +1595,7 @@ def task_detail(request, pk):
         'initiative': user_story.initiative,
         'total_tasks': total_tasks,
         'completed_tasks': completed_tasks,
+        'attachments': direct_attachments(Attachment.objects.all(), task=task),
         'today': date.today(),
     }
     
@@ -1324,4 +1698,136 @@ def task_change_status(request, pk):
     return JsonResponse({
         'success': False,
         'message': 'Estado no válido'
-    })
\ No newline at end of file
+    })
+
+
+# ============================================================================
+# ADJUNTOS
+# ============================================================================
+
+def _target_url(target):
+    """Detalle del registro dueño de un adjunto"""
+    if target.task_id:
+        return reverse('initiatives:task_detail', args=[target.task_id])
+    if target.user_story_id:
+        return reverse('initiatives:user_story_detail', args=[target.user_story_id])
+    return reverse('initiatives:initiative_detail', args=[target.initiative_id])
+
+
+def _attachment_data(attachment):
+    return {
+        'id': attachment.pk,
+        'filename': attachment.filename,
+        'size': attachment.blob.size,
+        'url': reverse('initiatives:attachment_download', args=[attachment.pk]),
+    }
+
+
+def _upload_data(upload=None, attachment=None):
+    """Estado de una subida por partes para el cliente"""
+    if attachment:
+        return {'complete': True, 'attachment': _attachment_data(attachment)}
+    return {
+        'complete': False,
+        'id': str(upload.pk),
+        'url': reverse('initiatives:attachment_upload_chunk', args=[upload.pk]),
+        'received': upload.received,
+        'size': upload.size,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+    }
+
+
+@login_required
+@require_http_methods(["POST"])
+def attachment_upload(request):
+    """Subir uno o varios adjuntos desde el formulario"""
+    try:
+        target = resolve_target(request.POST.get('initiative'), request.POST.get('user_story'), request.POST.get('task'))
+    except AttachmentError as e:
+        messages.error(request, str(e))
+        return redirect('initiatives:initiative_list')
+
+    files = request.FILES.getlist('files')
+    if not files:
+        messages.error(request, 'Seleccione al menos un archivo.')
+    saved = 0
+    for uploaded in files:
+        try:
+            save_uploaded_file(uploaded, target, request.user)
+            saved += 1
+        except AttachmentError as e:
+            messages.error(request, str(e))
+    if saved:
+        messages.success(request, f'{saved} adjunto(s) agregado(s) exitosamente.')
+    return redirect(_target_url(target))
+
+
+@login_required
+@require_http_methods(["POST"])
+def attachment_upload_start(request):
+    """Iniciar una subida por partes (AJAX); si el contenido ya existe el adjunto se crea al instante"""
+    try:
+        target = resolve_target(request.POST.get('initiative'), request.POST.get('user_story'), request.POST.get('task'))
+        upload, attachment = start_upload(
+            target,
+            request.POST.get('filename'),
+            request.POST.get('size'),
+            request.POST.get('content_type'),
+            request.user,
+            sha256=request.POST.get('sha256'),
+        )
+    except AttachmentError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({'success': True, **_upload_data(upload, attachment)}, status=201)
+
+
+@login_required
+@require_http_methods(["GET", "PUT", "POST"])
+def attachment_upload_chunk(request, upload_id):
+    """
+    Subida por partes (AJAX). GET devuelve los bytes recibidos para reanudar;
+    PUT agrega la parte indicada en Content-Range, leyendo el cuerpo por
+    bloques sin cargarlo entero en memoria.
+    """
+    upload = get_object_or_404(AttachmentUpload, pk=upload_id, uploaded_by=request.user)
+    if request.method == 'GET':
+        return JsonResponse({'success': True, **_upload_data(upload)})
+
+    try:
+        start, end, total = parse_content_range(request.headers.get('Content-Range'))
+        if total != upload.size:
+            raise AttachmentError('El total de Content-Range no coincide con el tamaño del archivo.')
+        attachment = append_chunk(upload, start, end - start + 1, request)
+    except ChunkOffsetError as e:
+        return JsonResponse({'success': False, 'message': str(e), 'received': e.received}, status=409)
+    except AttachmentError as e:
+        return JsonResponse({'success': False, 'message': str(e), 'received': upload.received}, status=400)
+    return JsonResponse({'success': True, **_upload_data(upload, attachment)})
+
+
+def _attachment_etag(request, pk):
+    # El contenido de un adjunto no cambia: su hash sirve como ETag
+    return Attachment.objects.filter(pk=pk).values_list('blob__sha256', flat=True).first()
+
+
+@login_required
+@condition(etag_func=_attachment_etag)
+def attachment_download(request, pk):
+    """Descargar adjunto (admite Range para reanudar descargas)"""
+    attachment = get_object_or_404(Attachment.objects.select_related('blob'), pk=pk)
+    try:
+        return attachment_response(request, attachment)
+    except FileNotFoundError:
+        raise Http404('El contenido del adjunto no está disponible.')
+
+
+@login_required
+@require_http_methods(["POST"])
+def attachment_delete(request, pk):
+    """Eliminar adjunto (el contenido se libera con purge_attachments)"""
+    attachment = get_object_or_404(Attachment, pk=pk)
+    target = Target(attachment.initiative_id, attachment.user_story_id, attachment.task_id)
+    filename = attachment.filename
+    attachment.delete()
+    messages.success(request, f'Adjunto "{filename}" eliminado exitosamente.')
+    return redirect(_target_url(target))
@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'dedupe_key', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedupe_key']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'last_error']
+    actions = ['retry_jobs']
+    
+    @admin.action(description='Reintentar trabajos fallidos seleccionados')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status='FAILED').update(
+            status='PENDING', attempts=0, run_after=timezone.now()
+        )
+        self.message_user(request, f'{updated} trabajo(s) devuelto(s) a la cola.')
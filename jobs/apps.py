@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = 'Cola de Trabajos'
+    
+    def ready(self):
+        # Registrar los trabajos definidos en el módulo jobs.py de cada app
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('jobs')
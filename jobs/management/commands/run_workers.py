@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import claim_jobs, execute_job, requeue_stale_jobs
+
+
+def _init_worker_process():
+    # Necesario cuando el sistema crea procesos con 'spawn' en lugar de 'fork'
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos encolados con un pool de hilos o procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Número de workers concurrentes')
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread', help='Tipo de pool')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos de espera cuando no hay trabajos')
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help='Segundos tras los que un trabajo en ejecución se considera abandonado')
+        parser.add_argument('--once', action='store_true', help='Vaciar la cola y terminar')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        requeued = requeue_stale_jobs(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f'{requeued} trabajo(s) abandonado(s) devuelto(s) a la cola')
+
+        if options['mode'] == 'process':
+            # Los procesos hijos no deben heredar conexiones abiertas
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_process)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+        self.stdout.write(f'Workers iniciados ({workers} {options["mode"]}) - Ctrl+C para detener')
+        running = set()
+        done = failed = 0
+        try:
+            while True:
+                free_slots = workers - len(running)
+                if free_slots > 0:
+                    for job_id in claim_jobs(free_slots):
+                        running.add(executor.submit(execute_job, job_id))
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                finished, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo workers...')
+        finally:
+            executor.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Trabajos completados: {done}, con error: {failed}'))
@@ -0,0 +1,44 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Trabajo diferido almacenado en base de datos"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('RUNNING', 'En Ejecución'),
+        ('DONE', 'Terminado'),
+        ('FAILED', 'Fallido'),
+    ]
+    
+    name = models.CharField(max_length=100, verbose_name='Trabajo')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Parámetros')
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True, verbose_name='Clave de Deduplicación')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', verbose_name='Estado')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name='Máximo de Intentos')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Ejecutar después de')
+    last_error = models.TextField(blank=True, verbose_name='Último Error')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Iniciado el')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Terminado el')
+    
+    class Meta:
+        verbose_name = 'Trabajo'
+        verbose_name_plural = 'Trabajos'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        constraints = [
+            # Solo puede haber un trabajo pendiente por clave: los duplicados se colapsan
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=Q(status='PENDING'),
+                name='unique_pending_job_dedupe_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,173 @@
+"""
+API de la cola de trabajos.
+
+Uso:
+    from jobs.queue import job, enqueue
+
+    @job('initiatives.update_initiative_progress')
+    def update_initiative_progress(initiative_id):
+        ...
+
+    enqueue('initiatives.update_initiative_progress', {'initiative_id': 42},
+            dedupe_key='initiative-progress:42')
+
+Los trabajos pendientes con la misma `dedupe_key` se colapsan en uno solo.
+Con `JOBS_EAGER = True` los trabajos se ejecutan en línea (útil en pruebas).
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job(name):
+    """Decorador que registra una función como trabajo ejecutable por los workers"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_job_function(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'Trabajo no registrado: {name}')
+
+
+def enqueue(name, payload=None, dedupe_key=None, delay=None, max_attempts=None):
+    """
+    Encola un trabajo y devuelve el registro Job (el existente si se colapsó
+    con uno pendiente). En modo eager lo ejecuta de inmediato y devuelve None.
+    """
+    payload = payload or {}
+    get_job_function(name)
+
+    if getattr(settings, 'JOBS_EAGER', False):
+        get_job_function(name)(**payload)
+        return None
+
+    if dedupe_key:
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status='PENDING').first()
+        if existing:
+            return existing
+
+    fields = {
+        'name': name,
+        'payload': payload,
+        'dedupe_key': dedupe_key,
+        'run_after': timezone.now() + (delay or timedelta()),
+    }
+    if max_attempts:
+        fields['max_attempts'] = max_attempts
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(**fields)
+    except IntegrityError:
+        # Otro proceso encoló el mismo trabajo entre la consulta y la inserción
+        return Job.objects.filter(dedupe_key=dedupe_key, status='PENDING').first()
+
+
+def retry_delay(attempts):
+    """Backoff exponencial: base, 2*base, 4*base... con tope"""
+    base = getattr(settings, 'JOBS_RETRY_BACKOFF_SECONDS', 30)
+    cap = getattr(settings, 'JOBS_RETRY_BACKOFF_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+
+def claim_jobs(limit):
+    """
+    Reserva hasta `limit` trabajos listos para ejecutarse. La reserva es una
+    actualización condicional, así que varios workers pueden competir sin
+    ejecutar el mismo trabajo dos veces.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status='PENDING', run_after__lte=now
+    ).order_by('run_after', 'pk').values_list('pk', flat=True)[:limit]
+
+    claimed = []
+    for pk in list(candidates):
+        updated = Job.objects.filter(pk=pk, status='PENDING').update(
+            status='RUNNING', started_at=now, attempts=F('attempts') + 1
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Devuelve a la cola trabajos que quedaron en ejecución por un worker caído.
+    Si ya hay uno pendiente con la misma clave (se volvió a encolar mientras
+    tanto), ese hará el trabajo y el abandonado se marca como fallido. Los que
+    ya agotaron sus intentos también fallan: si tumban al worker, no vuelven.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status='RUNNING', started_at__lt=now - older_than)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='FAILED', finished_at=now,
+        last_error='Abandonado por un worker caído tras agotar sus intentos.',
+    )
+    pending_twin = Job.objects.filter(status='PENDING', dedupe_key=OuterRef('dedupe_key'))
+
+    requeued = 0
+    for pk in list(stale.order_by('pk').values_list('pk', flat=True)):
+        try:
+            with transaction.atomic():
+                requeued += stale.filter(~Exists(pending_twin), pk=pk).update(status='PENDING', run_after=now)
+        except IntegrityError:
+            # Otro proceso encoló la misma clave entre la consulta y la actualización
+            pass
+
+    stale.update(
+        status='FAILED', finished_at=now,
+        last_error='Abandonado por un worker caído; ya había un trabajo pendiente equivalente.',
+    )
+    return requeued
+
+
+def execute_job(job_id):
+    """Ejecuta un trabajo reservado y registra el resultado o el reintento"""
+    close_old_connections()
+    try:
+        job_record = Job.objects.get(pk=job_id)
+        try:
+            get_job_function(job_record.name)(**job_record.payload)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Error en el trabajo %s', job_record)
+            if job_record.attempts >= job_record.max_attempts:
+                Job.objects.filter(pk=job_id).update(
+                    status='FAILED', last_error=error, finished_at=timezone.now()
+                )
+            else:
+                try:
+                    with transaction.atomic():
+                        Job.objects.filter(pk=job_id).update(
+                            status='PENDING', last_error=error,
+                            run_after=timezone.now() + retry_delay(job_record.attempts),
+                        )
+                except IntegrityError:
+                    # Ya hay un trabajo pendiente equivalente que hará el reintento
+                    Job.objects.filter(pk=job_id).update(
+                        status='FAILED', last_error=error, finished_at=timezone.now()
+                    )
+            return False
+
+        Job.objects.filter(pk=job_id).update(status='DONE', finished_at=timezone.now())
+        return True
+    finally:
+        close_old_connections()
@@ -0,0 +1,139 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim_jobs, enqueue, execute_job, job, requeue_stale_jobs, retry_delay
+
+
+calls = []
+
+
+@job('jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@job('jobs.tests.fail')
+def fail():
+    raise RuntimeError('falla de prueba')
+
+
+@override_settings(JOBS_EAGER=False)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_pending_jobs_with_same_key_are_collapsed(self):
+        first = enqueue('jobs.tests.record', {'value': 1}, dedupe_key='record:1')
+        second = enqueue('jobs.tests.record', {'value': 1}, dedupe_key='record:1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_unknown_job_is_rejected(self):
+        with self.assertRaises(LookupError):
+            enqueue('jobs.tests.missing')
+
+    def test_claim_and_execute(self):
+        enqueue('jobs.tests.record', {'value': 'a'})
+        enqueue('jobs.tests.record', {'value': 'b'}, delay=timedelta(hours=1))
+
+        claimed = claim_jobs(10)
+        self.assertEqual(len(claimed), 1)
+        # Ya reservado: otro worker no lo toma
+        self.assertEqual(claim_jobs(10), [])
+
+        self.assertTrue(execute_job(claimed[0]))
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(Job.objects.get(pk=claimed[0]).status, 'DONE')
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        enqueue('jobs.tests.fail', max_attempts=2)
+        job_id = claim_jobs(1)[0]
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertFalse(execute_job(job_id))
+        retried = Job.objects.get(pk=job_id)
+        self.assertEqual(retried.status, 'PENDING')
+        self.assertIn('falla de prueba', retried.last_error)
+        self.assertGreater(retried.run_after, timezone.now() + retry_delay(1) - timedelta(seconds=5))
+
+        Job.objects.filter(pk=job_id).update(run_after=timezone.now())
+        claim_jobs(1)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertFalse(execute_job(job_id))
+        self.assertEqual(Job.objects.get(pk=job_id).status, 'FAILED')
+
+    def test_retry_delay_is_capped(self):
+        self.assertEqual(retry_delay(1), timedelta(seconds=30))
+        self.assertEqual(retry_delay(3), timedelta(seconds=120))
+        self.assertEqual(retry_delay(50), timedelta(seconds=3600))
+
+    def test_stale_job_is_requeued(self):
+        stale = Job.objects.create(
+            name='jobs.tests.record', payload={'value': 1}, dedupe_key='record:1',
+            status='RUNNING', started_at=timezone.now() - timedelta(hours=2),
+        )
+        self.assertEqual(requeue_stale_jobs(timedelta(hours=1)), 1)
+        self.assertEqual(Job.objects.get(pk=stale.pk).status, 'PENDING')
+
+    def test_stale_job_with_pending_duplicate_is_failed(self):
+        started_at = timezone.now() - timedelta(hours=2)
+        stale = Job.objects.create(
+            name='jobs.tests.record', payload={'value': 1}, dedupe_key='record:1',
+            status='RUNNING', started_at=started_at,
+        )
+        twin = Job.objects.create(
+            name='jobs.tests.record', payload={'value': 1}, dedupe_key='record:1',
+            run_after=timezone.now() + timedelta(hours=1),
+        )
+        # Dos abandonados con la misma clave y sin pendiente: solo uno vuelve a la cola
+        other = [
+            Job.objects.create(
+                name='jobs.tests.record', payload={'value': 2}, dedupe_key='record:2',
+                status='RUNNING', started_at=started_at,
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual(requeue_stale_jobs(timedelta(hours=1)), 1)
+
+        self.assertEqual(Job.objects.get(pk=stale.pk).status, 'FAILED')
+        self.assertEqual(Job.objects.get(pk=twin.pk).status, 'PENDING')
+        self.assertEqual(
+            sorted(Job.objects.filter(pk__in=[o.pk for o in other]).values_list('status', flat=True)),
+            ['FAILED', 'PENDING'],
+        )
+
+    def test_stale_job_without_attempts_left_is_failed(self):
+        stale = Job.objects.create(
+            name='jobs.tests.record', payload={'value': 1}, status='RUNNING',
+            started_at=timezone.now() - timedelta(hours=2), attempts=5, max_attempts=5,
+        )
+        self.assertEqual(requeue_stale_jobs(timedelta(hours=1)), 0)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'FAILED')
+        self.assertIsNotNone(stale.finished_at)
+
+    def test_run_workers_starts_with_stale_duplicates(self):
+        Job.objects.create(
+            name='jobs.tests.record', payload={'value': 1}, dedupe_key='record:1',
+            status='RUNNING', started_at=timezone.now() - timedelta(hours=2),
+        )
+        Job.objects.create(
+            name='jobs.tests.record', payload={'value': 1}, dedupe_key='record:1',
+            run_after=timezone.now() + timedelta(hours=1),
+        )
+        call_command('run_workers', once=True, stdout=StringIO())
+        self.assertEqual(Job.objects.filter(status='PENDING').count(), 1)
+
+
+@override_settings(JOBS_EAGER=True)
+class EagerQueueTests(TestCase):
+    def test_eager_mode_runs_inline(self):
+        calls.clear()
+        self.assertIsNone(enqueue('jobs.tests.record', {'value': 'inline'}))
+        self.assertEqual(calls, ['inline'])
+        self.assertFalse(Job.objects.exists())
@@ -1,24 +1,38 @@
 from django.contrib import admin
-from .models import Employee, AbsenceType, Absence, Vacation
+from django.contrib.admin.views.main import ChangeList
+
+from boss_core.admin_utils import DeferredSideEffectsMixin, EmployeeInputFilter, EstimatedCountPaginator
+from .models import Department, Employee, AbsenceType, Absence, Vacation, StaffingThreshold, Holiday
+from .workdays import attach_business_days
+
+
+@admin.register(Department)
+class DepartmentAdmin(admin.ModelAdmin):
+    list_display = ['name', 'headcount', 'absent_today', 'absent_today_on']
+    search_fields = ['name']
+    readonly_fields = ['headcount', 'absent_today', 'absent_today_on']
 
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
-    list_display = ['employee_id', 'full_name', 'position', 'department', 'hire_date', 'is_active']
+    list_display = ['employee_id', 'full_name', 'position', 'department_name', 'hire_date', 'is_active']
     list_filter = ['is_active', 'department', 'hire_date']
     search_fields = ['user__first_name', 'user__last_name', 'employee_id', 'position']
     date_hierarchy = 'hire_date'
     ordering = ['user__first_name', 'user__last_name']
+    list_select_related = ['user']
+    autocomplete_fields = ['department', 'manager']
+    readonly_fields = ['photo', 'photo_thumbnails']
     
     fieldsets = (
         ('Información Básica', {
             'fields': ('user', 'employee_id', 'is_active')
         }),
         ('Información Personal', {
-            'fields': ('birth_date', 'phone', 'mobile')
+            'fields': ('birth_date', 'phone', 'mobile', 'photo', 'photo_thumbnails')
         }),
         ('Información Laboral', {
-            'fields': ('position', 'department', 'hire_date')
+            'fields': ('position', 'department', 'manager', 'hire_date')
         }),
         ('Contacto de Emergencia', {
             'fields': ('emergency_contact', 'emergency_phone')
@@ -36,13 +50,25 @@ class AbsenceTypeAdmin(admin.ModelAdmin):
     search_fields = ['name', 'code']
 
 
+class AbsenceChangeList(ChangeList):
+    """Calcula los días hábiles de toda la página de una vez (no por fila)"""
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.result_list = attach_business_days(self.result_list)
+
+
 @admin.register(Absence)
-class AbsenceAdmin(admin.ModelAdmin):
-    list_display = ['employee', 'absence_type', 'start_date', 'end_date', 'duration_days']
-    list_filter = ['absence_type', 'start_date', 'employee']
+class AbsenceAdmin(DeferredSideEffectsMixin, admin.ModelAdmin):
+    list_display = ['employee', 'absence_type', 'start_date', 'end_date', 'duration_days', 'business_days']
+    list_filter = ['absence_type', 'start_date', EmployeeInputFilter.for_field('employee')]
     search_fields = ['employee__user__first_name', 'employee__user__last_name', 'reason']
     date_hierarchy = 'start_date'
     ordering = ['-start_date']
+    list_select_related = ['employee__user', 'absence_type']
+    autocomplete_fields = ['employee']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Información General', {
@@ -55,21 +81,40 @@ class AbsenceAdmin(admin.ModelAdmin):
             'fields': ('reason', 'notes')
         }),
     )
+    
+    def get_changelist(self, request, **kwargs):
+        return AbsenceChangeList
+
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ['date', 'name']
+    search_fields = ['name']
+    date_hierarchy = 'date'
+
+
+@admin.register(StaffingThreshold)
+class StaffingThresholdAdmin(admin.ModelAdmin):
+    list_display = ['department_name', 'max_absent']
+    search_fields = ['department_name']
+    autocomplete_fields = ['department']
 
 
 @admin.register(Vacation)
 class VacationAdmin(admin.ModelAdmin):
-    list_display = ['employee', 'year', 'days_entitled', 'days_taken', 'days_pending']
+    list_display = ['employee', 'year', 'days_entitled', 'days_carried_over', 'days_taken', 'days_pending']
     list_filter = ['year', 'employee__department']
     search_fields = ['employee__user__first_name', 'employee__user__last_name']
     ordering = ['-year', 'employee']
+    list_select_related = ['employee__user']
+    autocomplete_fields = ['employee']
     
     fieldsets = (
         ('Información General', {
             'fields': ('employee', 'year')
         }),
         ('Días', {
-            'fields': ('days_entitled', 'days_taken'),
+            'fields': ('days_entitled', 'days_carried_over', 'carryover_expires_on', 'days_taken'),
             'description': 'Los días pendientes se calculan automáticamente'
         }),
         ('Notas', {
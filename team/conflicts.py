@@ -0,0 +1,115 @@
+"""
+Detección de conflictos al registrar una ausencia.
+
+- Solapamiento: el empleado ya tiene otra ausencia en el rango.
+- Cobertura: el departamento superaría su umbral de ausentes por día
+  (StaffingThreshold) en algún día del rango.
+
+Ambas comprobaciones usan el predicado de solapamiento
+`start_date <= fin AND end_date >= inicio`, cubierto por los índices de
+Absence, así que su costo depende de las ausencias del rango y no del
+tamaño del historial.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import NamedTuple, Optional
+
+from .intervals import daily_counts, merge_intervals
+from .models import Absence, StaffingThreshold
+
+
+class Conflict(NamedTuple):
+    kind: str
+    message: str
+    dates: tuple = ()
+    absence: Optional[Absence] = None
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'message': self.message,
+            'dates': [day.isoformat() for day in self.dates],
+            'absence_id': self.absence.pk if self.absence else None,
+        }
+
+
+def overlapping_absences(start, end, exclude_id=None):
+    """Ausencias que se solapan con el rango cerrado [start, end]"""
+    absences = Absence.objects.filter(start_date__lte=end, end_date__gte=start)
+    if exclude_id:
+        absences = absences.exclude(pk=exclude_id)
+    return absences
+
+
+def employee_overlaps(employee, start, end, exclude_id=None):
+    """Conflictos por ausencias del mismo empleado en el rango"""
+    absences = overlapping_absences(start, end, exclude_id).filter(
+        employee=employee
+    ).select_related('absence_type').order_by('start_date')
+    return [
+        Conflict(
+            kind='overlap',
+            message=(
+                f'Ya existe una ausencia de {absence.absence_type.name} del '
+                f'{absence.start_date:%d/%m/%Y} al {absence.end_date:%d/%m/%Y}.'
+            ),
+            absence=absence,
+        )
+        for absence in absences
+    ]
+
+
+def staffing_conflicts(employee, start, end, exclude_id=None):
+    """Días del rango en los que el departamento superaría su umbral de ausentes"""
+    if employee.department_id is None:
+        return []
+    threshold = StaffingThreshold.objects.filter(department_id=employee.department_id).first()
+    if threshold is None:
+        return []
+
+    absences = overlapping_absences(start, end, exclude_id).filter(
+        employee__department_id=employee.department_id,
+        employee__is_active=True,
+    ).exclude(
+        employee=employee
+    ).order_by('employee_id', 'start_date').values_list('employee_id', 'start_date', 'end_date')
+
+    by_employee = defaultdict(list)
+    for employee_id, absence_start, absence_end in absences:
+        by_employee[employee_id].append((max(absence_start, start), min(absence_end, end)))
+
+    size = (end - start).days + 1
+    counts = daily_counts(
+        (interval for intervals in by_employee.values() for interval in merge_intervals(intervals)),
+        start, size,
+    )
+    # El empleado que solicita la ausencia se suma a los ya ausentes
+    exceeded = tuple(
+        start + timedelta(days=offset)
+        for offset, count in enumerate(counts)
+        if count + 1 > threshold.max_absent
+    )
+    if not exceeded:
+        return []
+
+    shown = ', '.join(f'{day:%d/%m}' for day in exceeded[:5])
+    if len(exceeded) > 5:
+        shown += f' y {len(exceeded) - 5} más'
+    return [Conflict(
+        kind='staffing',
+        message=(
+            f'{employee.department_name} superaría el máximo de {threshold.max_absent} '
+            f'persona(s) ausente(s) el {shown}.'
+        ),
+        dates=exceeded,
+    )]
+
+
+def check_absence(employee, start, end, exclude_id=None):
+    """Todos los conflictos de registrar una ausencia de `employee` en [start, end]"""
+    if end < start:
+        return []
+    return (
+        employee_overlaps(employee, start, end, exclude_id)
+        + staffing_conflicts(employee, start, end, exclude_id)
+    )
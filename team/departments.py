@@ -0,0 +1,223 @@
+"""
+Departamentos y sus contadores precalculados.
+
+Antes el departamento era texto libre en Employee; ahora es un modelo con FK.
+`sync_departments()` (comando `sync_departments`) convierte los datos
+existentes: agrupa los nombres escritos de distinta forma ("Tecnología",
+" tecnología "), crea un Department por grupo y enlaza empleados y umbrales.
+
+Contadores de Department:
+
+- headcount: empleados activos. Las señales de Employee lo ajustan con
+  UPDATE ... SET headcount = headcount ± 1 al crear, mover, activar o borrar.
+- absent_today: empleados activos con una ausencia que cubre el día,
+  calculado para la fecha `absent_today_on`. Una ausencia que toca el día
+  borra esa fecha y `departments_with_counts()` recalcula con una sola
+  consulta agrupada los departamentos vencidos (también al cambiar de día).
+"""
+from collections import defaultdict
+from datetime import date
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .heatmap import heatmap_changed
+from .models import Absence, Department, Employee, StaffingThreshold
+
+
+def normalize_department_name(name):
+    """Nombre sin espacios sobrantes"""
+    return ' '.join(str(name or '').split())
+
+
+def department_key(name):
+    """Clave para agrupar nombres que solo difieren en mayúsculas o espacios"""
+    return normalize_department_name(name).casefold()
+
+
+def parse_department(value):
+    """Id de departamento de un parámetro GET, o None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def resolve_departments(names):
+    """
+    Devuelve {clave: Department} para los nombres dados, creando en bloque
+    los que no existen. La tabla es pequeña: se compara en Python para que
+    la agrupación no dependa de la intercalación de la base de datos.
+    """
+    wanted = {}
+    for name in names:
+        name = normalize_department_name(name)
+        if name:
+            wanted.setdefault(department_key(name), name)
+
+    existing = {department_key(department.name): department for department in Department.objects.all()}
+    missing = [Department(name=name) for key, name in wanted.items() if key not in existing]
+    if missing:
+        Department.objects.bulk_create(missing, ignore_conflicts=True)
+        existing = {department_key(department.name): department for department in Department.objects.all()}
+    return {key: existing[key] for key in wanted}
+
+
+def department_for_name(name):
+    """Department para un nombre escrito a mano; lo crea si no existe"""
+    return resolve_departments([name]).get(department_key(name))
+
+
+def adjust_headcount(deltas):
+    """Aplica {department_id: +n/-n} a headcount sin leer los valores"""
+    for department_id, delta in deltas.items():
+        if department_id and delta:
+            Department.objects.filter(pk=department_id).update(headcount=F('headcount') + delta)
+
+
+def refresh_headcounts(department_ids=None):
+    """Recalcula headcount con una consulta agrupada"""
+    departments = Department.objects.all()
+    employees = Employee.objects.filter(is_active=True, department__isnull=False)
+    if department_ids is not None:
+        departments = departments.filter(pk__in=department_ids)
+        employees = employees.filter(department_id__in=department_ids)
+    counts = dict(employees.values_list('department_id').annotate(total=Count('pk')).order_by())
+
+    departments = list(departments.only('pk'))
+    for department in departments:
+        department.headcount = counts.get(department.pk, 0)
+    Department.objects.bulk_update(departments, ['headcount'], batch_size=500)
+
+
+def refresh_absent_today(department_ids=None, today=None):
+    """Recalcula absent_today para `today` con una consulta agrupada"""
+    today = today or date.today()
+    departments = Department.objects.all()
+    absences = Absence.objects.filter(
+        start_date__lte=today, end_date__gte=today,
+        employee__is_active=True, employee__department__isnull=False,
+    )
+    if department_ids is not None:
+        departments = departments.filter(pk__in=department_ids)
+        absences = absences.filter(employee__department_id__in=department_ids)
+    counts = dict(
+        absences.values_list('employee__department_id')
+        .annotate(total=Count('employee_id', distinct=True)).order_by()
+    )
+
+    departments = list(departments.only('pk'))
+    for department in departments:
+        department.absent_today = counts.get(department.pk, 0)
+        department.absent_today_on = today
+    Department.objects.bulk_update(departments, ['absent_today', 'absent_today_on'], batch_size=500)
+
+
+def mark_absent_today_stale(employee_ids=None):
+    """Marca para recalcular absent_today (todos o los departamentos de esos empleados)"""
+    departments = Department.objects.all()
+    if employee_ids is not None:
+        departments = departments.filter(
+            pk__in=Employee.objects.filter(pk__in=employee_ids).values('department_id')
+        )
+    departments.update(absent_today_on=None)
+
+
+def departments_with_counts(today=None):
+    """Departamentos con headcount y absent_today vigentes para `today`"""
+    today = today or date.today()
+    departments = list(Department.objects.all())
+    stale = [department.pk for department in departments if department.absent_today_on != today]
+    if stale:
+        refresh_absent_today(stale, today)
+        departments = list(Department.objects.all())
+    return departments
+
+
+class SyncResult(NamedTuple):
+    created: int
+    merged: int
+    employees: int
+    thresholds: int
+
+
+def _merge_duplicates(dry_run):
+    """Une los Department cuyo nombre solo difiere en mayúsculas o espacios"""
+    groups = defaultdict(list)
+    for department in Department.objects.order_by('pk'):
+        groups[department_key(department.name)].append(department)
+
+    merged = 0
+    for keeper, *duplicates in groups.values():
+        if not duplicates:
+            continue
+        merged += len(duplicates)
+        if dry_run:
+            continue
+        duplicate_ids = [department.pk for department in duplicates]
+        Employee.objects.filter(department_id__in=duplicate_ids).update(
+            department_id=keeper.pk, department_name=keeper.name
+        )
+        # Un solo umbral por departamento: se conserva el del que se mantiene
+        thresholds = StaffingThreshold.objects.filter(department_id__in=duplicate_ids).order_by('pk')
+        if StaffingThreshold.objects.filter(department_id=keeper.pk).exists():
+            thresholds.delete()
+        else:
+            first = thresholds.first()
+            if first is not None:
+                thresholds.exclude(pk=first.pk).delete()
+                StaffingThreshold.objects.filter(pk=first.pk).update(department_id=keeper.pk, department_name=keeper.name)
+        Department.objects.filter(pk__in=duplicate_ids).delete()
+    return merged
+
+
+def sync_departments(dry_run=False):
+    """
+    Crea los departamentos a partir del texto de empleados y umbrales,
+    enlaza los registros sin departamento, une duplicados y recalcula los
+    contadores. Es idempotente.
+    """
+    employee_names = set(
+        Employee.objects.filter(department__isnull=True).exclude(department_name='')
+        .values_list('department_name', flat=True).distinct()
+    )
+    threshold_names = set(
+        StaffingThreshold.objects.filter(department__isnull=True).exclude(department_name='')
+        .values_list('department_name', flat=True)
+    )
+    names = employee_names | threshold_names
+
+    known = {department_key(name) for name in Department.objects.values_list('name', flat=True)}
+    created = len({department_key(name) for name in names} - known)
+    if dry_run:
+        return SyncResult(
+            created=created,
+            merged=_merge_duplicates(dry_run=True),
+            employees=Employee.objects.filter(department__isnull=True).exclude(department_name='').count(),
+            thresholds=StaffingThreshold.objects.filter(department__isnull=True).exclude(department_name='').count(),
+        )
+
+    with transaction.atomic():
+        merged = _merge_duplicates(dry_run=False)
+        departments = resolve_departments(names)
+
+        employees = thresholds = 0
+        for name in employee_names:
+            department = departments[department_key(name)]
+            employees += Employee.objects.filter(department__isnull=True, department_name=name).update(
+                department=department, department_name=department.name
+            )
+        for name in threshold_names:
+            department = departments[department_key(name)]
+            if StaffingThreshold.objects.filter(department=department).exists():
+                # Umbral duplicado para el mismo departamento: queda sin enlazar
+                continue
+            thresholds += StaffingThreshold.objects.filter(department__isnull=True, department_name=name).update(
+                department=department, department_name=department.name
+            )
+
+        refresh_headcounts()
+        refresh_absent_today()
+        transaction.on_commit(heatmap_changed)
+    return SyncResult(created, merged, employees, thresholds)
@@ -0,0 +1,365 @@
+"""
+Días de vacaciones que corresponden a cada empleado según su antigüedad.
+
+La tabla por defecto sigue el artículo 76 de la Ley Federal del Trabajo
+(reforma 2023): 12 días al cumplir el primer año, +2 por año hasta 20 días
+al quinto, y +2 por cada quinquenio a partir del sexto año. Se puede
+sustituir con `VACATION_ENTITLEMENT_TIERS` en settings, como una lista de
+(años_mínimos, días) ordenada por años.
+
+El cálculo anual (`accrue_entitlements`) y el arrastre de fin de año
+(`rollover_vacations`) procesan a los empleados por lotes: pocas consultas
+y un bulk_create/bulk_update por lote, sin disparar señales por empleado.
+"""
+import calendar
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date
+from typing import NamedTuple, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import Employee, Vacation
+from .workdays import business_days_array
+
+
+DEFAULT_TIERS = [
+    (1, 12), (2, 14), (3, 16), (4, 18), (5, 20),
+    (6, 22), (11, 24), (16, 26), (21, 28), (26, 30), (31, 32),
+]
+
+
+class EntitlementChange(NamedTuple):
+    employee_id: int
+    employee_code: str
+    tenure_years: int
+    previous_days: Optional[int]
+    days: int
+
+    @property
+    def is_new(self):
+        return self.previous_days is None
+
+
+def entitlement_tiers():
+    return sorted(getattr(settings, 'VACATION_ENTITLEMENT_TIERS', DEFAULT_TIERS))
+
+
+def tenure_years(hire_date, year):
+    """Años de servicio que el empleado cumple dentro del año indicado"""
+    return max(0, year - hire_date.year)
+
+
+def entitled_days(hire_date, year, tiers=None):
+    """Días de vacaciones que corresponden en `year` a quien ingresó en `hire_date`"""
+    tiers = tiers or entitlement_tiers()
+    index = bisect_right([min_years for min_years, _ in tiers], tenure_years(hire_date, year))
+    return tiers[index - 1][1] if index else 0
+
+
+def get_or_create_vacation(employee, year):
+    """Registro de vacaciones del año; si no existe se crea con los días de la política"""
+    return Vacation.objects.get_or_create(
+        employee=employee,
+        year=year,
+        defaults={
+            'days_entitled': entitled_days(employee.hire_date, year),
+            'days_taken': 0,
+        }
+    )
+
+
+def _chunks(queryset, chunk_size):
+    """Recorre el queryset por lotes usando paginación por clave primaria"""
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1][0]
+
+
+def accrue_entitlements(year, chunk_size=500, dry_run=False, only_missing=False, stdout=None):
+    """
+    Crea o actualiza los registros de vacaciones de `year` para todos los
+    empleados activos contratados a más tardar ese año. Devuelve la lista de
+    cambios (EntitlementChange); con `dry_run` no escribe nada.
+    """
+    tiers = entitlement_tiers()
+    employees = Employee.objects.filter(
+        is_active=True, hire_date__year__lte=year
+    ).values_list('pk', 'employee_id', 'hire_date')
+
+    changes = []
+    processed = 0
+    for chunk in _chunks(employees, chunk_size):
+        existing = {
+            vacation.employee_id: vacation
+            for vacation in Vacation.objects.filter(
+                year=year, employee_id__in=[pk for pk, _, _ in chunk]
+            )
+        }
+
+        to_create, to_update = [], []
+        for pk, employee_code, hire_date in chunk:
+            days = entitled_days(hire_date, year, tiers)
+            vacation = existing.get(pk)
+            if vacation is None:
+                changes.append(EntitlementChange(pk, employee_code, tenure_years(hire_date, year), None, days))
+                # bulk_create no llama a save(), así que days_pending se calcula aquí
+                to_create.append(Vacation(
+                    employee_id=pk, year=year, days_entitled=days, days_taken=0, days_pending=days
+                ))
+            elif vacation.days_entitled != days and not only_missing:
+                changes.append(EntitlementChange(
+                    pk, employee_code, tenure_years(hire_date, year), vacation.days_entitled, days
+                ))
+                vacation.days_pending += days - vacation.days_entitled
+                vacation.days_entitled = days
+                to_update.append(vacation)
+
+        if not dry_run:
+            with transaction.atomic():
+                Vacation.objects.bulk_create(to_create, batch_size=chunk_size, ignore_conflicts=True)
+                Vacation.objects.bulk_update(to_update, ['days_entitled', 'days_pending'], batch_size=chunk_size)
+
+        processed += len(chunk)
+        if stdout:
+            stdout.write(f'  {processed} empleado(s) procesado(s)')
+
+    return changes
+
+
+class RolloverChange(NamedTuple):
+    employee_id: int
+    employee_code: str
+    pending_days: int
+    carried_days: int
+    previous_carried: Optional[int]
+
+    @property
+    def is_new(self):
+        return self.previous_carried is None
+
+
+def carryover_expiry_date(year, months):
+    """Último día en que se pueden usar los días arrastrados a `year`"""
+    if months is None:
+        return None
+    end_year, end_month = year + (months - 1) // 12, (months - 1) % 12 + 1
+    return date(end_year, end_month, calendar.monthrange(end_year, end_month)[1])
+
+
+def rollover_vacations(from_year, to_year=None, max_carryover=None, expiry_months=None,
+                       chunk_size=500, dry_run=False, stdout=None, today=None):
+    """
+    Arrastra los días pendientes de `from_year` al año siguiente para todos los
+    empleados activos, creando los registros faltantes con los días de la
+    política. Es idempotente: los días arrastrados se recalculan a partir del
+    año origen en lugar de sumarse, así que repetir la ejecución no duplica.
+    Los registros cuyo arrastre ya venció no se tocan: `expire_carryover` dejó
+    en ellos solo los días usados a tiempo. Cada lote se guarda en su propia
+    transacción.
+    """
+    today = today or date.today()
+    to_year = to_year or from_year + 1
+    if max_carryover is None:
+        max_carryover = getattr(settings, 'VACATION_CARRYOVER_MAX_DAYS', None)
+    if expiry_months is None:
+        expiry_months = getattr(settings, 'VACATION_CARRYOVER_EXPIRY_MONTHS', None)
+    expires_on = carryover_expiry_date(to_year, expiry_months)
+
+    tiers = entitlement_tiers()
+    employees = Employee.objects.filter(
+        is_active=True, hire_date__year__lte=to_year
+    ).values_list('pk', 'employee_id', 'hire_date')
+    total = employees.count()
+
+    changes = []
+    processed = 0
+    for chunk in _chunks(employees, chunk_size):
+        employee_ids = [pk for pk, _, _ in chunk]
+        pending_by_employee = dict(
+            Vacation.objects.filter(year=from_year, employee_id__in=employee_ids).values_list(
+                'employee_id', 'days_pending'
+            )
+        )
+        existing = {
+            vacation.employee_id: vacation
+            for vacation in Vacation.objects.filter(year=to_year, employee_id__in=employee_ids)
+        }
+
+        to_create, to_update = [], []
+        for pk, employee_code, hire_date in chunk:
+            pending = max(0, pending_by_employee.get(pk, 0))
+            carried = pending if max_carryover is None else min(pending, max_carryover)
+            vacation = existing.get(pk)
+            if vacation is None:
+                days = entitled_days(hire_date, to_year, tiers)
+                changes.append(RolloverChange(pk, employee_code, pending, carried, None))
+                to_create.append(Vacation(
+                    employee_id=pk, year=to_year, days_entitled=days, days_taken=0,
+                    days_carried_over=carried, days_pending=days + carried,
+                    carryover_expires_on=expires_on if carried else None,
+                ))
+            elif vacation.carryover_expires_on and vacation.carryover_expires_on < today:
+                continue
+            elif vacation.days_carried_over != carried or (
+                carried and vacation.carryover_expires_on != expires_on
+            ):
+                changes.append(RolloverChange(pk, employee_code, pending, carried, vacation.days_carried_over))
+                vacation.days_pending += carried - vacation.days_carried_over
+                vacation.days_carried_over = carried
+                vacation.carryover_expires_on = expires_on if carried else None
+                to_update.append(vacation)
+
+        if not dry_run:
+            with transaction.atomic():
+                Vacation.objects.bulk_create(to_create, batch_size=chunk_size, ignore_conflicts=True)
+                Vacation.objects.bulk_update(
+                    to_update, ['days_carried_over', 'carryover_expires_on', 'days_pending'],
+                    batch_size=chunk_size,
+                )
+
+        processed += len(chunk)
+        if stdout:
+            stdout.write(f'  {processed}/{total} empleado(s) procesado(s)')
+
+    return changes
+
+
+def expire_carryover(year, today=None, chunk_size=500, dry_run=False):
+    """
+    Aplica el vencimiento de los días arrastrados a `year`: pasada la fecha
+    límite solo se conservan los días que se usaron antes de ella. Devuelve
+    el número de días perdidos. Repetir la ejecución no cambia el resultado.
+    """
+    from .models import Absence
+
+    today = today or date.today()
+    vacations = Vacation.objects.filter(
+        year=year, days_carried_over__gt=0, carryover_expires_on__lt=today
+    ).order_by('pk')
+
+    forfeited = 0
+    last_pk = 0
+    while True:
+        chunk = list(vacations.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return forfeited
+        last_pk = chunk[-1].pk
+
+        # Días de vacaciones tomados hasta el vencimiento, una consulta por lote
+        expiry_by_employee = {vacation.employee_id: vacation.carryover_expires_on for vacation in chunk}
+        absences = Absence.objects.filter(
+            employee_id__in=expiry_by_employee,
+            absence_type__code='VAC',
+            start_date__year=year,
+            end_date__lte=max(expiry_by_employee.values()),
+        ).values_list('employee_id', 'start_date', 'end_date')
+        used_before = defaultdict(int)
+        used_before.update(_sum_business_days_by_employee(
+            row for row in absences if row[2] <= expiry_by_employee[row[0]]
+        ))
+
+        to_update = []
+        for vacation in chunk:
+            kept = min(vacation.days_carried_over, used_before[vacation.employee_id])
+            if kept != vacation.days_carried_over:
+                forfeited += vacation.days_carried_over - kept
+                vacation.days_pending -= vacation.days_carried_over - kept
+                vacation.days_carried_over = kept
+                to_update.append(vacation)
+
+        if not dry_run:
+            with transaction.atomic():
+                Vacation.objects.bulk_update(to_update, ['days_carried_over', 'days_pending'], batch_size=chunk_size)
+
+
+def _sum_business_days_by_employee(rows):
+    """Agrupa por empleado los días hábiles de filas (empleado, inicio, fin) en una operación"""
+    rows = list(rows)
+    if not rows:
+        return {}
+    employee_ids, starts, ends = zip(*rows)
+    counts = business_days_array(starts, ends)
+    unique_ids, inverse = np.unique(np.asarray(employee_ids), return_inverse=True)
+    totals = np.bincount(inverse, weights=counts, minlength=len(unique_ids))
+    return {int(employee_id): int(total) for employee_id, total in zip(unique_ids, totals)}
+
+
+def vacation_days_taken(year, employee_ids=None):
+    """
+    Días hábiles de vacaciones tomados en `year` por empleado: una consulta y
+    un solo cálculo vectorizado para toda la empresa.
+    """
+    from .models import Absence
+
+    absences = Absence.objects.filter(absence_type__code='VAC', start_date__year=year)
+    if employee_ids is not None:
+        absences = absences.filter(employee_id__in=employee_ids)
+    return _sum_business_days_by_employee(absences.values_list('employee_id', 'start_date', 'end_date'))
+
+
+def recalculate_days_taken(year, chunk_size=500, dry_run=False):
+    """Recalcula days_taken de todos los registros del año; devuelve los registros modificados"""
+    taken = vacation_days_taken(year)
+    changed = []
+    for vacation in Vacation.objects.filter(year=year).select_related('employee').iterator(chunk_size=chunk_size):
+        days = taken.get(vacation.employee_id, 0)
+        if vacation.days_taken != days:
+            vacation.days_pending += vacation.days_taken - days
+            vacation.days_taken = days
+            changed.append(vacation)
+
+    if not dry_run:
+        with transaction.atomic():
+            Vacation.objects.bulk_update(changed, ['days_taken', 'days_pending'], batch_size=chunk_size)
+    return changed
+
+
+def refresh_vacations(pairs, chunk_size=500):
+    """
+    Recalcula días tomados y pendientes de los pares (empleado, año) indicados,
+    creando según la política los registros que falten. Una consulta de
+    ausencias y un bulk_update por año; devuelve los registros escritos.
+    """
+    employees_by_year = defaultdict(set)
+    for employee_id, year in pairs:
+        employees_by_year[year].add(employee_id)
+
+    written = 0
+    for year, employee_ids in sorted(employees_by_year.items()):
+        taken = vacation_days_taken(year, employee_ids)
+        existing = {
+            vacation.employee_id: vacation
+            for vacation in Vacation.objects.filter(year=year, employee_id__in=employee_ids)
+        }
+
+        created = []
+        for employee_id, hire_date in Employee.objects.filter(
+            pk__in=employee_ids - existing.keys()
+        ).values_list('pk', 'hire_date'):
+            days_entitled = entitled_days(hire_date, year)
+            days = taken.get(employee_id, 0)
+            created.append(Vacation(
+                employee_id=employee_id, year=year, days_entitled=days_entitled,
+                days_taken=days, days_pending=days_entitled - days,
+            ))
+
+        changed = []
+        for vacation in existing.values():
+            days = taken.get(vacation.employee_id, 0)
+            if vacation.days_taken != days:
+                vacation.days_pending += vacation.days_taken - days
+                vacation.days_taken = days
+                changed.append(vacation)
+
+        with transaction.atomic():
+            Vacation.objects.bulk_create(created, batch_size=chunk_size)
+            Vacation.objects.bulk_update(changed, ['days_taken', 'days_pending'], batch_size=chunk_size)
+        written += len(created) + len(changed)
+    return written
@@ -27,12 +27,18 @@ class EmployeeForm(forms.ModelForm):
         label='Usuario',
         widget=forms.TextInput(attrs={'class': 'form-control'})
     )
+    # La foto se guarda aparte con nombre por hash de contenido (team/photos.py)
+    photo = forms.ImageField(
+        required=False,
+        label='Foto',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': 'image/jpeg,image/png,image/webp'})
+    )
     
     class Meta:
         model = Employee
         fields = [
             'employee_id', 'birth_date', 'hire_date', 'position', 
-            'department', 'phone', 'mobile', 'emergency_contact', 
+            'department', 'manager', 'phone', 'mobile', 'emergency_contact', 
             'emergency_phone', 'notes', 'is_active'
         ]
         widgets = {
@@ -40,7 +46,8 @@ class EmployeeForm(forms.ModelForm):
             'birth_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'hire_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'position': forms.TextInput(attrs={'class': 'form-control'}),
-            'department': forms.TextInput(attrs={'class': 'form-control'}),
+            'department': forms.Select(attrs={'class': 'form-select'}),
+            'manager': forms.Select(attrs={'class': 'form-select'}),
             'phone': forms.TextInput(attrs={'class': 'form-control'}),
             'mobile': forms.TextInput(attrs={'class': 'form-control'}),
             'emergency_contact': forms.TextInput(attrs={'class': 'form-control'}),
@@ -53,11 +60,18 @@ class EmployeeForm(forms.ModelForm):
         instance = kwargs.get('instance')
         super().__init__(*args, **kwargs)
         
+        managers = Employee.objects.filter(is_active=True).select_related('user')
+        if instance and instance.pk:
+            managers = managers.exclude(pk=instance.pk)
+        self.fields['manager'].queryset = managers
+        
         if instance and instance.pk and hasattr(instance, 'user') and instance.user:
             self.fields['first_name'].initial = instance.user.first_name
             self.fields['last_name'].initial = instance.user.last_name
             self.fields['email'].initial = instance.user.email
             self.fields['username'].initial = instance.user.username
+        if instance and instance.photo:
+            self.fields['photo'].initial = instance.photo
     
     def clean_username(self):
         username = self.cleaned_data['username']
@@ -73,6 +87,17 @@ class EmployeeForm(forms.ModelForm):
         
         return username
     
+    def clean_photo(self):
+        from .photos import PHOTO_FORMATS, PHOTO_MAX_BYTES
+        
+        photo = self.cleaned_data.get('photo')
+        if photo and 'photo' in self.changed_data:
+            if photo.size > PHOTO_MAX_BYTES:
+                raise forms.ValidationError(f'La foto no debe pesar más de {PHOTO_MAX_BYTES // (1024 * 1024)} MB.')
+            if photo.image.format not in PHOTO_FORMATS:
+                raise forms.ValidationError('Formato no admitido; use JPEG, PNG, WebP o GIF.')
+        return photo
+    
     def clean_employee_id(self):
         employee_id = self.cleaned_data['employee_id']
         instance = getattr(self, 'instance', None)
@@ -111,6 +136,14 @@ class EmployeeForm(forms.ModelForm):
             user.save()
             employee.user = user
             employee.save()
+            if 'photo' in self.changed_data:
+                from .photos import clear_photo, store_photo
+                
+                photo = self.cleaned_data['photo']
+                if photo:
+                    store_photo(employee, photo)
+                else:
+                    clear_photo(employee)
         
         return employee
 
@@ -151,6 +184,14 @@ class AbsenceForm(forms.ModelForm):
         if start_date and end_date and end_date < start_date:
             raise forms.ValidationError('La fecha de fin debe ser posterior a la fecha de inicio.')
         
+        # Ausencias solapadas y umbral de personal del departamento
+        if all([employee, start_date, end_date]):
+            from .conflicts import check_absence
+            
+            conflicts = check_absence(employee, start_date, end_date, self.instance.pk)
+            if conflicts:
+                raise forms.ValidationError([conflict.message for conflict in conflicts])
+        
         # Validación especial para vacaciones
         if all([employee, absence_type, start_date, end_date]):
             from .signals import validate_vacation_availability
@@ -296,6 +337,14 @@ class QuickAbsenceForm(forms.Form):
         if start_date and end_date and end_date < start_date:
             raise forms.ValidationError('La fecha de fin debe ser posterior a la fecha de inicio.')
         
+        # Ausencias solapadas y umbral de personal del departamento
+        if all([employee, start_date, end_date]):
+            from .conflicts import check_absence
+            
+            conflicts = check_absence(employee, start_date, end_date)
+            if conflicts:
+                raise forms.ValidationError([conflict.message for conflict in conflicts])
+        
         # Validación especial para vacaciones
         if all([employee, absence_type, start_date, end_date]):
             from .signals import validate_vacation_availability
@@ -327,3 +376,37 @@ class QuickAbsenceForm(forms.Form):
         )
         absence.save()
         return absence
+
+
+class ImportForm(forms.Form):
+    """Carga de un archivo de empleados o ausencias para importación masiva"""
+    
+    KIND_CHOICES = [
+        ('employees', 'Empleados'),
+        ('absences', 'Ausencias'),
+    ]
+    
+    kind = forms.ChoiceField(
+        choices=KIND_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label='Importar'
+    )
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.json'}),
+        label='Archivo',
+        help_text='CSV con encabezados o JSON con una lista de objetos.'
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        label='Solo validar',
+        help_text='Revisa el archivo y muestra los errores sin guardar nada.'
+    )
+    
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        extension = file.name.rsplit('.', 1)[-1].lower() if '.' in file.name else ''
+        if extension not in ('csv', 'json'):
+            raise forms.ValidationError('El archivo debe ser .csv o .json.')
+        file.import_format = extension
+        return file
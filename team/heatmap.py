@@ -0,0 +1,144 @@
+"""
+Mapa de calor de ausencias del equipo.
+
+Para un mes se obtienen con una sola consulta de solapamiento todas las
+ausencias que tocan el rango y se acumulan en un arreglo de diferencias
+(+1 el día de inicio, -1 el día siguiente al fin); una suma prefija da el
+número de personas ausentes por día. Las ausencias solapadas de un mismo
+empleado se fusionan antes, para contar a cada persona una sola vez.
+
+Los resultados se guardan en caché por (mes, id de departamento). La clave
+lleva una versión guardada en la misma caché: las señales de ausencias y
+empleados, los imports y la sincronización de departamentos la incrementan
+al confirmar (`heatmap_changed()`), así que leer un mes en caché cuesta una
+lectura de caché y ninguna consulta. Un UPDATE directo sobre esas tablas debe
+llamar a `heatmap_changed()`.
+"""
+import calendar
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.core.cache import cache
+
+from .intervals import daily_counts, merge_intervals
+from .models import Absence, AbsenceType, Department, Employee
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = 'team-heatmap:version'
+QUARTER_MONTHS = {1: (1, 2, 3), 2: (4, 5, 6), 3: (7, 8, 9), 4: (10, 11, 12)}
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _headcount(department=None):
+    if department:
+        # Plantilla precalculada del departamento (team/departments.py)
+        return Department.objects.filter(pk=department).values_list('headcount', flat=True).first() or 0
+    return Employee.objects.filter(is_active=True).count()
+
+
+def _month_absences(start, end, department=None):
+    absences = Absence.objects.filter(
+        employee__is_active=True,
+        start_date__lte=end,
+        end_date__gte=start,
+    )
+    if department:
+        absences = absences.filter(employee__department_id=department)
+    return absences
+
+
+def _data_version():
+    """Versión vigente de los datos del mapa de calor"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Valor inicial único: si la clave se perdió no se reutilizan entradas viejas
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def heatmap_changed():
+    """Cambiaron ausencias o empleados: los meses en caché dejan de usarse"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+def compute_month(year, month, department=None):
+    """Calcula sin caché el mapa de calor de un mes"""
+    start, end = month_bounds(year, month)
+    size = (end - start).days + 1
+
+    headcount = _headcount(department)
+    absences = _month_absences(start, end, department).order_by('employee_id', 'start_date').values_list(
+        'employee_id', 'absence_type_id', 'start_date', 'end_date'
+    )
+
+    by_employee = defaultdict(list)
+    by_employee_type = defaultdict(list)
+    for employee_id, type_id, absence_start, absence_end in absences:
+        interval = (max(absence_start, start), min(absence_end, end))
+        by_employee[employee_id].append(interval)
+        by_employee_type[(employee_id, type_id)].append(interval)
+
+    totals = daily_counts(
+        (interval for intervals in by_employee.values() for interval in merge_intervals(intervals)),
+        start, size,
+    )
+
+    intervals_by_type = defaultdict(list)
+    for (employee_id, type_id), intervals in by_employee_type.items():
+        intervals_by_type[type_id].extend(merge_intervals(intervals))
+    counts_by_type = {
+        type_id: daily_counts(intervals, start, size)
+        for type_id, intervals in intervals_by_type.items()
+    }
+
+    days = []
+    for offset in range(size):
+        absent = totals[offset]
+        days.append({
+            'date': (start + timedelta(days=offset)).isoformat(),
+            'absent': absent,
+            'share': round(absent / headcount * 100, 1) if headcount else 0,
+            'by_type': {
+                str(type_id): counts[offset]
+                for type_id, counts in counts_by_type.items()
+                if counts[offset]
+            },
+        })
+
+    return {'year': year, 'month': month, 'headcount': headcount, 'days': days}
+
+
+def month_heatmap(year, month, department=None):
+    """Mapa de calor de un mes, desde la caché si está vigente"""
+    key = f'team-heatmap:{year}-{month:02d}:{department or "*"}:{_data_version()}'
+    data = cache.get(key)
+    if data is None:
+        data = compute_month(year, month, department)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def heatmap(year, month=None, quarter=None, department=None):
+    """
+    Mapa de calor de un mes o de un trimestre (`department`: id, opcional). Devuelve los meses con sus
+    días y la leyenda de tipos de ausencia con su color.
+    """
+    months = QUARTER_MONTHS[quarter] if quarter else (month,)
+    types = {
+        str(absence_type.pk): {'name': absence_type.name, 'code': absence_type.code, 'color': absence_type.color}
+        for absence_type in AbsenceType.objects.all()
+    }
+    return {
+        'department': department or '',
+        'types': types,
+        'months': [month_heatmap(year, m, department) for m in months],
+    }
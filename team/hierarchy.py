@@ -0,0 +1,155 @@
+"""
+Jerarquía de reporte (Employee.manager) con tabla de clausura.
+
+ReportingLine guarda una fila por cada par (jefe, persona a su cargo) a
+cualquier profundidad, más (empleado, empleado) con profundidad 0. Así "todo
+el equipo de X" es un solo join indexado sin recorrer el árbol:
+
+    Absence.objects.filter(employee__ancestor_lines__ancestor_id=lead_id)
+
+Las señales de Employee mantienen la tabla: al crear se copian las filas del
+jefe; al cambiar de jefe solo se reescriben en bloque las filas que unen el
+subárbol movido con sus antiguos y nuevos superiores.
+"""
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Employee, ReportingLine
+
+
+SCOPE_PARAM = 'scope'
+SCOPE_MINE = 'mine'
+
+
+def is_in_subtree(employee_id, root_id):
+    """True si `employee_id` es `root_id` o alguien a su cargo a cualquier nivel"""
+    if employee_id == root_id:
+        return True
+    return ReportingLine.objects.filter(ancestor_id=root_id, descendant_id=employee_id).exists()
+
+
+def in_subtree(queryset, root_id, employee_field='employee'):
+    """Filtra `queryset` al subárbol de `root_id` (incluido) a través de `employee_field`"""
+    prefix = f'{employee_field}__' if employee_field else ''
+    return queryset.filter(**{f'{prefix}ancestor_lines__ancestor_id': root_id})
+
+
+def insert_employee(employee_id, manager_id=None):
+    """Filas de un empleado nuevo: la propia y una por cada superior del jefe"""
+    lines = [ReportingLine(ancestor_id=employee_id, descendant_id=employee_id, depth=0)]
+    if manager_id:
+        lines += [
+            ReportingLine(ancestor_id=ancestor_id, descendant_id=employee_id, depth=depth + 1)
+            for ancestor_id, depth in ReportingLine.objects.filter(descendant_id=manager_id).values_list(
+                'ancestor_id', 'depth'
+            )
+        ]
+    ReportingLine.objects.bulk_create(lines, ignore_conflicts=True)
+
+
+def move_subtree(employee_id, manager_id):
+    """
+    Cuelga el subárbol de `employee_id` de `manager_id` (None: sin jefe). Las
+    filas internas del subárbol no cambian; se borran las que lo unían a sus
+    antiguos superiores y se insertan (superiores del jefe × subárbol).
+    """
+    subtree = list(ReportingLine.objects.filter(ancestor_id=employee_id).values_list('descendant_id', 'depth'))
+    if not subtree:
+        # Empleado anterior a la tabla: rebuild_reporting_lines() completa el resto
+        insert_employee(employee_id, manager_id)
+        return
+    subtree_ids = [descendant_id for descendant_id, _ in subtree]
+
+    with transaction.atomic():
+        ReportingLine.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        if manager_id:
+            ancestors = ReportingLine.objects.filter(descendant_id=manager_id).values_list('ancestor_id', 'depth')
+            ReportingLine.objects.bulk_create(
+                [
+                    ReportingLine(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=above + below + 1)
+                    for ancestor_id, above in ancestors
+                    for descendant_id, below in subtree
+                ],
+                batch_size=1000,
+            )
+
+
+def insert_missing_employees():
+    """
+    Filas de los empleados creados sin señales (bulk_create de la importación);
+    devuelve cuántos se agregaron
+    """
+    missing = list(
+        Employee.objects.filter(
+            ~Exists(ReportingLine.objects.filter(descendant_id=OuterRef('pk'), depth=0))
+        ).values_list('pk', 'manager_id')
+    )
+    ReportingLine.objects.bulk_create(
+        [ReportingLine(ancestor_id=pk, descendant_id=pk, depth=0) for pk, manager_id in missing if not manager_id],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    for pk, manager_id in missing:
+        if manager_id:
+            insert_employee(pk, manager_id)
+    return len(missing)
+
+
+def rebuild_reporting_lines(batch_size=1000):
+    """Reconstruye toda la tabla desde Employee.manager; devuelve las filas creadas"""
+    managers = dict(Employee.objects.values_list('pk', 'manager_id'))
+    lines = []
+    for employee_id in managers:
+        depth, current, seen = 0, employee_id, set()
+        # Los ciclos que ya existan en los datos cortan la cadena
+        while current is not None and current not in seen:
+            seen.add(current)
+            lines.append(ReportingLine(ancestor_id=current, descendant_id=employee_id, depth=depth))
+            current = managers.get(current)
+            depth += 1
+
+    with transaction.atomic():
+        ReportingLine.objects.all().delete()
+        ReportingLine.objects.bulk_create(lines, batch_size=batch_size)
+    return len(lines)
+
+
+class ReportingScope(NamedTuple):
+    """Alcance de una vista: todo el equipo o el subárbol del usuario (?scope=mine)"""
+    root_id: Optional[int]
+    available: bool
+    all_query: str
+    mine_query: str
+
+    @property
+    def mine(self):
+        return self.root_id is not None
+
+    @property
+    def suffix(self):
+        """Parámetro para conservar el alcance en enlaces que arman su propia URL"""
+        return f'&{SCOPE_PARAM}={SCOPE_MINE}' if self.mine else ''
+
+    def apply(self, queryset, employee_field='employee'):
+        if self.root_id is None:
+            return queryset
+        return in_subtree(queryset, self.root_id, employee_field)
+
+
+def reporting_scope(request):
+    """
+    Lee ?scope=mine. Solo se ofrece a quien tiene personas a cargo; el
+    subárbol incluye al propio usuario.
+    """
+    employee_id = Employee.objects.filter(user_id=request.user.pk).values_list('pk', flat=True).first()
+    available = bool(employee_id) and ReportingLine.objects.filter(ancestor_id=employee_id, depth__gt=0).exists()
+    mine = available and request.GET.get(SCOPE_PARAM) == SCOPE_MINE
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    params.pop(SCOPE_PARAM, None)
+    all_query = params.urlencode()
+    params[SCOPE_PARAM] = SCOPE_MINE
+    return ReportingScope(employee_id if mine else None, available, all_query, params.urlencode())
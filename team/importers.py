@@ -0,0 +1,451 @@
+"""
+Importación masiva de empleados y ausencias desde CSV o JSON.
+
+Las filas se procesan por lotes: cada lote se valida con formularios sin
+consultas por fila, las referencias (usuarios, empleados, tipos de ausencia)
+se resuelven con una consulta por lote y los registros se insertan o
+actualizan con bulk_create(update_conflicts=True) dentro de una transacción.
+Las filas con errores se reportan y se omiten; el resto del lote se guarda.
+
+bulk_create no dispara señales, así que al terminar se hace una sola vez lo
+que harían por cada registro: recalcular las vacaciones de cada (empleado,
+año) afectado, los contadores de los departamentos y la versión del mapa de
+calor. Los feeds de calendario se derivan de los datos y no necesitan
+invalidarse. Los departamentos se resuelven por nombre y se crean los que no existen.
+
+    result = import_absences(open('ausencias.csv', 'rb'), fmt='csv')
+"""
+import codecs
+import csv
+import io
+import json
+from collections import defaultdict
+from itertools import islice
+from typing import NamedTuple
+
+from django import forms
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from boss_core.side_effects import defer_side_effects
+
+from .departments import department_key, mark_absent_today_stale, refresh_headcounts, resolve_departments
+from .entitlements import refresh_vacations
+from .heatmap import heatmap_changed
+from .hierarchy import insert_missing_employees
+from .models import Absence, AbsenceType, Employee
+
+
+IMPORT_CHUNK_SIZE = 500
+READ_CHUNK_SIZE = 64 * 1024
+IMPORT_FORMATS = ('csv', 'json')
+# Errores que se conservan para mostrar; el conteo total siempre es exacto
+MAX_REPORTED_ERRORS = 200
+
+EMPLOYEE_COLUMNS = [
+    'employee_id', 'username', 'first_name', 'last_name', 'email', 'birth_date', 'hire_date',
+    'position', 'department', 'phone', 'mobile', 'emergency_contact', 'emergency_phone', 'notes', 'is_active',
+]
+ABSENCE_COLUMNS = ['employee_id', 'absence_type', 'start_date', 'end_date', 'reason', 'notes']
+
+
+class ImportFileError(Exception):
+    """El archivo no se puede leer (formato, codificación o estructura)"""
+
+
+class RowError(NamedTuple):
+    line: int
+    messages: list
+
+    def __str__(self):
+        return f'Fila {self.line}: {"; ".join(self.messages)}'
+
+
+class ImportResult(NamedTuple):
+    created: int
+    updated: int
+    errors: list
+    error_count: int
+    dry_run: bool
+
+    @property
+    def total(self):
+        return self.created + self.updated
+
+
+class EmployeeRowForm(forms.Form):
+    """Validación de una fila de empleado; la unicidad se revisa por lote"""
+    employee_id = forms.CharField(max_length=20)
+    username = forms.CharField(max_length=150)
+    first_name = forms.CharField(max_length=150)
+    last_name = forms.CharField(max_length=150)
+    email = forms.EmailField(required=False)
+    birth_date = forms.DateField()
+    hire_date = forms.DateField()
+    position = forms.CharField(max_length=100)
+    department = forms.CharField(max_length=100)
+    phone = forms.CharField(max_length=20, required=False)
+    mobile = forms.CharField(max_length=20, required=False)
+    emergency_contact = forms.CharField(max_length=100, required=False)
+    emergency_phone = forms.CharField(max_length=20, required=False)
+    notes = forms.CharField(required=False)
+    is_active = forms.NullBooleanField(required=False)
+
+
+class AbsenceRowForm(forms.Form):
+    """Validación de una fila de ausencia; empleado y tipo se resuelven por lote"""
+    employee_id = forms.CharField(max_length=20)
+    absence_type = forms.CharField(max_length=10, help_text='Código del tipo de ausencia')
+    start_date = forms.DateField()
+    end_date = forms.DateField()
+    reason = forms.CharField(required=False)
+    notes = forms.CharField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise forms.ValidationError('La fecha de fin debe ser posterior a la fecha de inicio.')
+        return cleaned_data
+
+
+def read_rows(file, fmt):
+    """
+    Recorre las filas del archivo como diccionarios: CSV con encabezados o JSON
+    con una lista de objetos. Devuelve pares (número de fila, datos).
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ImportFileError(f'Formato no soportado: {fmt}. Use csv o json.')
+
+    if fmt == 'json':
+        try:
+            data = json.load(file)
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise ImportFileError(f'JSON inválido: {exc}')
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            raise ImportFileError('El JSON debe ser una lista de objetos.')
+        return enumerate(data, start=1)
+
+    text = io.TextIOWrapper(file, encoding=_csv_encoding(file), newline='') if isinstance(file.read(0), bytes) else file
+    reader = csv.DictReader(text)
+    try:
+        fieldnames = reader.fieldnames
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(f'CSV ilegible: {exc}')
+    if not fieldnames:
+        raise ImportFileError('El CSV está vacío o no tiene encabezados.')
+    return _csv_rows(reader)
+
+
+def _csv_encoding(file):
+    """
+    utf-8-sig (acepta archivos guardados desde Excel con BOM) si todo el
+    archivo es UTF-8 válido; si no, cp1252, la codificación de Excel en
+    Windows. Se recorre por bloques sin cargarlo en memoria.
+    """
+    if not file.seekable():
+        return 'utf-8-sig'
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), b''):
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'cp1252'
+    file.seek(0)
+    return encoding
+
+
+def _csv_rows(reader):
+    """Pares (número de fila, datos); la fila 1 es el encabezado"""
+    try:
+        for line, row in enumerate(reader, start=2):
+            yield line, row
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(f'CSV ilegible cerca de la fila {reader.line_num + 1}: {exc}')
+
+
+def _chunks(rows, size):
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _form_errors(form):
+    return [
+        f'{field}: {message}' if field != '__all__' else message
+        for field, messages in form.errors.items()
+        for message in messages
+    ]
+
+
+def _normalize(data, columns):
+    """Limpia espacios y descarta columnas desconocidas"""
+    return {
+        column: (value.strip() if isinstance(value, str) else value)
+        for column, value in data.items()
+        if column in columns
+    }
+
+
+class _Importer:
+    """Recorre los lotes, acumula los errores y hace las tareas finales"""
+    columns = ()
+    form_class = None
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False, stdout=None):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.stdout = stdout
+        self.created = self.updated = self.error_count = 0
+        self.errors = []
+
+    def error(self, line, messages):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(line, messages))
+
+    def run(self, rows):
+        processed = 0
+        with defer_side_effects():
+            for chunk in _chunks(iter(rows), self.chunk_size):
+                valid = []
+                for line, data in chunk:
+                    form = self.form_class(_normalize(data, self.columns))
+                    if form.is_valid():
+                        valid.append((line, form.cleaned_data))
+                    else:
+                        self.error(line, _form_errors(form))
+                if valid:
+                    with transaction.atomic():
+                        self.save_chunk(valid)
+                processed += len(chunk)
+                if self.stdout:
+                    self.stdout.write(f'  {processed} fila(s) procesada(s)...')
+        if not self.dry_run:
+            self.finish()
+        return ImportResult(self.created, self.updated, self.errors, self.error_count, self.dry_run)
+
+    def save_chunk(self, rows):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+
+class EmployeeImporter(_Importer):
+    columns = EMPLOYEE_COLUMNS
+    form_class = EmployeeRowForm
+
+    def save_chunk(self, rows):
+        rows = self._unique(rows)
+        employee_ids = [data['employee_id'] for _, data in rows]
+        usernames = [data['username'] for _, data in rows]
+
+        # Dueños actuales de los IDs y de los usuarios del lote: dos consultas
+        current = {
+            employee_id: (username, is_active)
+            for employee_id, username, is_active in Employee.objects.filter(
+                employee_id__in=employee_ids
+            ).values_list('employee_id', 'user__username', 'is_active')
+        }
+        username_by_employee = {employee_id: username for employee_id, (username, _) in current.items()}
+        employee_by_username = dict(
+            User.objects.filter(username__in=usernames).values_list('username', 'employee_profile__employee_id')
+        )
+
+        accepted = []
+        for line, data in rows:
+            current_username = username_by_employee.get(data['employee_id'])
+            if current_username is not None and current_username != data['username']:
+                self.error(line, [f'El empleado {data["employee_id"]} pertenece al usuario {current_username}.'])
+            elif current_username is None and data['username'] in employee_by_username:
+                # No se reutilizan cuentas existentes (p. ej. administradores sin perfil de empleado)
+                owner = employee_by_username[data['username']]
+                self.error(line, [
+                    f'El usuario {data["username"]} ya está asignado al empleado {owner}.' if owner
+                    else f'El usuario {data["username"]} ya existe.'
+                ])
+            else:
+                accepted.append(data)
+
+        existing = sum(1 for data in accepted if data['employee_id'] in username_by_employee)
+        self.updated += existing
+        self.created += len(accepted) - existing
+        if self.dry_run or not accepted:
+            return
+
+        # Los usuarios nuevos quedan sin contraseña utilizable hasta que la restablezcan
+        User.objects.bulk_create(
+            [
+                User(
+                    username=data['username'], first_name=data['first_name'], last_name=data['last_name'],
+                    email=data['email'], password=make_password(None),
+                )
+                for data in accepted
+            ],
+            update_conflicts=True,
+            unique_fields=['username'],
+            update_fields=['first_name', 'last_name', 'email'],
+        )
+        user_ids = dict(User.objects.filter(
+            username__in=[data['username'] for data in accepted]
+        ).values_list('username', 'pk'))
+
+        departments = resolve_departments(data['department'] for data in accepted)
+
+        fields = [
+            column for column in EMPLOYEE_COLUMNS
+            if column not in ('username', 'first_name', 'last_name', 'email', 'department', 'is_active')
+        ]
+        Employee.objects.bulk_create(
+            [
+                Employee(
+                    user_id=user_ids[data['username']],
+                    **{field: data[field] for field in fields},
+                    department=departments[department_key(data['department'])],
+                    department_name=departments[department_key(data['department'])].name,
+                    # Sin valor en el archivo se conserva el estado guardado (las bajas siguen de baja)
+                    is_active=data['is_active'] if data['is_active'] is not None
+                    else current.get(data['employee_id'], (None, True))[1],
+                )
+                for data in accepted
+            ],
+            update_conflicts=True,
+            unique_fields=['employee_id'],
+            update_fields=[field for field in fields if field != 'employee_id'] + [
+                'department', 'department_name', 'is_active', 'updated_at',
+            ],
+        )
+
+    def _unique(self, rows):
+        """Si un ID o usuario se repite en el lote, gana la última fila"""
+        by_employee = {}
+        for line, data in rows:
+            by_employee[data['employee_id']] = (line, data)
+        by_username = {}
+        for line, data in by_employee.values():
+            previous = by_username.get(data['username'])
+            if previous:
+                self.error(previous[0], [f'El usuario {data["username"]} se repite en la fila {line}.'])
+            by_username[data['username']] = (line, data)
+        return sorted(by_username.values(), key=lambda item: item[0])
+
+    def finish(self):
+        if not self.dry_run and (self.created or self.updated):
+            refresh_headcounts()
+            mark_absent_today_stale()
+            insert_missing_employees()
+            transaction.on_commit(heatmap_changed)
+
+
+class AbsenceImporter(_Importer):
+    columns = ABSENCE_COLUMNS
+    form_class = AbsenceRowForm
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.types = dict(AbsenceType.objects.values_list('code', 'pk'))
+        self.vacation_type = self.types.get('VAC')
+        self.vacation_pairs = set()
+        self.first_day = self.last_day = None
+
+    def save_chunk(self, rows):
+        employees = dict(Employee.objects.filter(
+            employee_id__in={data['employee_id'] for _, data in rows}
+        ).values_list('employee_id', 'pk'))
+
+        # Clave natural del upsert: (empleado, tipo, inicio); la última fila repetida gana
+        absences = {}
+        for line, data in rows:
+            employee_pk = employees.get(data['employee_id'])
+            type_pk = self.types.get(data['absence_type'])
+            messages = []
+            if employee_pk is None:
+                messages.append(f'No existe el empleado {data["employee_id"]}.')
+            if type_pk is None:
+                messages.append(f'No existe el tipo de ausencia {data["absence_type"]}.')
+            if messages:
+                self.error(line, messages)
+                continue
+            absences[(employee_pk, type_pk, data['start_date'])] = {**data, 'line': line}
+
+        if not absences:
+            return
+
+        # Ausencias ya registradas en el rango del lote: una consulta para el
+        # conteo de actualizaciones y para detectar solapamientos
+        ranges = defaultdict(list)
+        for employee_pk, type_pk, start_date, end_date in Absence.objects.filter(
+            employee_id__in={key[0] for key in absences},
+            end_date__gte=min(key[2] for key in absences),
+            start_date__lte=max(data['end_date'] for data in absences.values()),
+        ).values_list('employee_id', 'absence_type_id', 'start_date', 'end_date'):
+            ranges[employee_pk].append(((employee_pk, type_pk, start_date), end_date))
+        existing = {key for employee_ranges in ranges.values() for key, _ in employee_ranges}
+        for key, data in absences.items():
+            if key not in existing:
+                ranges[key[0]].append((key, data['end_date']))
+
+        accepted = {}
+        for key, data in absences.items():
+            overlap = next((
+                (other, end_date) for other, end_date in ranges[key[0]]
+                if other != key and other[2] <= data['end_date'] and end_date >= key[2]
+            ), None)
+            if overlap:
+                self.error(data['line'], [
+                    f'Se solapa con otra ausencia del {overlap[0][2]:%d/%m/%Y} al {overlap[1]:%d/%m/%Y}.'
+                ])
+            else:
+                accepted[key] = data
+
+        updated = len(accepted.keys() & existing)
+        self.updated += updated
+        self.created += len(accepted) - updated
+        if self.dry_run or not accepted:
+            return
+
+        Absence.objects.bulk_create(
+            [
+                Absence(
+                    employee_id=employee_pk, absence_type_id=type_pk, start_date=start_date,
+                    end_date=data['end_date'], reason=data['reason'], notes=data['notes'],
+                )
+                for (employee_pk, type_pk, start_date), data in accepted.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['employee', 'absence_type', 'start_date'],
+            update_fields=['end_date', 'reason', 'notes', 'updated_at'],
+        )
+
+        for (employee_pk, type_pk, start_date), data in accepted.items():
+            if type_pk == self.vacation_type:
+                self.vacation_pairs.add((employee_pk, start_date.year))
+            self.first_day = min(self.first_day or start_date, start_date)
+            self.last_day = max(self.last_day or data['end_date'], data['end_date'])
+
+    def finish(self):
+        if self.vacation_pairs:
+            refresh_vacations(self.vacation_pairs)
+        if self.first_day:
+            mark_absent_today_stale()
+            transaction.on_commit(heatmap_changed)
+
+
+def import_employees(file, fmt='csv', **options):
+    """Crea o actualiza empleados (y sus usuarios) por `employee_id`"""
+    return EmployeeImporter(**options).run(read_rows(file, fmt))
+
+
+def import_absences(file, fmt='csv', **options):
+    """Crea o actualiza ausencias por (empleado, tipo, fecha de inicio)"""
+    return AbsenceImporter(**options).run(read_rows(file, fmt))
+
+
+IMPORTERS = {
+    'employees': import_employees,
+    'absences': import_absences,
+}
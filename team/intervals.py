@@ -0,0 +1,27 @@
+"""Utilidades para rangos de fechas cerrados [inicio, fin]"""
+from datetime import timedelta
+from itertools import accumulate
+
+
+def merge_intervals(intervals):
+    """Fusiona intervalos ordenados por inicio que se solapan o son contiguos"""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def daily_counts(intervals, start, size):
+    """
+    Número de intervalos que cubren cada día de [start, start + size) usando
+    un arreglo de diferencias. Los intervalos deben estar recortados al rango.
+    """
+    diff = [0] * (size + 1)
+    for interval_start, interval_end in intervals:
+        diff[(interval_start - start).days] += 1
+        diff[(interval_end - start).days + 1] -= 1
+    return list(accumulate(diff[:size]))
@@ -0,0 +1,22 @@
+"""Trabajos en segundo plano del equipo"""
+from jobs.queue import job
+
+from .models import Employee
+from .photos import generate_thumbnails
+from .signals import update_vacation_days
+
+
+@job('team.update_vacation_days')
+def update_vacation_days_job(employee_id, year):
+    """Recalcula los días de vacaciones tomados por el empleado en el año"""
+    employee = Employee.objects.filter(pk=employee_id).first()
+    if employee:
+        update_vacation_days(employee, year)
+
+
+@job('team.generate_photo_thumbnails')
+def generate_photo_thumbnails(employee_id, photo):
+    """Genera las miniaturas de la foto del empleado"""
+    sizes = generate_thumbnails(photo)
+    # Si mientras tanto se subió otra foto, su propio trabajo la actualizará
+    Employee.objects.filter(pk=employee_id, photo=photo).update(photo_thumbnails=sizes)
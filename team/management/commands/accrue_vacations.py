@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from team.entitlements import accrue_entitlements
+
+
+class Command(BaseCommand):
+    help = 'Calcula los días de vacaciones del año para todos los empleados según su antigüedad'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=date.today().year, help='Año a procesar (por defecto el actual)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Empleados por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar los cambios sin guardarlos')
+        parser.add_argument('--only-missing', action='store_true',
+                            help='Solo crear registros faltantes, sin modificar los existentes')
+
+    def handle(self, *args, **options):
+        year = options['year']
+        self.stdout.write(f'Calculando vacaciones {year}{" (simulación)" if options["dry_run"] else ""}...')
+
+        changes = accrue_entitlements(
+            year,
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            only_missing=options['only_missing'],
+            stdout=self.stdout,
+        )
+
+        if options['dry_run'] or options['verbosity'] > 1:
+            for change in changes:
+                if change.is_new:
+                    self.stdout.write(f'  + {change.employee_code}: {change.days} días ({change.tenure_years} años)')
+                else:
+                    self.stdout.write(
+                        f'  ~ {change.employee_code}: {change.previous_days} -> {change.days} días '
+                        f'({change.tenure_years} años)'
+                    )
+
+        created = sum(1 for change in changes if change.is_new)
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} registro(s) nuevo(s), {len(changes) - created} actualizado(s)'
+            f'{" (sin guardar)" if options["dry_run"] else ""}'
+        ))
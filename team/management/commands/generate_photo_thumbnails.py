@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from team.models import Employee
+from team.photos import THUMBNAIL_SIZES, schedule_thumbnails
+
+
+class Command(BaseCommand):
+    help = ('Encola la generación de miniaturas de las fotos de empleados a las que les falta algún tamaño '
+            '(por ejemplo, después de cambiar THUMBNAIL_SIZES)')
+
+    def handle(self, *args, **options):
+        sizes = sorted(THUMBNAIL_SIZES)
+        queued = 0
+        for pk, photo, generated in Employee.objects.exclude(photo='').values_list('pk', 'photo', 'photo_thumbnails'):
+            if sorted(generated or ()) != sizes:
+                schedule_thumbnails(pk, photo)
+                queued += 1
+        self.stdout.write(self.style.SUCCESS(f'{queued} foto(s) en cola'))
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from team.importers import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, IMPORTERS, ImportFileError
+
+
+class Command(BaseCommand):
+    help = 'Importa empleados o ausencias desde un archivo CSV o JSON (crea o actualiza por lotes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help='Qué se importa')
+        parser.add_argument('path', help='Archivo CSV (con encabezados) o JSON (lista de objetos)')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Formato del archivo (por defecto según la extensión)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Filas por lote y transacción')
+        parser.add_argument('--dry-run', action='store_true', help='Validar sin guardar')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'No existe el archivo {path}')
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+
+        with path.open('rb') as file:
+            try:
+                result = IMPORTERS[options['kind']](
+                    file, fmt=fmt, chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+                    stdout=self.stdout if options['verbosity'] > 1 else None,
+                )
+            except ImportFileError as exc:
+                raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f'  {error}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'  ... y {result.error_count - len(result.errors)} error(es) más')
+
+        suffix = ' (sin guardar)' if result.dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} creado(s), {result.updated} actualizado(s), '
+            f'{result.error_count} fila(s) con errores{suffix}'
+        ))
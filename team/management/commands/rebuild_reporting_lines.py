@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from team.hierarchy import rebuild_reporting_lines
+
+
+class Command(BaseCommand):
+    help = ('Reconstruye la tabla de jerarquía (ReportingLine) a partir del jefe directo de cada empleado; '
+            'necesario una vez en bases anteriores a la jerarquía o tras cargas hechas sin señales')
+
+    def handle(self, *args, **options):
+        total = rebuild_reporting_lines()
+        self.stdout.write(self.style.SUCCESS(f'{total} línea(s) de reporte generada(s)'))
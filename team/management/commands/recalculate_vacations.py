@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from team.entitlements import recalculate_days_taken
+
+
+class Command(BaseCommand):
+    help = 'Recalcula en días hábiles los días de vacaciones tomados de todos los empleados en un año'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=date.today().year, help='Año a recalcular (por defecto el actual)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Registros por lote de bulk_update')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar los cambios sin guardarlos')
+
+    def handle(self, *args, **options):
+        changed = recalculate_days_taken(options['year'], chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+
+        if options['dry_run'] or options['verbosity'] > 1:
+            for vacation in changed:
+                self.stdout.write(f'  {vacation.employee.employee_id}: {vacation.days_taken} día(s) tomado(s)')
+
+        suffix = ' (sin guardar)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f'{len(changed)} registro(s) actualizado(s){suffix}'))
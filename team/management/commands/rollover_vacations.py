@@ -0,0 +1,57 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from team.entitlements import expire_carryover, rollover_vacations
+
+
+class Command(BaseCommand):
+    help = 'Arrastra los días de vacaciones pendientes al año siguiente y aplica su vencimiento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-year', type=int, default=date.today().year - 1,
+                            help='Año origen de los días pendientes (por defecto el anterior)')
+        parser.add_argument('--max-days', type=int, default=None,
+                            help='Máximo de días a arrastrar (por defecto VACATION_CARRYOVER_MAX_DAYS)')
+        parser.add_argument('--expiry-months', type=int, default=None,
+                            help='Meses del nuevo año para usar los días arrastrados '
+                                 '(por defecto VACATION_CARRYOVER_EXPIRY_MONTHS)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Empleados por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar los cambios sin guardarlos')
+        parser.add_argument('--expire', action='store_true',
+                            help='Solo aplicar el vencimiento de los días ya arrastrados al año siguiente')
+
+    def handle(self, *args, **options):
+        to_year = options['from_year'] + 1
+        suffix = ' (sin guardar)' if options['dry_run'] else ''
+
+        if options['expire']:
+            forfeited = expire_carryover(to_year, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+            self.stdout.write(self.style.SUCCESS(f'{forfeited} día(s) arrastrado(s) vencido(s) en {to_year}{suffix}'))
+            return
+
+        self.stdout.write(f'Arrastrando vacaciones de {options["from_year"]} a {to_year}...')
+        changes = rollover_vacations(
+            options['from_year'],
+            to_year,
+            max_carryover=options['max_days'],
+            expiry_months=options['expiry_months'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            stdout=self.stdout,
+        )
+
+        if options['dry_run'] or options['verbosity'] > 1:
+            for change in changes:
+                previous = 'nuevo' if change.is_new else f'antes {change.previous_carried}'
+                self.stdout.write(
+                    f'  {change.employee_code}: {change.pending_days} pendiente(s) -> '
+                    f'{change.carried_days} arrastrado(s) ({previous})'
+                )
+
+        created = sum(1 for change in changes if change.is_new)
+        carried = sum(change.carried_days for change in changes)
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} registro(s) nuevo(s), {len(changes) - created} actualizado(s), '
+            f'{carried} día(s) arrastrado(s){suffix}'
+        ))
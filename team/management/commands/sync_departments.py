@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from team.departments import sync_departments
+
+
+class Command(BaseCommand):
+    help = ('Crea los departamentos a partir del texto de empleados y umbrales, une los duplicados '
+            '(mayúsculas y espacios) y recalcula sus contadores')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar los cambios sin guardarlos')
+
+    def handle(self, *args, **options):
+        result = sync_departments(dry_run=options['dry_run'])
+
+        suffix = ' (sin guardar)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} departamento(s) nuevo(s), {result.merged} duplicado(s) unido(s), '
+            f'{result.employees} empleado(s) y {result.thresholds} umbral(es) enlazado(s){suffix}'
+        ))
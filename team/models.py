@@ -1,9 +1,41 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils.functional import cached_property
 from datetime import date
 
 
+class Department(models.Model):
+    """
+    Departamento del equipo. Guarda contadores precalculados: `headcount` se
+    ajusta al guardar o eliminar empleados y `absent_today` se recalcula al
+    cambiar una ausencia del día o al leerlo en otra fecha (team/departments.py).
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name='Nombre')
+    headcount = models.PositiveIntegerField(default=0, editable=False, verbose_name='Empleados Activos')
+    absent_today = models.PositiveIntegerField(default=0, editable=False, verbose_name='Ausentes Hoy')
+    absent_today_on = models.DateField(null=True, blank=True, editable=False, verbose_name='Ausentes Calculado el')
+
+    class Meta:
+        verbose_name = 'Departamento'
+        verbose_name_plural = 'Departamentos'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        from .departments import normalize_department_name
+
+        self.name = normalize_department_name(self.name)
+        renamed = self.pk and Department.objects.filter(pk=self.pk).exclude(name=self.name).exists()
+        super().save(*args, **kwargs)
+        if renamed:
+            # La copia del nombre en los empleados y umbrales sigue al departamento
+            self.employees.update(department_name=self.name)
+            StaffingThreshold.objects.filter(department=self).update(department_name=self.name)
+
+
 class Employee(models.Model):
     """Modelo para la información básica de los empleados del equipo"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='employee_profile')
@@ -13,10 +45,18 @@ class Employee(models.Model):
     birth_date = models.DateField(verbose_name='Fecha de Nacimiento')
     hire_date = models.DateField(verbose_name='Fecha de Ingreso')
     position = models.CharField(max_length=100, verbose_name='Cargo')
-    department = models.CharField(max_length=100, verbose_name='Departamento')
+    department = models.ForeignKey(Department, on_delete=models.PROTECT, null=True, related_name='employees', verbose_name='Departamento')
+    # Columna de texto anterior al modelo Department: copia del nombre para
+    # mostrarlo sin join; al crear con solo el nombre se resuelve el departamento
+    department_name = models.CharField(max_length=100, blank=True, editable=False, db_column='department', verbose_name='Nombre del Departamento')
+    manager = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='direct_reports', verbose_name='Jefe Directo')
     emergency_contact = models.CharField(max_length=100, blank=True, verbose_name='Contacto de Emergencia')
     emergency_phone = models.CharField(max_length=20, blank=True, verbose_name='Teléfono de Emergencia')
     notes = models.TextField(blank=True, verbose_name='Notas')
+    # Original nombrado por su hash de contenido; ver team/photos.py
+    photo = models.ImageField(upload_to='employees/photos', max_length=200, blank=True, editable=False, verbose_name='Foto')
+    # Claves de THUMBNAIL_SIZES ya generadas por el trabajo de miniaturas
+    photo_thumbnails = models.JSONField(default=list, blank=True, editable=False, verbose_name='Miniaturas')
     is_active = models.BooleanField(default=True, verbose_name='Activo')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -25,14 +65,40 @@ class Employee(models.Model):
         verbose_name = 'Empleado'
         verbose_name_plural = 'Empleados'
         ordering = ['user__first_name', 'user__last_name']
+        indexes = [
+            # Filtros por departamento (solo activos) y conteo de plantilla
+            models.Index(fields=['department', 'is_active'], name='employee_dept_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.position}"
 
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .hierarchy import is_in_subtree
+
+        if self.manager_id and self.pk and is_in_subtree(self.manager_id, self.pk):
+            raise ValidationError({'manager': 'El jefe directo no puede ser el mismo empleado ni alguien a su cargo.'})
+
+    def save(self, *args, **kwargs):
+        from .departments import department_for_name
+
+        if self.department_id is None and self.department_name:
+            self.department = department_for_name(self.department_name)
+        if self.department_id:
+            self.department_name = self.department.name
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         return self.user.get_full_name()
 
+    @cached_property
+    def photo_urls(self):
+        """URLs de las miniaturas por tamaño y formato: photo_urls.md.webp"""
+        from .photos import photo_urls
+        return photo_urls(self)
+
     @property
     def age(self):
         today = date.today()
@@ -44,6 +110,31 @@ class Employee(models.Model):
         return today.year - self.hire_date.year - ((today.month, today.day) < (self.hire_date.month, self.hire_date.day))
 
 
+class ReportingLine(models.Model):
+    """
+    Tabla de clausura de la jerarquía: una fila por cada par (jefe, persona a
+    su cargo) a cualquier nivel, más la fila (empleado, empleado) con
+    profundidad 0. La mantiene team/hierarchy.py a partir de Employee.manager.
+    """
+    ancestor = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='descendant_lines', verbose_name='Jefe')
+    descendant = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='ancestor_lines', verbose_name='Empleado')
+    depth = models.PositiveSmallIntegerField(verbose_name='Niveles')
+
+    class Meta:
+        verbose_name = 'Línea de Reporte'
+        verbose_name_plural = 'Líneas de Reporte'
+        constraints = [
+            # El índice único (ancestor, descendant) resuelve "todo el equipo de X"
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_reporting_line'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='reporting_descendant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} → {self.descendant_id} ({self.depth})"
+
+
 class AbsenceType(models.Model):
     """Tipos de ausencias"""
     name = models.CharField(max_length=50, verbose_name='Tipo de Ausencia')
@@ -76,6 +167,21 @@ class Absence(models.Model):
         verbose_name = 'Ausencia'
         verbose_name_plural = 'Ausencias'
         ordering = ['-start_date']
+        indexes = [
+            # El predicado de solapamiento (start_date <= fin AND end_date >= inicio)
+            # se resuelve por rango sobre end_date: el historial antiguo queda fuera
+            # del índice sin leerlo.
+            models.Index(fields=['employee', 'end_date', 'start_date'], name='absence_emp_range_idx'),
+            models.Index(fields=['end_date', 'start_date'], name='absence_range_idx'),
+        ]
+        constraints = [
+            # Clave natural para las importaciones masivas (upsert por empleado, tipo e inicio)
+            models.UniqueConstraint(
+                fields=['employee', 'absence_type', 'start_date'],
+                name='unique_absence_start',
+                violation_error_message='El empleado ya tiene una ausencia de este tipo que inicia en esa fecha.',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.employee.full_name} - {self.absence_type.name} ({self.start_date} - {self.end_date})"
@@ -84,12 +190,63 @@ class Absence(models.Model):
     def duration_days(self):
         return (self.end_date - self.start_date).days + 1
 
+    @cached_property
+    def business_days(self):
+        """
+        Días hábiles de la ausencia (sin fines de semana ni festivos). En listas
+        se asigna para toda la página con workdays.attach_business_days().
+        """
+        from .workdays import business_days_between
+        return business_days_between(self.start_date, self.end_date)
+
     def clean(self):
         from django.core.exceptions import ValidationError
         if self.end_date < self.start_date:
             raise ValidationError('La fecha de fin debe ser posterior a la fecha de inicio.')
 
 
+class Holiday(models.Model):
+    """Días festivos que no cuentan como días hábiles"""
+    date = models.DateField(unique=True, verbose_name='Fecha')
+    name = models.CharField(max_length=100, verbose_name='Nombre')
+    # Forma parte de la versión del calendario de días hábiles (team/workdays.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Día Festivo'
+        verbose_name_plural = 'Días Festivos'
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.name} ({self.date:%d/%m/%Y})"
+
+
+class StaffingThreshold(models.Model):
+    """Máximo de personas de un departamento que pueden estar ausentes el mismo día"""
+    department = models.OneToOneField(Department, on_delete=models.CASCADE, null=True, related_name='staffing_threshold', verbose_name='Departamento')
+    # Columna de texto anterior al modelo Department (ver Employee.department_name)
+    department_name = models.CharField(max_length=100, blank=True, editable=False, db_column='department', verbose_name='Nombre del Departamento')
+    max_absent = models.PositiveIntegerField(verbose_name='Máximo de Ausentes por Día')
+    notes = models.TextField(blank=True, verbose_name='Notas')
+
+    class Meta:
+        verbose_name = 'Umbral de Personal'
+        verbose_name_plural = 'Umbrales de Personal'
+        ordering = ['department_name']
+
+    def __str__(self):
+        return f"{self.department_name}: máximo {self.max_absent} ausente(s)"
+
+    def save(self, *args, **kwargs):
+        from .departments import department_for_name
+
+        if self.department_id is None and self.department_name:
+            self.department = department_for_name(self.department_name)
+        if self.department_id:
+            self.department_name = self.department.name
+        super().save(*args, **kwargs)
+
+
 class Vacation(models.Model):
     """Modelo para el control de vacaciones"""
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='vacations', verbose_name='Empleado')
@@ -97,6 +254,8 @@ class Vacation(models.Model):
     days_entitled = models.IntegerField(default=0, verbose_name='Días Correspondientes')
     days_taken = models.IntegerField(default=0, verbose_name='Días Tomados')
     days_pending = models.IntegerField(default=0, verbose_name='Días Pendientes')
+    days_carried_over = models.IntegerField(default=0, verbose_name='Días Arrastrados del Año Anterior')
+    carryover_expires_on = models.DateField(null=True, blank=True, verbose_name='Vencimiento de Días Arrastrados')
     notes = models.TextField(blank=True, verbose_name='Notas')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -111,9 +270,18 @@ class Vacation(models.Model):
         return f"{self.employee.full_name} - {self.year} ({self.days_pending} días pendientes)"
 
     def save(self, *args, **kwargs):
-        self.days_pending = self.days_entitled - self.days_taken
+        self.days_pending = self.days_entitled + self.days_carried_over - self.days_taken
         super().save(*args, **kwargs)
 
+    def carryover_available_on(self, day, used_days=0):
+        """
+        Días arrastrados utilizables en `day`. Tras el vencimiento solo cuentan
+        los que ya se usaron (`used_days`).
+        """
+        if self.carryover_expires_on and day > self.carryover_expires_on:
+            return min(self.days_carried_over, used_days)
+        return self.days_carried_over
+
 
 class Birthday(models.Model):
     """Vista para cumpleaños (calculado desde Employee)"""
@@ -123,13 +291,13 @@ class Birthday(models.Model):
         verbose_name_plural = 'Cumpleaños'
 
     @classmethod
-    def get_upcoming_birthdays(cls, days=30):
-        """Obtiene los cumpleaños en los próximos días"""
+    def get_upcoming_birthdays(cls, days=30, employees=None):
+        """Obtiene los cumpleaños en los próximos días (de `employees`, por defecto todos)"""
         from datetime import datetime, timedelta
         today = date.today()
         end_date = today + timedelta(days=days)
         
-        employees = Employee.objects.filter(is_active=True)
+        employees = (Employee.objects.all() if employees is None else employees).filter(is_active=True)
         upcoming = []
         
         for emp in employees:
@@ -0,0 +1,158 @@
+"""
+Fotos de empleados.
+
+El original se guarda con el SHA-256 de su contenido como nombre
+(employees/photos/<hash>.<ext>) y un trabajo de la cola genera miniaturas
+cuadradas de tamaño fijo en WebP y JPEG (employees/thumbs/<hash>-<px>.webp|jpg).
+Como el nombre cambia cuando cambia la imagen, se sirven con caché de un año
+(immutable) y las listas y el tablero cargan imágenes de pocos KB ya
+recortadas en lugar de la foto completa.
+"""
+import hashlib
+import io
+import re
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from jobs.queue import enqueue
+
+
+PHOTO_DIR = 'employees/photos'
+THUMBNAIL_DIR = 'employees/thumbs'
+
+# Lado en píxeles de cada miniatura (el doble del tamaño en pantalla, para pantallas HiDPI)
+THUMBNAIL_SIZES = {'sm': 64, 'md': 96, 'lg': 160}
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+PHOTO_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+PHOTO_MAX_BYTES = 5 * 1024 * 1024
+PHOTO_CACHE_SECONDS = 365 * 24 * 3600
+
+PHOTO_NAME_RE = re.compile(r'^(?P<digest>[0-9a-f]{64})(?:-(?P<size>\d+))?\.(?P<ext>jpg|png|webp|gif)$')
+CONTENT_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp', 'gif': 'image/gif'}
+
+
+def content_hash(file):
+    """SHA-256 del archivo leído por bloques"""
+    file.seek(0)
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def photo_digest(name):
+    """Hash de contenido a partir del nombre guardado en Employee.photo"""
+    match = PHOTO_NAME_RE.match(name.rsplit('/', 1)[-1]) if name else None
+    return match.group('digest') if match else None
+
+
+def thumbnail_name(digest, size, ext):
+    return f'{THUMBNAIL_DIR}/{digest}-{size}.{ext}'
+
+
+def storage_path(file_name):
+    """Ruta en el almacenamiento de un nombre servido por employee_photo, o None"""
+    match = PHOTO_NAME_RE.match(file_name)
+    if not match:
+        return None
+    return f'{THUMBNAIL_DIR if match.group("size") else PHOTO_DIR}/{file_name}'
+
+
+def store_photo(employee, file):
+    """
+    Guarda la foto subida (una sola copia por contenido) y encola sus
+    miniaturas. Las anteriores dejan de mostrarse al cambiar el nombre.
+    """
+    from .models import Employee
+
+    digest = content_hash(file)
+    with Image.open(file) as image:
+        ext = PHOTO_FORMATS[image.format]
+    file.seek(0)
+
+    name = f'{PHOTO_DIR}/{digest}.{ext}'
+    if not default_storage.exists(name):
+        default_storage.save(name, file)
+
+    employee.photo = name
+    employee.photo_thumbnails = []
+    Employee.objects.filter(pk=employee.pk).update(photo=name, photo_thumbnails=[])
+    schedule_thumbnails(employee.pk, name)
+
+
+def clear_photo(employee):
+    from .models import Employee
+
+    employee.photo = ''
+    employee.photo_thumbnails = []
+    Employee.objects.filter(pk=employee.pk).update(photo='', photo_thumbnails=[])
+
+
+def schedule_thumbnails(employee_id, photo):
+    """Encola la generación de miniaturas al confirmar la transacción"""
+    transaction.on_commit(lambda: enqueue(
+        'team.generate_photo_thumbnails',
+        {'employee_id': employee_id, 'photo': photo},
+        dedupe_key=f'photo-thumbnails:{employee_id}:{photo_digest(photo)}',
+    ))
+
+
+def generate_thumbnails(photo):
+    """
+    Genera las miniaturas que falten de la foto y devuelve las claves de
+    THUMBNAIL_SIZES disponibles. Las ya existentes (mismo contenido subido
+    para otro empleado) se reutilizan.
+    """
+    digest = photo_digest(photo)
+    pending = [
+        (key, size, ext, pil_format, options)
+        for key, size in THUMBNAIL_SIZES.items()
+        for ext, (pil_format, options) in THUMBNAIL_FORMATS.items()
+        if not default_storage.exists(thumbnail_name(digest, size, ext))
+    ]
+    if pending:
+        largest = max(THUMBNAIL_SIZES.values())
+        with default_storage.open(photo) as file, Image.open(file) as image:
+            # En JPEG decodifica directamente a una escala reducida
+            image.draft('RGB', (largest * 2, largest * 2))
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            else:
+                image = image.convert('RGB')
+
+            thumbnails = {}
+            for key, size, ext, pil_format, options in pending:
+                if size not in thumbnails:
+                    thumbnails[size] = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                thumbnails[size].save(buffer, pil_format, **options)
+                default_storage.save(thumbnail_name(digest, size, ext), ContentFile(buffer.getvalue()))
+    return list(THUMBNAIL_SIZES)
+
+
+def photo_urls(employee):
+    """{'sm': {'webp': url, 'jpg': url}, ...} de las miniaturas ya generadas"""
+    from django.urls import reverse
+
+    digest = photo_digest(employee.photo.name)
+    if not digest:
+        return {}
+    return {
+        key: {
+            ext: reverse('team:employee_photo', args=[f'{digest}-{THUMBNAIL_SIZES[key]}.{ext}'])
+            for ext in THUMBNAIL_FORMATS
+        }
+        for key in employee.photo_thumbnails or ()
+        if key in THUMBNAIL_SIZES
+    }
@@ -1,7 +1,17 @@
-from django.db.models.signals import post_save, post_delete
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from django.db import transaction
-from .models import Absence, Vacation, AbsenceType
+from boss_core.side_effects import deferred
+from jobs.queue import enqueue
+from .departments import adjust_headcount, mark_absent_today_stale
+from .entitlements import get_or_create_vacation
+from .heatmap import heatmap_changed
+from .hierarchy import insert_employee, is_in_subtree, move_subtree
+from .models import Absence, AbsenceType, Department, Employee, Holiday
+from .workdays import business_days_between, holidays_changed, total_business_days
 
 
 @receiver(post_save, sender=Absence)
@@ -9,11 +19,17 @@ def update_vacation_on_absence_save(sender, instance, created, **kwargs):
     """
     Actualiza el modelo Vacation cuando se crea o modifica una ausencia de tipo vacaciones
     """
+    effects = deferred()
+    if effects is not None:
+        # Sin consultas por registro: el tipo se resuelve al terminar el bloque
+        effects.absences.add((instance.employee_id, instance.absence_type_id, instance.start_date.year))
+        return
+    
     # Verificar si es una ausencia de tipo vacaciones
     try:
         vacation_type = AbsenceType.objects.get(code='VAC')
         if instance.absence_type == vacation_type:
-            update_vacation_days(instance.employee, instance.start_date.year)
+            schedule_vacation_update(instance.employee_id, instance.start_date.year)
     except AbsenceType.DoesNotExist:
         # Si no existe el tipo VAC, no hacer nada
         pass
@@ -24,29 +40,150 @@ def update_vacation_on_absence_delete(sender, instance, **kwargs):
     """
     Actualiza el modelo Vacation cuando se elimina una ausencia de tipo vacaciones
     """
+    effects = deferred()
+    if effects is not None:
+        # Sin consultas por registro: el tipo se resuelve al terminar el bloque
+        effects.absences.add((instance.employee_id, instance.absence_type_id, instance.start_date.year))
+        return
+    
     # Verificar si era una ausencia de tipo vacaciones
     try:
         vacation_type = AbsenceType.objects.get(code='VAC')
         if instance.absence_type == vacation_type:
-            update_vacation_days(instance.employee, instance.start_date.year)
+            schedule_vacation_update(instance.employee_id, instance.start_date.year)
     except AbsenceType.DoesNotExist:
         pass
 
 
+@receiver(pre_save, sender=Absence)
+def remember_absence_range(sender, instance, **kwargs):
+    """Guarda el rango anterior de la ausencia (conteo de ausentes del día)"""
+    instance._previous_range = None
+    effects = deferred()
+    if instance.pk and effects is not None:
+        # Sin consulta por registro: el conteo del día se recalcula al cerrar el bloque
+        effects.absent_today = True
+        return
+    if instance.pk:
+        instance._previous_range = Absence.objects.filter(pk=instance.pk).values_list(
+            'start_date', 'end_date'
+        ).first()
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def refresh_calendar_on_holiday_change(sender, **kwargs):
+    """Dentro de la misma petición, el calendario de días hábiles vuelve a leer los festivos"""
+    holidays_changed()
+
+
+@receiver(pre_save, sender=Employee)
+def remember_employee_state(sender, instance, **kwargs):
+    """
+    Guarda departamento, estado y jefe anteriores (headcount y jerarquía). Un
+    jefe que está a cargo del propio empleado formaría un ciclo: se rechaza
+    antes de guardar.
+    """
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = Employee.objects.filter(pk=instance.pk).values_list(
+            'department_id', 'is_active', 'manager_id'
+        ).first()
+    previous_manager = instance._previous_state[2] if instance._previous_state else None
+    if instance.pk and instance.manager_id and instance.manager_id != previous_manager:
+        if is_in_subtree(instance.manager_id, instance.pk):
+            raise ValidationError('El jefe directo no puede ser el mismo empleado ni alguien a su cargo.')
+
+
+@receiver(post_save, sender=Employee)
+def update_reporting_lines_on_employee_save(sender, instance, created, **kwargs):
+    previous_state = getattr(instance, '_previous_state', None)
+    if created or previous_state is None:
+        insert_employee(instance.pk, instance.manager_id)
+    elif previous_state[2] != instance.manager_id:
+        move_subtree(instance.pk, instance.manager_id)
+
+
+@receiver(pre_delete, sender=Employee)
+def detach_reports_on_employee_delete(sender, instance, **kwargs):
+    """Las personas a cargo quedan sin jefe (SET_NULL no dispara señales)"""
+    for report_id in instance.direct_reports.values_list('pk', flat=True):
+        move_subtree(report_id, None)
+
+
+@receiver(post_save, sender=Employee)
+def update_headcount_on_employee_save(sender, instance, **kwargs):
+    previous_department, was_active, _ = getattr(instance, '_previous_state', None) or (None, False, None)
+    if (previous_department, was_active) == (instance.department_id, instance.is_active):
+        return
+    deltas = {}
+    if was_active and previous_department:
+        deltas[previous_department] = -1
+    if instance.is_active and instance.department_id:
+        deltas[instance.department_id] = deltas.get(instance.department_id, 0) + 1
+    adjust_headcount(deltas)
+    # Si estaba ausente hoy, el conteo de ausentes también cambia
+    Department.objects.filter(pk__in=list(deltas)).update(absent_today_on=None)
+
+
+@receiver(post_delete, sender=Employee)
+def update_headcount_on_employee_delete(sender, instance, **kwargs):
+    if instance.is_active and instance.department_id:
+        adjust_headcount({instance.department_id: -1})
+        Department.objects.filter(pk=instance.department_id).update(absent_today_on=None)
+
+
+def _covers_today(*ranges):
+    today = date.today()
+    return any(r and r[0] <= today <= r[1] for r in ranges)
+
+
+@receiver(post_save, sender=Absence)
+@receiver(post_delete, sender=Absence)
+def mark_absent_today_on_absence_change(sender, instance, **kwargs):
+    """Una ausencia que cubre (o cubría) el día vence el conteo de ausentes del departamento"""
+    if not _covers_today((instance.start_date, instance.end_date), getattr(instance, '_previous_range', None)):
+        return
+    effects = deferred()
+    if effects is not None:
+        effects.absent_today = True
+        return
+    mark_absent_today_stale([instance.employee_id])
+
+
+@receiver(post_save, sender=Absence)
+@receiver(post_delete, sender=Absence)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def refresh_heatmap_on_change(sender, **kwargs):
+    """Nueva versión del mapa de calor al confirmar la transacción"""
+    effects = deferred()
+    if effects is not None:
+        effects.heatmap = True
+        return
+    transaction.on_commit(heatmap_changed)
+
+
+def schedule_vacation_update(employee_id, year):
+    """
+    Encola el recálculo de vacaciones al confirmar la transacción, para que el
+    worker vea los datos guardados. Varias ausencias del mismo empleado y año
+    se colapsan en un único trabajo.
+    """
+    transaction.on_commit(lambda: enqueue(
+        'team.update_vacation_days',
+        {'employee_id': employee_id, 'year': year},
+        dedupe_key=f'vacation:{employee_id}:{year}',
+    ))
+
+
 def update_vacation_days(employee, year):
     """
     Actualiza los días tomados de vacaciones para un empleado en un año específico
     """
     with transaction.atomic():
-        # Obtener o crear el registro de vacaciones para el año
-        vacation, created = Vacation.objects.get_or_create(
-            employee=employee,
-            year=year,
-            defaults={
-                'days_entitled': 15,  # Días por defecto, se puede ajustar
-                'days_taken': 0
-            }
-        )
+        # Obtener o crear el registro de vacaciones para el año según la antigüedad
+        vacation, created = get_or_create_vacation(employee, year)
         
         # Calcular total de días de vacaciones tomados en el año
         try:
@@ -57,7 +194,10 @@ def update_vacation_days(employee, year):
                 start_date__year=year
             )
             
-            total_vacation_days = sum(abs.duration_days for abs in vacation_absences)
+            # Días hábiles de todas las ausencias en una sola operación
+            total_vacation_days = total_business_days(
+                vacation_absences.values_list('start_date', 'end_date')
+            )
             
             # Actualizar días tomados
             vacation.days_taken = total_vacation_days
@@ -76,20 +216,11 @@ def validate_vacation_availability(employee, start_date, end_date, exclude_absen
         vacation_type = AbsenceType.objects.get(code='VAC')
         year = start_date.year
         
-        # Obtener el registro de vacaciones del año
-        try:
-            vacation = Vacation.objects.get(employee=employee, year=year)
-        except Vacation.DoesNotExist:
-            # Si no existe, crear uno por defecto
-            vacation = Vacation.objects.create(
-                employee=employee,
-                year=year,
-                days_entitled=15,
-                days_taken=0
-            )
+        # Obtener el registro de vacaciones del año (si no existe, según la antigüedad)
+        vacation, created = get_or_create_vacation(employee, year)
         
-        # Calcular días solicitados
-        requested_days = (end_date - start_date).days + 1
+        # Calcular días hábiles solicitados
+        requested_days = business_days_between(start_date, end_date)
         
         # Calcular días ya usados (excluyendo la ausencia actual si es edición)
         vacation_absences = Absence.objects.filter(
@@ -101,8 +232,8 @@ def validate_vacation_availability(employee, start_date, end_date, exclude_absen
         if exclude_absence_id:
             vacation_absences = vacation_absences.exclude(id=exclude_absence_id)
         
-        used_days = sum(abs.duration_days for abs in vacation_absences)
-        available_days = vacation.days_entitled - used_days
+        used_days = total_business_days(vacation_absences.values_list('start_date', 'end_date'))
+        available_days = vacation.days_entitled + vacation.carryover_available_on(start_date, used_days) - used_days
         
         if requested_days > available_days:
             return (
@@ -1,3 +1,706 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from initiatives.models import Initiative, InitiativeType, Quarter, UserStory
+from .conflicts import check_absence
+from .departments import departments_with_counts, sync_departments
+from .entitlements import accrue_entitlements, entitled_days, expire_carryover, rollover_vacations
+from .forms import AbsenceForm
+from .hierarchy import in_subtree, rebuild_reporting_lines
+from .heatmap import compute_month, heatmap_changed, month_heatmap
+from .importers import ImportFileError, import_absences, import_employees
+from .photos import photo_digest, store_photo, thumbnail_name
+from .models import (
+    Absence, AbsenceType, Department, Employee, Holiday, ReportingLine, StaffingThreshold, Vacation,
+)
+from .views import _check_employee_deletion_constraints, _employee_dependencies
+from .workdays import (
+    business_days_array, business_days_between, is_business_day, iter_business_days, total_business_days,
+)
+
+
+def make_employee(username='ana', **fields):
+    user = User.objects.create_user(username=username, password='x', first_name=username.title(), last_name='Prueba')
+    defaults = {
+        'employee_id': username.upper(),
+        'birth_date': date(1990, 1, 1),
+        'hire_date': date(2015, 3, 1),
+        'position': 'Analista',
+    }
+    defaults.update(fields)
+    return Employee.objects.create(user=user, **defaults)
+
+
+def day(data, value):
+    return next(d for d in data['days'] if d['date'] == value.isoformat())
+
+
+class HeatmapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='Tecnología')
+        self.other_department = Department.objects.create(name='Ventas')
+        self.ana = make_employee('ana', department=self.department)
+        self.beto = make_employee('beto', department=self.department)
+        self.carla = make_employee('carla', department=self.other_department)
+        self.vacation = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        self.sick = AbsenceType.objects.create(name='Incapacidad', code='INC')
+
+    def test_overlapping_absences_count_each_employee_once(self):
+        Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 4))
+        Absence.objects.create(employee=self.ana, absence_type=self.sick, start_date=date(2026, 3, 3), end_date=date(2026, 3, 6))
+        Absence.objects.create(employee=self.beto, absence_type=self.vacation, start_date=date(2026, 3, 4), end_date=date(2026, 3, 4))
+        # Empieza el mes anterior: se recorta al rango
+        Absence.objects.create(employee=self.carla, absence_type=self.vacation, start_date=date(2026, 2, 25), end_date=date(2026, 3, 1))
+
+        data = compute_month(2026, 3)
+
+        self.assertEqual(data['headcount'], 3)
+        self.assertEqual(len(data['days']), 31)
+        self.assertEqual(day(data, date(2026, 3, 1))['absent'], 1)
+        self.assertEqual(day(data, date(2026, 3, 3))['absent'], 1)
+        self.assertEqual(day(data, date(2026, 3, 4))['absent'], 2)
+        self.assertEqual(day(data, date(2026, 3, 4))['share'], 66.7)
+        self.assertEqual(day(data, date(2026, 3, 4))['by_type'], {str(self.vacation.pk): 2, str(self.sick.pk): 1})
+        self.assertEqual(day(data, date(2026, 3, 7))['absent'], 0)
+
+    def test_department_uses_its_headcount(self):
+        Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 2))
+        Absence.objects.create(employee=self.carla, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 2))
+
+        data = compute_month(2026, 3, self.department.pk)
+
+        self.assertEqual(data['headcount'], 2)
+        self.assertEqual(day(data, date(2026, 3, 2))['absent'], 1)
+        self.assertEqual(day(data, date(2026, 3, 2))['share'], 50.0)
+
+    def test_cached_month_follows_absence_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            absence = Absence.objects.create(
+                employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 2),
+            )
+        self.assertEqual(day(month_heatmap(2026, 3), date(2026, 3, 2))['absent'], 1)
+
+        absence.end_date = date(2026, 3, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            absence.save()
+        self.assertEqual(day(month_heatmap(2026, 3), date(2026, 3, 3))['absent'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            absence.delete()
+        self.assertEqual(day(month_heatmap(2026, 3), date(2026, 3, 2))['absent'], 0)
+
+    def test_cached_month_reads_no_rows(self):
+        month_heatmap(2026, 3, self.department.pk)
+        with self.assertNumQueries(0):
+            month_heatmap(2026, 3, self.department.pk)
+        # Un UPDATE directo no pasa por las señales: se avisa a mano
+        Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 2))
+        heatmap_changed()
+        self.assertEqual(day(month_heatmap(2026, 3, self.department.pk), date(2026, 3, 2))['absent'], 1)
+
+    def test_cached_month_follows_headcount_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 2))
+        self.assertEqual(month_heatmap(2026, 3, self.department.pk)['headcount'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_employee('diego', department=self.department)
+        self.assertEqual(month_heatmap(2026, 3, self.department.pk)['headcount'], 3)
+        self.assertEqual(day(month_heatmap(2026, 3, self.department.pk), date(2026, 3, 2))['share'], 33.3)
+
+        self.carla.department = self.department
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carla.save()
+        self.assertEqual(month_heatmap(2026, 3, self.department.pk)['headcount'], 4)
+
+        self.ana.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ana.save()
+        data = month_heatmap(2026, 3, self.department.pk)
+        self.assertEqual(data['headcount'], 3)
+        self.assertEqual(day(data, date(2026, 3, 2))['absent'], 0)
+        self.assertEqual(month_heatmap(2026, 3)['headcount'], 3)
+
+
+class ConflictTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Tecnología')
+        self.ana = make_employee('ana', department=self.department)
+        self.beto = make_employee('beto', department=self.department)
+        self.carla = make_employee('carla', department=self.department)
+        self.vacation = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        StaffingThreshold.objects.create(department=self.department, max_absent=2)
+
+    def test_overlap_with_own_absence(self):
+        absence = Absence.objects.create(
+            employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 6),
+        )
+        conflicts = check_absence(self.ana, date(2026, 3, 6), date(2026, 3, 10))
+        self.assertEqual([c.kind for c in conflicts], ['overlap'])
+        self.assertEqual(conflicts[0].absence, absence)
+
+        # Contigua, sin solaparse; y editar la propia ausencia no choca consigo misma
+        self.assertEqual(check_absence(self.ana, date(2026, 3, 7), date(2026, 3, 10)), [])
+        self.assertEqual(check_absence(self.ana, date(2026, 3, 2), date(2026, 3, 8), exclude_id=absence.pk), [])
+
+    def test_staffing_threshold_counts_each_colleague_once(self):
+        Absence.objects.create(employee=self.beto, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 4))
+        Absence.objects.create(employee=self.carla, absence_type=self.vacation, start_date=date(2026, 3, 4), end_date=date(2026, 3, 5))
+
+        conflicts = check_absence(self.ana, date(2026, 3, 1), date(2026, 3, 10))
+
+        self.assertEqual([c.kind for c in conflicts], ['staffing'])
+        self.assertEqual(conflicts[0].dates, (date(2026, 3, 4),))
+
+        # Dos ausencias solapadas de la misma persona siguen siendo una ausente
+        Absence.objects.create(employee=self.beto, absence_type=self.vacation, start_date=date(2026, 3, 3), end_date=date(2026, 3, 3))
+        self.assertEqual(check_absence(self.ana, date(2026, 3, 3), date(2026, 3, 3)), [])
+
+    def test_form_rejects_overlap(self):
+        Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 6))
+        sick = AbsenceType.objects.create(name='Incapacidad', code='INC')
+        form = AbsenceForm(data={
+            'employee': self.ana.pk, 'absence_type': sick.pk,
+            'start_date': '2026-03-05', 'end_date': '2026-03-09',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('Ya existe una ausencia de Vacaciones', str(form.non_field_errors()))
+
+    def test_check_endpoint(self):
+        self.client.force_login(self.ana.user)
+        Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 2), end_date=date(2026, 3, 6))
+        url = reverse('team:absence_check')
+
+        response = self.client.get(url, {'employee': self.ana.pk, 'start_date': '2026-03-06'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['ok'])
+        self.assertEqual(response.json()['conflicts'][0]['kind'], 'overlap')
+
+        self.assertEqual(self.client.get(url, {'employee': self.ana.pk, 'start_date': 'mañana'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start_date': '2026-03-06'}).status_code, 400)
+
+
+class AbsenceListTests(TestCase):
+    def setUp(self):
+        self.ana = make_employee('ana')
+        self.vacation = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        self.client.force_login(self.ana.user)
+        # Cruza el inicio del rango, contenida y cruza el fin
+        self.before = Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 2, 27), end_date=date(2026, 3, 2))
+        self.inside = Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 10), end_date=date(2026, 3, 11))
+        self.after = Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 3, 30), end_date=date(2026, 4, 2))
+        Absence.objects.create(employee=self.ana, absence_type=self.vacation, start_date=date(2026, 4, 6), end_date=date(2026, 4, 6))
+        self.url = reverse('team:absence_list')
+        self.range = {'date_from': '2026-03-01', 'date_to': '2026-03-31'}
+
+    def test_overlap_includes_absences_crossing_the_range(self):
+        response = self.client.get(self.url, self.range)
+        self.assertEqual(
+            {absence.pk for absence in response.context['absences']},
+            {self.before.pk, self.inside.pk, self.after.pk},
+        )
+
+    def test_within_keeps_only_contained_absences(self):
+        response = self.client.get(self.url, {**self.range, 'match': 'within'})
+        self.assertEqual([absence.pk for absence in response.context['absences']], [self.inside.pk])
+
+    def test_csv_export_per_day_is_clipped_to_range(self):
+        response = self.client.get(self.url, {**self.range, 'export': 'csv', 'rows': 'days'})
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        days = [line.split(',')[0] for line in lines[1:]]
+        self.assertEqual(days, ['2026-03-01', '2026-03-02', '2026-03-10', '2026-03-11', '2026-03-30', '2026-03-31'])
+
+
+class EntitlementTests(TestCase):
+    def test_entitled_days_follow_tenure_table(self):
+        hired = date(2015, 6, 1)
+        self.assertEqual(entitled_days(hired, 2015), 0)
+        self.assertEqual(entitled_days(hired, 2016), 12)
+        self.assertEqual(entitled_days(hired, 2020), 20)
+        self.assertEqual(entitled_days(hired, 2021), 22)
+        self.assertEqual(entitled_days(hired, 2026), 24)
+        self.assertEqual(entitled_days(hired, 2016, tiers=[(0, 6), (1, 10)]), 10)
+
+    def test_accrual_creates_and_updates_records(self):
+        ana = make_employee('ana', hire_date=date(2020, 1, 15))
+        beto = make_employee('beto', hire_date=date(2025, 7, 1))
+        make_employee('carla', hire_date=date(2027, 1, 1))
+        make_employee('diego', hire_date=date(2018, 1, 1), is_active=False)
+        Vacation.objects.create(employee=ana, year=2026, days_entitled=10, days_taken=4)
+
+        preview = accrue_entitlements(2026, dry_run=True)
+        self.assertEqual(Vacation.objects.filter(year=2026).count(), 1)
+
+        changes = accrue_entitlements(2026, chunk_size=1)
+
+        self.assertEqual(changes, preview)
+        self.assertEqual(
+            {(change.employee_id, change.previous_days, change.days) for change in changes},
+            {(ana.pk, 10, 22), (beto.pk, None, 12)},
+        )
+        vacation = Vacation.objects.get(employee=ana, year=2026)
+        self.assertEqual((vacation.days_entitled, vacation.days_taken, vacation.days_pending), (22, 4, 18))
+        self.assertEqual(Vacation.objects.get(employee=beto, year=2026).days_pending, 12)
+        # Segunda corrida sin cambios
+        self.assertEqual(accrue_entitlements(2026), [])
+
+    def test_only_missing_keeps_existing_records(self):
+        ana = make_employee('ana', hire_date=date(2020, 1, 15))
+        Vacation.objects.create(employee=ana, year=2026, days_entitled=10)
+        make_employee('beto', hire_date=date(2025, 7, 1))
+
+        changes = accrue_entitlements(2026, only_missing=True)
+
+        self.assertEqual([change.is_new for change in changes], [True])
+        self.assertEqual(Vacation.objects.get(employee=ana, year=2026).days_entitled, 10)
+
+
+class RolloverTests(TestCase):
+    def setUp(self):
+        self.ana = make_employee('ana', hire_date=date(2020, 1, 15))
+        self.vacation_type = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        Vacation.objects.create(employee=self.ana, year=2025, days_entitled=20, days_taken=5)
+
+    def rollover(self, today):
+        return rollover_vacations(2025, max_carryover=10, expiry_months=3, today=today)
+
+    def test_rollover_caps_carryover_and_is_idempotent(self):
+        changes = self.rollover(date(2026, 1, 2))
+
+        self.assertEqual([(change.pending_days, change.carried_days, change.is_new) for change in changes], [(15, 10, True)])
+        vacation = Vacation.objects.get(employee=self.ana, year=2026)
+        self.assertEqual((vacation.days_entitled, vacation.days_carried_over, vacation.days_pending), (22, 10, 32))
+        self.assertEqual(vacation.carryover_expires_on, date(2026, 3, 31))
+        self.assertEqual(self.rollover(date(2026, 1, 2)), [])
+
+    def test_rollover_after_expiry_keeps_forfeited_days(self):
+        self.rollover(date(2026, 1, 2))
+        # Tres días hábiles usados antes del vencimiento
+        with self.captureOnCommitCallbacks(execute=True):
+            Absence.objects.create(employee=self.ana, absence_type=self.vacation_type, start_date=date(2026, 2, 2), end_date=date(2026, 2, 4))
+
+        self.assertEqual(expire_carryover(2026, today=date(2026, 4, 1)), 7)
+        self.assertEqual(self.rollover(date(2026, 4, 1)), [])
+
+        vacation = Vacation.objects.get(employee=self.ana, year=2026)
+        self.assertEqual((vacation.days_carried_over, vacation.days_taken, vacation.days_pending), (3, 3, 22))
+        self.assertEqual(expire_carryover(2026, today=date(2026, 4, 1)), 0)
+
+
+class WorkdaysTests(TestCase):
+    def test_business_days_skip_weekends_and_holidays(self):
+        Holiday.objects.create(date=date(2026, 3, 16), name='Natalicio de Benito Juárez')
+        # Del viernes 13 al martes 17: viernes y martes
+        self.assertEqual(business_days_between(date(2026, 3, 13), date(2026, 3, 17)), 2)
+        self.assertEqual(business_days_between(date(2026, 3, 17), date(2026, 3, 13)), 0)
+        self.assertEqual(
+            list(business_days_array([date(2026, 3, 2), date(2026, 3, 7)], [date(2026, 3, 6), date(2026, 3, 8)])),
+            [5, 0],
+        )
+        self.assertEqual(total_business_days([(date(2026, 3, 2), date(2026, 3, 6)), (date(2026, 3, 13), date(2026, 3, 17))]), 7)
+        self.assertEqual(
+            list(iter_business_days(date(2026, 3, 13), date(2026, 3, 17))),
+            [date(2026, 3, 13), date(2026, 3, 17)],
+        )
+
+    def test_calendar_follows_holiday_changes(self):
+        monday = date(2026, 3, 16)
+        self.assertTrue(is_business_day(monday))
+
+        holiday = Holiday.objects.create(date=monday, name='Festivo')
+        self.assertFalse(is_business_day(monday))
+
+        holiday.date = date(2026, 3, 17)
+        holiday.save()
+        self.assertTrue(is_business_day(monday))
+        self.assertFalse(is_business_day(date(2026, 3, 17)))
+
+        Holiday.objects.all().delete()
+        self.assertTrue(is_business_day(date(2026, 3, 17)))
+
+    def test_lists_read_the_holiday_version_once_per_request(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        Holiday.objects.create(date=date(2026, 3, 16), name='Festivo')
+        absence_type = AbsenceType.objects.create(name='Enfermedad', code='ENF')
+        for n in range(5):
+            Absence.objects.create(
+                employee=make_employee(f'persona{n}'), absence_type=absence_type,
+                start_date=date(2026, 3, 13), end_date=date(2026, 3, 17),
+            )
+
+        for url in (reverse('team:absence_list'), reverse('admin:team_absence_changelist')):
+            with self.subTest(url), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            versions = [q['sql'] for q in queries if 'MAX("team_holiday"."updated_at")' in q['sql']]
+            self.assertEqual(len(versions), 1, versions)
+            self.assertContains(response, '>2<')
+
+    def test_vacation_days_taken_count_business_days(self):
+        ana = make_employee('ana', hire_date=date(2020, 1, 15))
+        vacation_type = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        Holiday.objects.create(date=date(2026, 3, 16), name='Festivo')
+        with self.captureOnCommitCallbacks(execute=True):
+            absence = Absence.objects.create(
+                employee=ana, absence_type=vacation_type, start_date=date(2026, 3, 13), end_date=date(2026, 3, 20),
+            )
+        self.assertEqual(absence.business_days, 5)
+        self.assertEqual(Vacation.objects.get(employee=ana, year=2026).days_taken, 5)
+
+
+class EmployeeDeletionTests(TestCase):
+    def setUp(self):
+        self.ana = make_employee('ana')
+        self.beto = make_employee('beto')
+        self.client.force_login(self.beto.user)
+        quarter = Quarter.objects.create(year=2026, quarter=1)
+        initiative_type = InitiativeType.objects.create(name='Operación', category='OPERATIONAL')
+        self.initiative = Initiative.objects.create(
+            title='Iniciativa', description='d', owner=self.beto, quarter=quarter, initiative_type=initiative_type,
+        )
+        self.initiative.collaborators.add(self.ana)
+        UserStory.objects.create(initiative=self.initiative, title='Historia', description='d', assignee=self.ana)
+        vacation_type = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        for day in (2, 9):
+            Absence.objects.create(employee=self.ana, absence_type=vacation_type, start_date=date(2026, 3, day), end_date=date(2026, 3, day))
+
+    def test_counts_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            counts = _employee_dependencies(self.ana).counts
+        self.assertEqual(counts['owned_initiatives'], 0)
+        self.assertEqual(counts['assigned_stories'], 1)
+        self.assertEqual(counts['collaborated_initiatives'], 1)
+        self.assertEqual(counts['absences'], 2)
+
+    def test_blocking_relations(self):
+        constraints = _check_employee_deletion_constraints(self.ana)
+        self.assertTrue(constraints['can_delete'])
+        self.assertIn('Tiene 2 ausencia(s) (se eliminarán)', constraints['warnings'])
+
+        constraints = _check_employee_deletion_constraints(self.beto)
+        self.assertFalse(constraints['can_delete'])
+        self.assertEqual(constraints['blocking_reasons'], ['Es propietario de 1 iniciativa(s)'])
+        self.assertEqual(list(constraints['owned_initiatives']), [self.initiative])
+
+    def test_delete_view(self):
+        response = self.client.post(reverse('team:employee_delete', args=[self.beto.pk]))
+        self.assertRedirects(response, reverse('team:employee_detail', args=[self.beto.pk]), fetch_redirect_response=False)
+        self.assertTrue(Employee.objects.filter(pk=self.beto.pk).exists())
+
+        response = self.client.post(reverse('team:employee_delete', args=[self.ana.pk]))
+        self.assertRedirects(response, reverse('team:employee_list'), fetch_redirect_response=False)
+        self.assertFalse(Employee.objects.filter(pk=self.ana.pk).exists())
+        self.assertFalse(Absence.objects.exists())
+
+
+EMPLOYEES_CSV = (
+    'employee_id,username,first_name,last_name,email,birth_date,hire_date,position,department,is_active\n'
+    'E1,ana,Ana,López,ana@example.com,1990-01-01,2020-01-15,Analista, tecnología ,\n'
+    'E2,beto,Beto,Ruiz,,1991-02-02,2021-03-01,Desarrollador,Tecnología,true\n'
+    'E3,carla,Carla,Díaz,,no-es-fecha,2021-03-01,Diseñadora,Diseño,\n'
+)
+
+
+class ImporterTests(TestCase):
+    def import_employees(self, text, **options):
+        return import_employees(io.BytesIO(text.encode('utf-8')), 'csv', **options)
+
+    def test_employees_are_created_then_updated(self):
+        result = self.import_employees(EMPLOYEES_CSV, chunk_size=2)
+
+        self.assertEqual((result.created, result.updated, result.error_count), (2, 0, 1))
+        self.assertEqual(result.errors[0].line, 4)
+        ana = Employee.objects.get(employee_id='E1')
+        department = ana.department
+        # " tecnología " y "Tecnología" van al mismo departamento
+        self.assertEqual((department.name, department.headcount), ('tecnología', 2))
+        self.assertEqual(Department.objects.count(), 1)
+        self.assertEqual((ana.user.username, ana.is_active), ('ana', True))
+        self.assertFalse(ana.user.has_usable_password())
+
+        result = self.import_employees(
+            'employee_id,username,first_name,last_name,birth_date,hire_date,position,department\n'
+            'E1,ana,Ana María,López,1990-01-01,2020-01-15,Líder,Tecnología\n'
+        )
+        self.assertEqual((result.created, result.updated), (0, 1))
+        ana.refresh_from_db()
+        self.assertEqual((ana.position, ana.user.first_name), ('Líder', 'Ana María'))
+
+    def test_existing_accounts_are_not_taken_over(self):
+        User.objects.create_user('admin', password='x')
+        self.import_employees(EMPLOYEES_CSV)
+
+        result = self.import_employees(
+            'employee_id,username,first_name,last_name,birth_date,hire_date,position,department\n'
+            'E9,admin,Intruso,X,1990-01-01,2020-01-15,Analista,Tecnología\n'
+            'E2,ana,Beto,Ruiz,1991-02-02,2021-03-01,Desarrollador,Tecnología\n'
+        )
+        self.assertEqual(result.total, 0)
+        self.assertEqual(
+            [str(error) for error in result.errors],
+            ['Fila 2: El usuario admin ya existe.', 'Fila 3: El empleado E2 pertenece al usuario beto.'],
+        )
+
+    def test_dry_run_writes_nothing(self):
+        result = self.import_employees(EMPLOYEES_CSV, dry_run=True)
+        self.assertEqual(result.created, 2)
+        self.assertFalse(Employee.objects.exists())
+
+    def test_absences_upsert_and_report_overlaps(self):
+        self.import_employees(EMPLOYEES_CSV)
+        AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        rows = [
+            {'employee_id': 'E1', 'absence_type': 'VAC', 'start_date': '2026-03-02', 'end_date': '2026-03-04'},
+            {'employee_id': 'E2', 'absence_type': 'VAC', 'start_date': '2026-03-04', 'end_date': '2026-03-05'},
+            {'employee_id': 'E2', 'absence_type': 'XYZ', 'start_date': '2026-03-02', 'end_date': '2026-03-02'},
+            {'employee_id': 'E2', 'absence_type': 'VAC', 'start_date': '2026-03-09', 'end_date': '2026-03-06'},
+        ]
+
+        result = import_absences(io.BytesIO(json.dumps(rows).encode('utf-8')), 'json')
+
+        self.assertEqual((result.created, result.error_count), (2, 2))
+        self.assertEqual(Vacation.objects.get(employee__employee_id='E1', year=2026).days_taken, 3)
+
+        # Misma clave: se actualiza; si choca con otra ausencia guardada, error
+        rows[0]['end_date'] = '2026-03-03'
+        overlap = {'employee_id': 'E2', 'absence_type': 'VAC', 'start_date': '2026-03-05', 'end_date': '2026-03-06'}
+        result = import_absences(io.BytesIO(json.dumps([rows[0], overlap]).encode('utf-8')), 'json')
+        self.assertEqual((result.created, result.updated, result.error_count), (0, 1, 1))
+        self.assertEqual(Absence.objects.get(employee__employee_id='E1').end_date, date(2026, 3, 3))
+        self.assertEqual(Vacation.objects.get(employee__employee_id='E1', year=2026).days_taken, 2)
+
+    def test_reimport_keeps_inactive_employees_inactive(self):
+        self.import_employees(EMPLOYEES_CSV)
+        Employee.objects.filter(employee_id='E1').update(is_active=False)
+
+        # Sin columna is_active: se conserva el estado guardado; los nuevos quedan activos
+        result = self.import_employees(
+            'employee_id,username,first_name,last_name,birth_date,hire_date,position,department\n'
+            'E1,ana,Ana,López,1990-01-01,2020-01-15,Analista,Tecnología\n'
+            'E4,dora,Dora,Gil,1992-05-05,2022-01-10,Analista,Tecnología\n'
+        )
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual(
+            dict(Employee.objects.filter(employee_id__in=['E1', 'E4']).values_list('employee_id', 'is_active')),
+            {'E1': False, 'E4': True},
+        )
+
+        self.import_employees(
+            'employee_id,username,first_name,last_name,birth_date,hire_date,position,department,is_active\n'
+            'E1,ana,Ana,López,1990-01-01,2020-01-15,Analista,Tecnología,true\n'
+        )
+        self.assertTrue(Employee.objects.get(employee_id='E1').is_active)
+
+    def test_windows_encoded_csv_is_read(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        data = EMPLOYEES_CSV.encode('cp1252')
+        response = self.client.post(reverse('team:bulk_import'), {
+            'kind': 'employees', 'file': SimpleUploadedFile('empleados.csv', data, content_type='text/csv'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Employee.objects.get(employee_id='E1').user.last_name, 'López')
+
+    def test_unreadable_files(self):
+        with self.assertRaises(ImportFileError):
+            # Un campo más grande que csv.field_size_limit()
+            import_absences(io.BytesIO(b'employee_id,absence_type\nE1,' + b'x' * 200000 + b'\n'), 'csv')
+        with self.assertRaises(ImportFileError):
+            import_absences(io.BytesIO(b'{"no": "lista"}'), 'json')
+        with self.assertRaises(ImportFileError):
+            import_absences(io.BytesIO(b''), 'csv')
+        with self.assertRaises(ImportFileError):
+            import_absences(io.BytesIO(b''), 'xml')
+
+
+class DepartmentTests(TestCase):
+    def setUp(self):
+        self.tech = Department.objects.create(name=' Tecnología ')
+        self.design = Department.objects.create(name='Diseño')
+        self.ana = make_employee('ana', department=self.tech)
+        self.beto = make_employee('beto', department=self.tech)
+
+    def headcounts(self):
+        return dict(Department.objects.values_list('name', 'headcount'))
+
+    def test_headcount_follows_employee_changes(self):
+        self.assertEqual(self.tech.name, 'Tecnología')
+        self.assertEqual(self.headcounts(), {'Tecnología': 2, 'Diseño': 0})
+
+        self.beto.department = self.design
+        self.beto.save()
+        self.assertEqual(self.headcounts(), {'Tecnología': 1, 'Diseño': 1})
+
+        self.ana.is_active = False
+        self.ana.save()
+        self.assertEqual(self.headcounts(), {'Tecnología': 0, 'Diseño': 1})
+
+        self.beto.delete()
+        self.assertEqual(self.headcounts(), {'Tecnología': 0, 'Diseño': 0})
+
+    def test_absent_today_is_recalculated_when_stale(self):
+        today = date.today()
+        counts = {department.name: department.absent_today for department in departments_with_counts(today)}
+        self.assertEqual(counts, {'Tecnología': 0, 'Diseño': 0})
+
+        absence_type = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        Absence.objects.create(employee=self.ana, absence_type=absence_type, start_date=today, end_date=today + timedelta(days=1))
+        self.assertIsNone(Department.objects.get(pk=self.tech.pk).absent_today_on)
+        self.assertEqual(Department.objects.get(pk=self.design.pk).absent_today_on, today)
+
+        counts = {department.name: department.absent_today for department in departments_with_counts(today)}
+        self.assertEqual(counts, {'Tecnología': 1, 'Diseño': 0})
+
+    def test_sync_links_and_merges_free_text_names(self):
+        # Datos anteriores al modelo: solo el texto, escrito de varias formas
+        Employee.objects.filter(pk=self.ana.pk).update(department=None, department_name=' tecnología')
+        Employee.objects.filter(pk=self.beto.pk).update(department=None, department_name='Tecnología')
+        threshold = StaffingThreshold.objects.create(department=self.tech, max_absent=1)
+        StaffingThreshold.objects.filter(pk=threshold.pk).update(department=None, department_name='TECNOLOGÍA ')
+        Department.objects.filter(pk=self.tech.pk).delete()
+        Department.objects.create(name='diseño')
+
+        result = sync_departments(dry_run=True)
+        self.assertEqual((result.created, result.merged, result.employees), (1, 1, 2))
+        self.assertEqual(Department.objects.count(), 2)
+
+        result = sync_departments()
+        self.assertEqual(result, (1, 1, 2, 1))
+        tech = Department.objects.get(employees=self.ana)
+        self.assertEqual(list(Employee.objects.values_list('department', flat=True).order_by().distinct()), [tech.pk])
+        self.assertEqual(StaffingThreshold.objects.get().department, tech)
+        self.assertEqual(tech.headcount, 2)
+        self.assertEqual(Department.objects.count(), 2)
+
+        self.assertEqual(sync_departments(), (0, 0, 0, 0))
+
+
+class HierarchyTests(TestCase):
+    def setUp(self):
+        # ana → beto → carla, ana → dani
+        self.ana = make_employee('ana')
+        self.beto = make_employee('beto', manager=self.ana)
+        self.carla = make_employee('carla', manager=self.beto)
+        self.dani = make_employee('dani', manager=self.ana)
+
+    def team(self, lead):
+        return set(in_subtree(Employee.objects.all(), lead.pk, employee_field=None).values_list('employee_id', flat=True))
+
+    def lines(self):
+        return set(ReportingLine.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def test_closure_rows_cover_every_level(self):
+        self.assertEqual(self.team(self.ana), {'ANA', 'BETO', 'CARLA', 'DANI'})
+        self.assertEqual(self.team(self.beto), {'BETO', 'CARLA'})
+        self.assertTrue(ReportingLine.objects.filter(ancestor=self.ana, descendant=self.carla, depth=2).exists())
+
+    def test_moving_a_manager_moves_the_subtree(self):
+        self.beto.manager = self.dani
+        self.beto.save()
+
+        self.assertEqual(self.team(self.dani), {'DANI', 'BETO', 'CARLA'})
+        self.assertTrue(ReportingLine.objects.filter(ancestor=self.ana, descendant=self.carla, depth=3).exists())
+        lines = self.lines()
+        self.assertEqual(rebuild_reporting_lines(), len(lines))
+        self.assertEqual(self.lines(), lines)
+
+    def test_cycles_are_rejected(self):
+        self.ana.manager = self.carla
+        with self.assertRaises(ValidationError):
+            self.ana.save()
+        self.assertEqual(self.team(self.ana), {'ANA', 'BETO', 'CARLA', 'DANI'})
+
+    def test_deleting_a_manager_detaches_reports(self):
+        self.beto.delete()
+        self.carla.refresh_from_db()
+        self.assertIsNone(self.carla.manager)
+        self.assertEqual(self.team(self.ana), {'ANA', 'DANI'})
+        self.assertEqual(self.team(self.carla), {'CARLA'})
+
+    def test_absence_list_my_team_scope(self):
+        absence_type = AbsenceType.objects.create(name='Vacaciones', code='VAC')
+        for employee in (self.carla, self.dani):
+            Absence.objects.create(employee=employee, absence_type=absence_type, start_date=date(2026, 3, 2), end_date=date(2026, 3, 2))
+        self.client.force_login(self.beto.user)
+
+        response = self.client.get(reverse('team:absence_list'), {'scope': 'mine'})
+        self.assertTrue(response.context['scope'].mine)
+        self.assertEqual([absence.employee_id for absence in response.context['absences']], [self.carla.pk])
+
+        # Sin personas a cargo el alcance no se ofrece y se ignora
+        self.client.force_login(self.dani.user)
+        response = self.client.get(reverse('team:absence_list'), {'scope': 'mine'})
+        self.assertFalse(response.context['scope'].available)
+        self.assertEqual(response.context['total_count'], 2)
+
+
+def image_upload(name='foto.png', color=(200, 30, 30, 128), size=(300, 200)):
+    buffer = io.BytesIO()
+    Image.new('RGBA', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(JOBS_EAGER=True)
+class PhotoTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.ana = make_employee('ana')
+
+    def test_photo_is_stored_by_hash_and_thumbnails_generated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            store_photo(self.ana, image_upload())
+
+        self.ana.refresh_from_db()
+        digest = photo_digest(self.ana.photo.name)
+        self.assertEqual(self.ana.photo.name, f'employees/photos/{digest}.png')
+        self.assertEqual(self.ana.photo_thumbnails, ['sm', 'md', 'lg'])
+        with default_storage.open(thumbnail_name(digest, 64, 'webp')) as file, Image.open(file) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (64, 64)))
+        self.assertIn(f'{digest}-96.jpg', self.ana.photo_urls['md']['jpg'])
+
+    def test_same_content_is_stored_once(self):
+        beto = make_employee('beto')
+        with self.captureOnCommitCallbacks(execute=True):
+            store_photo(self.ana, image_upload('a.png'))
+            store_photo(beto, image_upload('b.png'))
+
+        beto.refresh_from_db()
+        self.assertEqual(beto.photo.name, Employee.objects.get(pk=self.ana.pk).photo.name)
+        self.assertEqual(len(default_storage.listdir('employees/photos')[1]), 1)
+        self.assertEqual(beto.photo_thumbnails, ['sm', 'md', 'lg'])
+
+    def test_photo_view_is_cached_by_name(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            store_photo(self.ana, image_upload())
+        self.ana.refresh_from_db()
+        url = self.ana.photo_urls['sm']['webp']
+
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.ana.user)
+        response = self.client.get(url)
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'image/webp'))
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+
+        self.assertEqual(self.client.get(reverse('team:employee_photo', args=['settings.py'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('team:employee_photo', args=['0' * 64 + '.png'])).status_code, 404)
@@ -14,6 +14,7 @@ urlpatterns = [
     path('employees/create/', views.employee_create, name='employee_create'),
     path('employees/<int:pk>/edit/', views.employee_edit, name='employee_edit'),
     path('employees/<int:pk>/delete/', views.employee_delete, name='employee_delete'),
+    path('photos/<str:name>', views.employee_photo, name='employee_photo'),
     
     # Ausencias
     path('absences/', views.absence_list, name='absence_list'),
@@ -21,6 +22,8 @@ urlpatterns = [
     path('absences/<int:pk>/edit/', views.absence_edit, name='absence_edit'),
     path('absences/<int:pk>/delete/', views.absence_delete, name='absence_delete'),
     path('absences/quick/', views.quick_absence, name='quick_absence'),
+    path('absences/heatmap/', views.absence_heatmap, name='absence_heatmap'),
+    path('absences/check/', views.absence_check, name='absence_check'),
     
     # Vacaciones
     path('vacations/', views.vacation_summary, name='vacation_summary'),
@@ -34,6 +37,9 @@ urlpatterns = [
     path('absence-types/<int:pk>/edit/', views.absence_type_edit, name='absence_type_edit'),
     path('absence-types/<int:pk>/delete/', views.absence_type_delete, name='absence_type_delete'),
     
+    # Importación masiva
+    path('import/', views.bulk_import, name='bulk_import'),
+    
     # Cumpleaños
     path('birthdays/', views.birthday_calendar, name='birthday_calendar'),
 ]
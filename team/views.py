@@ -3,32 +3,42 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
 from django.urls import reverse
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse
+from django.views.decorators.http import condition
 from datetime import date, timedelta
+from .departments import departments_with_counts, parse_department
+from .heatmap import heatmap
+from .hierarchy import reporting_scope
+from .photos import CONTENT_TYPES, PHOTO_CACHE_SECONDS, storage_path
 from .models import Employee, Absence, Vacation, Birthday, AbsenceType
 
 
 @login_required
 def team_dashboard(request):
     """Dashboard principal del módulo de equipo"""
-    employees = Employee.objects.filter(is_active=True).select_related('user')
+    # ?scope=mine: solo las personas a cargo del usuario, a cualquier nivel
+    scope = reporting_scope(request)
+    employees = scope.apply(Employee.objects.filter(is_active=True), employee_field=None).select_related('user')
     
     # Próximos cumpleaños (30 días)
-    upcoming_birthdays = Birthday.get_upcoming_birthdays(days=30)
+    upcoming_birthdays = Birthday.get_upcoming_birthdays(days=30, employees=employees)
     
     # Ausencias actuales
     today = date.today()
-    current_absences = Absence.objects.filter(
+    current_absences = scope.apply(Absence.objects.filter(
         start_date__lte=today,
         end_date__gte=today
-    ).select_related('employee', 'absence_type')
+    )).select_related('employee', 'absence_type')
     
     # Próximas ausencias (7 días)
-    upcoming_absences = Absence.objects.filter(
+    upcoming_absences = scope.apply(Absence.objects.filter(
         start_date__gt=today,
         start_date__lte=today + timedelta(days=7)
-    ).select_related('employee', 'absence_type')
+    )).select_related('employee', 'absence_type')
     
     context = {
+        'scope': scope,
         'employees': employees,
         'upcoming_birthdays': upcoming_birthdays,
         'current_absences': current_absences,
@@ -46,7 +56,7 @@ def employee_list(request):
     
     # Filtros
     search = request.GET.get('search', '')
-    department = request.GET.get('department', '')
+    department_id = parse_department(request.GET.get('department'))
     status = request.GET.get('status', '')
     
     if search:
@@ -57,8 +67,8 @@ def employee_list(request):
             Q(position__icontains=search)
         )
     
-    if department:
-        queryset = queryset.filter(department=department)
+    if department_id:
+        queryset = queryset.filter(department_id=department_id)
     
     if status:
         if status == 'active':
@@ -66,20 +76,41 @@ def employee_list(request):
         elif status == 'inactive':
             queryset = queryset.filter(is_active=False)
     
-    # Obtener departamentos únicos para el filtro
-    departments = Employee.objects.values_list('department', flat=True).distinct()
+    # Departamentos con su plantilla precalculada para el filtro
+    departments = departments_with_counts()
     
     context = {
         'employees': queryset,
         'departments': departments,
         'search': search,
-        'selected_department': department,
+        'selected_department': next((d for d in departments if d.pk == department_id), None),
         'selected_status': status,
     }
     
     return render(request, 'team/employee_list.html', context)
 
 
+def _employee_photo_etag(request, name):
+    # El nombre es el hash del contenido: sirve como ETag
+    return name if storage_path(name) else None
+
+
+@login_required
+@condition(etag_func=_employee_photo_etag)
+def employee_photo(request, name):
+    """
+    Foto o miniatura de empleado. El nombre cambia con el contenido, así que
+    el navegador la conserva un año sin volver a consultarla.
+    """
+    path = storage_path(name)
+    if path is None or not default_storage.exists(path):
+        raise Http404('Foto no encontrada')
+    
+    response = FileResponse(default_storage.open(path), content_type=CONTENT_TYPES[name.rsplit('.', 1)[-1]])
+    response['Cache-Control'] = f'private, max-age={PHOTO_CACHE_SECONDS}, immutable'
+    return response
+
+
 @login_required
 def employee_detail(request, pk):
     """Detalle de empleado"""
@@ -107,55 +138,313 @@ def employee_detail(request, pk):
     return render(request, 'team/employee_detail.html', context)
 
 
+EXPORT_CHUNK_SIZE = 2000
+ABSENCES_PER_PAGE = 100
+
+
+def _filter_absences(request):
+    """
+    Aplica los filtros de la lista de ausencias. Con match=overlap (por
+    defecto) se incluyen las ausencias que tocan el rango aunque empiecen o
+    terminen fuera de él; con match=within solo las contenidas por completo.
+    """
+    scope = reporting_scope(request)
+    queryset = scope.apply(Absence.objects.select_related('employee__user', 'absence_type'))
+    
+    filters = {
+        'scope': scope,
+        'employee': request.GET.get('employee', ''),
+        'type': request.GET.get('type', ''),
+        'date_from': request.GET.get('date_from', ''),
+        'date_to': request.GET.get('date_to', ''),
+        'match': request.GET.get('match', 'overlap'),
+    }
+    
+    if filters['employee']:
+        queryset = queryset.filter(employee_id=filters['employee'])
+    
+    if filters['type']:
+        queryset = queryset.filter(absence_type_id=filters['type'])
+    
+    if filters['match'] == 'within':
+        if filters['date_from']:
+            queryset = queryset.filter(start_date__gte=filters['date_from'])
+        if filters['date_to']:
+            queryset = queryset.filter(end_date__lte=filters['date_to'])
+    else:
+        filters['match'] = 'overlap'
+        # Predicado de solapamiento, cubierto por el índice (end_date, start_date)
+        if filters['date_from']:
+            queryset = queryset.filter(end_date__gte=filters['date_from'])
+        if filters['date_to']:
+            queryset = queryset.filter(start_date__lte=filters['date_to'])
+    
+    return queryset, filters
+
+
+ABSENCE_EXPORT_FIELDS = (
+    'employee__employee_id', 'employee__user__first_name', 'employee__user__last_name',
+    'employee__department_name',
+)
+
+
+def _absence_record_rows(absences):
+    from boss_core.exports import chunked, full_name
+    from .workdays import business_days_array
+    
+    rows = absences.order_by('-start_date', 'pk').values_list(
+        *ABSENCE_EXPORT_FIELDS, 'absence_type__name', 'start_date', 'end_date', 'reason'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    # Días hábiles calculados por lote en una sola operación de numpy
+    for chunk in chunked(rows, EXPORT_CHUNK_SIZE):
+        business = business_days_array([row[5] for row in chunk], [row[6] for row in chunk])
+        for (employee_id, first_name, last_name, department, type_name, start, end, reason), days in zip(chunk, business):
+            yield [
+                employee_id,
+                full_name(first_name, last_name),
+                department,
+                type_name,
+                start,
+                end,
+                (end - start).days + 1,
+                int(days),
+                reason,
+            ]
+
+
+def _absence_day_rows(absences, date_from=None, date_to=None):
+    """Una fila por cada día ausente, recortada al rango solicitado"""
+    from boss_core.exports import full_name
+    from .workdays import business_calendar, is_business_day
+    
+    calendar = business_calendar()
+    rows = absences.order_by('employee__employee_id', 'start_date', 'pk').values_list(
+        *ABSENCE_EXPORT_FIELDS, 'absence_type__code', 'absence_type__name', 'absence_type__paid',
+        'start_date', 'end_date',
+    )
+    for employee_id, first_name, last_name, department, code, type_name, paid, start, end in rows.iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        name = full_name(first_name, last_name)
+        day = max(start, date_from) if date_from else start
+        last_day = min(end, date_to) if date_to else end
+        while day <= last_day:
+            yield [
+                day,
+                employee_id,
+                name,
+                department,
+                code,
+                type_name,
+                'Sí' if paid else 'No',
+                'Sí' if is_business_day(day, calendar) else 'No',
+            ]
+            day += timedelta(days=1)
+
+
 @login_required
 def absence_list(request):
     """Lista de ausencias"""
-    queryset = Absence.objects.select_related('employee', 'absence_type')
-    
-    # Filtros
-    employee_id = request.GET.get('employee', '')
-    absence_type_id = request.GET.get('type', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    
-    if employee_id:
-        queryset = queryset.filter(employee_id=employee_id)
+    from django.core.paginator import Paginator
+    from django.db.models import Count
+    from boss_core.exports import EXPORT_FORMATS, export_response
+    from .workdays import attach_business_days
+    
+    queryset, filters = _filter_absences(request)
+    
+    # ?export=csv|xlsx con los filtros de la lista; rows=days da una fila por día
+    # (export=days se conserva como alias de la versión CSV por día)
+    export = request.GET.get('export')
+    if export == 'days':
+        export, per_day = 'csv', True
+    else:
+        per_day = request.GET.get('rows') == 'days'
+    if export in EXPORT_FORMATS and per_day:
+        try:
+            date_from = date.fromisoformat(filters['date_from']) if filters['date_from'] else None
+            date_to = date.fromisoformat(filters['date_to']) if filters['date_to'] else None
+        except ValueError:
+            date_from = date_to = None
+        return export_response(
+            export, 'ausencias_por_dia',
+            ['Fecha', 'ID Empleado', 'Empleado', 'Departamento', 'Código', 'Tipo', 'Con Goce', 'Día Hábil'],
+            _absence_day_rows(queryset, date_from, date_to),
+            sheet_title='Ausencias por día',
+        )
+    if export in EXPORT_FORMATS:
+        return export_response(
+            export, 'ausencias',
+            ['ID Empleado', 'Empleado', 'Departamento', 'Tipo', 'Inicio', 'Fin', 'Días', 'Días Hábiles', 'Motivo'],
+            _absence_record_rows(queryset),
+            sheet_title='Ausencias',
+        )
     
-    if absence_type_id:
-        queryset = queryset.filter(absence_type_id=absence_type_id)
+    # Datos para filtros
+    employees = filters['scope'].apply(Employee.objects.filter(is_active=True), employee_field=None).select_related('user')
+    absence_types = list(AbsenceType.objects.all())
     
-    if date_from:
-        queryset = queryset.filter(start_date__gte=date_from)
+    # Totales por tipo con una sola consulta agregada
+    counts_by_type = dict(
+        queryset.order_by().values('absence_type_id').annotate(total=Count('id')).values_list('absence_type_id', 'total')
+    )
     
-    if date_to:
-        queryset = queryset.filter(end_date__lte=date_to)
+    paginator = Paginator(queryset.order_by('-start_date', 'pk'), ABSENCES_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
-    # Datos para filtros
-    employees = Employee.objects.filter(is_active=True).select_related('user')
-    absence_types = AbsenceType.objects.all()
+    query_params = request.GET.copy()
+    query_params.pop('page', None)
     
     context = {
-        'absences': queryset.order_by('-start_date'),
+        'absences': attach_business_days(page_obj.object_list),
+        'page_obj': page_obj,
+        'total_count': paginator.count,
+        'type_stats': [(t, counts_by_type.get(t.pk, 0)) for t in absence_types[:3]],
         'employees': employees,
         'absence_types': absence_types,
-        'selected_employee': employee_id,
-        'selected_type': absence_type_id,
-        'date_from': date_from,
-        'date_to': date_to,
+        'scope': filters['scope'],
+        'selected_employee': filters['employee'],
+        'selected_type': filters['type'],
+        'date_from': filters['date_from'],
+        'date_to': filters['date_to'],
+        'match': filters['match'],
+        'query_string': query_params.urlencode(),
     }
     
     return render(request, 'team/absence_list.html', context)
 
 
+def _heatmap_level(share):
+    """Intensidad de color (0-4) según el porcentaje del equipo ausente"""
+    if share <= 0:
+        return 0
+    if share < 10:
+        return 1
+    if share < 25:
+        return 2
+    if share < 50:
+        return 3
+    return 4
+
+
+@login_required
+def absence_heatmap(request):
+    """Mapa de calor de ausencias por día para un mes o un trimestre"""
+    today = date.today()
+    try:
+        year = int(request.GET.get('year', today.year))
+        month = int(request.GET.get('month', today.month))
+        quarter = int(request.GET['quarter']) if request.GET.get('quarter') else None
+    except ValueError:
+        year, month, quarter = today.year, today.month, None
+    if not 1 <= month <= 12:
+        month = today.month
+    if quarter not in (None, 1, 2, 3, 4):
+        quarter = None
+    department_id = parse_department(request.GET.get('department'))
+    
+    data = heatmap(year, month=month, quarter=quarter, department=department_id)
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse(data)
+    
+    # Armar las semanas del calendario (lunes a domingo) para cada mes
+    months = []
+    for month_data in data['months']:
+        cells = [None] * date(month_data['year'], month_data['month'], 1).weekday()
+        for day in month_data['days']:
+            cells.append({
+                'date': date.fromisoformat(day['date']),
+                'absent': day['absent'],
+                'share': day['share'],
+                'level': _heatmap_level(day['share']),
+                'types': [
+                    (data['types'].get(type_id, {}), count)
+                    for type_id, count in day['by_type'].items()
+                ],
+            })
+        cells += [None] * (-len(cells) % 7)
+        months.append({
+            'start': date(month_data['year'], month_data['month'], 1),
+            'headcount': month_data['headcount'],
+            'weeks': [cells[i:i + 7] for i in range(0, len(cells), 7)],
+        })
+    
+    departments = departments_with_counts()
+    
+    context = {
+        'months': months,
+        'types': data['types'].values(),
+        'departments': departments,
+        'selected_department': next((d for d in departments if d.pk == department_id), None),
+        'selected_year': year,
+        'selected_month': month,
+        'selected_quarter': quarter,
+        'years': range(today.year - 2, today.year + 2),
+        'month_choices': [
+            (1, 'Enero'), (2, 'Febrero'), (3, 'Marzo'), (4, 'Abril'),
+            (5, 'Mayo'), (6, 'Junio'), (7, 'Julio'), (8, 'Agosto'),
+            (9, 'Septiembre'), (10, 'Octubre'), (11, 'Noviembre'), (12, 'Diciembre')
+        ],
+        'today': today,
+    }
+    
+    return render(request, 'team/absence_heatmap.html', context)
+
+
+def _vacation_export_rows(year, scope):
+    from boss_core.exports import full_name
+    from .entitlements import vacation_days_taken
+    
+    # Días tomados de todo el año en una sola pasada; se usan los mismos valores que el resumen
+    taken_by_employee = vacation_days_taken(year)
+    rows = scope.apply(Vacation.objects.filter(year=year)).order_by('employee__user__first_name', 'pk').values_list(
+        *ABSENCE_EXPORT_FIELDS, 'employee_id', 'days_entitled', 'days_carried_over', 'carryover_expires_on',
+    )
+    for employee_id, first_name, last_name, department, pk, entitled, carried, expires in rows.iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        taken = taken_by_employee.get(pk, 0)
+        yield [
+            employee_id, full_name(first_name, last_name), department, year,
+            entitled, carried, expires, taken, entitled + carried - taken,
+        ]
+
+
 @login_required
 def vacation_summary(request):
     """Resumen de vacaciones"""
-    current_year = date.today().year
+    from boss_core.exports import EXPORT_FORMATS, export_response
+    
+    try:
+        current_year = int(request.GET.get('year', ''))
+    except ValueError:
+        current_year = None
+    # Mismo rango que admite Vacation.year (el nombre del archivo lo usa)
+    if current_year is None or not 2020 <= current_year <= 2100:
+        current_year = date.today().year
+    scope = reporting_scope(request)
+    
+    export = request.GET.get('export')
+    if export in EXPORT_FORMATS:
+        return export_response(
+            export, f'vacaciones_{current_year}',
+            ['ID Empleado', 'Empleado', 'Departamento', 'Año', 'Días Correspondientes', 'Días Arrastrados',
+             'Vencen el', 'Días Tomados', 'Días Pendientes'],
+            _vacation_export_rows(current_year, scope),
+            sheet_title=f'Vacaciones {current_year}',
+        )
     
-    # Obtener registros de vacaciones del año actual
-    vacation_records = Vacation.objects.filter(
+    # Obtener registros de vacaciones del año
+    vacation_records = list(scope.apply(Vacation.objects.filter(
         year=current_year
-    ).select_related('employee__user').order_by('employee__user__first_name')
+    )).select_related('employee__user').order_by('employee__user__first_name'))
+    
+    # Días tomados en días hábiles, calculados para todo el equipo en una operación
+    from .entitlements import vacation_days_taken
+    taken_by_employee = vacation_days_taken(current_year, [v.employee_id for v in vacation_records])
+    for vacation in vacation_records:
+        vacation.days_taken = taken_by_employee.get(vacation.employee_id, 0)
+        vacation.days_pending = vacation.days_entitled + vacation.days_carried_over - vacation.days_taken
     
     # Estadísticas generales
     total_entitled = sum(v.days_entitled for v in vacation_records)
@@ -182,6 +471,8 @@ def vacation_summary(request):
         'total_pending': total_pending,
         'utilization_percentage': utilization_percentage,
         'top_pending_employees': top_pending_employees,
+        'query_string': f'year={current_year}{scope.suffix}',
+        'scope': scope,
     }
     
     return render(request, 'team/vacation_summary.html', context)
@@ -259,7 +550,7 @@ def employee_create(request):
     from .forms import EmployeeForm
     
     if request.method == 'POST':
-        form = EmployeeForm(request.POST)
+        form = EmployeeForm(request.POST, request.FILES)
         if form.is_valid():
             employee = form.save()
             messages.success(request, f'Empleado {employee.full_name} creado exitosamente.')
@@ -283,7 +574,7 @@ def employee_edit(request, pk):
     employee = get_object_or_404(Employee, pk=pk)
     
     if request.method == 'POST':
-        form = EmployeeForm(request.POST, instance=employee)
+        form = EmployeeForm(request.POST, request.FILES, instance=employee)
         if form.is_valid():
             employee = form.save()
             messages.success(request, f'Empleado {employee.full_name} actualizado exitosamente.')
@@ -300,82 +591,55 @@ def employee_edit(request, pk):
     })
 
 
+def _employee_dependencies(employee):
+    """Relaciones de un empleado que se revisan antes de eliminarlo"""
+    from boss_core.dependencies import Relation, inspect_dependencies
+    from initiatives.models import Initiative, InitiativeUpdate, UserStory, Task
+    
+    return inspect_dependencies(employee, [
+        # PROTECT: bloquean la eliminación
+        Relation('owned_initiatives', Initiative.objects.all(), 'owner',
+                 blocking=True, message='Es propietario de {count} iniciativa(s)'),
+        # Como Employee tiene OneToOne con User, se revisan las actualizaciones del usuario
+        Relation('created_updates', InitiativeUpdate.objects.select_related('initiative'), 'created_by',
+                 outer='user', blocking=True, message='Ha creado {count} actualización(es) de iniciativas'),
+        # SET_NULL / ManyToMany: no bloquean
+        Relation('assigned_stories', UserStory.objects.all(), 'assignee',
+                 message='Tiene {count} historia(s) de usuario asignada(s) (se desasignarán)'),
+        Relation('assigned_tasks', Task.objects.all(), 'assignee',
+                 message='Tiene {count} tarea(s) asignada(s) (se desasignarán)'),
+        Relation('collaborated_initiatives', Initiative.objects.all(), 'collaborators',
+                 message='Colabora en {count} iniciativa(s) (se removerá como colaborador)'),
+        # CASCADE: se eliminarán
+        Relation('absences', Absence.objects.select_related('absence_type'), 'employee',
+                 message='Tiene {count} ausencia(s) (se eliminarán)'),
+        Relation('vacations', Vacation.objects.all(), 'employee',
+                 message='Tiene {count} registro(s) de vacaciones (se eliminarán)'),
+    ])
+
+
 def _check_employee_deletion_constraints(employee):
     """
     Verifica todas las restricciones que pueden impedir la eliminación de un empleado.
-    Retorna un diccionario con información sobre las restricciones.
+    Retorna un diccionario con información sobre las restricciones; los listados
+    son perezosos y se limitan a los primeros registros de cada relación.
     """
-    from initiatives.models import InitiativeUpdate
-    
-    constraints = {
-        'can_delete': True,
-        'blocking_reasons': [],
-        'warnings': [],
-        'owned_initiatives': [],
-        'assigned_stories': [],
-        'assigned_tasks': [],
-        'collaborated_initiatives': [],
-        'created_updates': [],
-        'absences_count': 0,
-        'vacations_count': 0,
+    report = _employee_dependencies(employee)
+    counts = report.counts
+    
+    return {
+        'can_delete': report.can_delete,
+        'blocking_reasons': report.blocking_reasons,
+        'warnings': report.warnings,
+        'counts': counts,
+        'owned_initiatives': report.preview['owned_initiatives'] if counts['owned_initiatives'] else [],
+        'assigned_stories': report.preview['assigned_stories'] if counts['assigned_stories'] else [],
+        'assigned_tasks': report.preview['assigned_tasks'] if counts['assigned_tasks'] else [],
+        'collaborated_initiatives': report.preview['collaborated_initiatives'] if counts['collaborated_initiatives'] else [],
+        'created_updates': report.preview['created_updates'] if counts['created_updates'] else [],
+        'absences_count': counts['absences'],
+        'vacations_count': counts['vacations'],
     }
-    
-    # Verificar iniciativas donde es propietario (PROTECT)
-    owned_initiatives = employee.owned_initiatives.all()
-    if owned_initiatives.exists():
-        constraints['can_delete'] = False
-        constraints['blocking_reasons'].append(
-            f'Es propietario de {owned_initiatives.count()} iniciativa(s)'
-        )
-        constraints['owned_initiatives'] = list(owned_initiatives)
-    
-    # Verificar actualizaciones de iniciativas creadas por el usuario (PROTECT)
-    # Como Employee tiene OneToOne con User, verificamos las actualizaciones del usuario
-    created_updates = InitiativeUpdate.objects.filter(created_by=employee.user)
-    if created_updates.exists():
-        constraints['can_delete'] = False
-        constraints['blocking_reasons'].append(
-            f'Ha creado {created_updates.count()} actualización(es) de iniciativas'
-        )
-        constraints['created_updates'] = list(created_updates)
-    
-    # Verificar historias de usuario asignadas (SET_NULL - no bloquea)
-    assigned_stories = employee.assigned_stories.all()
-    if assigned_stories.exists():
-        constraints['warnings'].append(
-            f'Tiene {assigned_stories.count()} historia(s) de usuario asignada(s) (se desasignarán)'
-        )
-        constraints['assigned_stories'] = list(assigned_stories)
-    
-    # Verificar tareas asignadas (SET_NULL - no bloquea)
-    assigned_tasks = employee.assigned_tasks.all()
-    if assigned_tasks.exists():
-        constraints['warnings'].append(
-            f'Tiene {assigned_tasks.count()} tarea(s) asignada(s) (se desasignarán)'
-        )
-        constraints['assigned_tasks'] = list(assigned_tasks)
-    
-    # Verificar iniciativas donde colabora (ManyToMany - no bloquea)
-    collaborated_initiatives = employee.collaborated_initiatives.all()
-    if collaborated_initiatives.exists():
-        constraints['warnings'].append(
-            f'Colabora en {collaborated_initiatives.count()} iniciativa(s) (se removerá como colaborador)'
-        )
-        constraints['collaborated_initiatives'] = list(collaborated_initiatives)
-    
-    # Contar ausencias y vacaciones (CASCADE - se eliminarán)
-    absences_count = employee.absences.count()
-    vacations_count = employee.vacations.count()
-    
-    if absences_count > 0:
-        constraints['warnings'].append(f'Tiene {absences_count} ausencia(s) (se eliminarán)')
-        constraints['absences_count'] = absences_count
-    
-    if vacations_count > 0:
-        constraints['warnings'].append(f'Tiene {vacations_count} registro(s) de vacaciones (se eliminarán)')
-        constraints['vacations_count'] = vacations_count
-    
-    return constraints
 
 
 @login_required
@@ -457,6 +721,29 @@ def absence_create(request):
     })
 
 
+@login_required
+def absence_check(request):
+    """Pre-validación JSON de conflictos antes de registrar una ausencia"""
+    from .conflicts import check_absence
+    
+    try:
+        employee = Employee.objects.get(pk=request.GET.get('employee'))
+        start_date = date.fromisoformat(request.GET.get('start_date', ''))
+        end_date = date.fromisoformat(request.GET.get('end_date', '') or request.GET.get('start_date', ''))
+        exclude_id = int(request.GET['exclude']) if request.GET.get('exclude') else None
+    except (Employee.DoesNotExist, ValueError, TypeError):
+        return JsonResponse({'error': 'Parámetros inválidos: employee, start_date y end_date son requeridos.'}, status=400)
+    
+    if end_date < start_date:
+        return JsonResponse({'error': 'La fecha de fin debe ser posterior a la fecha de inicio.'}, status=400)
+    
+    conflicts = check_absence(employee, start_date, end_date, exclude_id)
+    return JsonResponse({
+        'ok': not conflicts,
+        'conflicts': [conflict.as_dict() for conflict in conflicts],
+    })
+
+
 @login_required
 def absence_edit(request, pk):
     """Editar ausencia existente"""
@@ -568,6 +855,39 @@ def vacation_delete(request, pk):
     })
 
 
+@login_required
+def bulk_import(request):
+    """Importación masiva de empleados o ausencias desde CSV/JSON"""
+    from .forms import ImportForm
+    from .importers import ABSENCE_COLUMNS, EMPLOYEE_COLUMNS, IMPORTERS, ImportFileError
+    
+    result = None
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = IMPORTERS[form.cleaned_data['kind']](
+                    upload.file, fmt=upload.import_format, dry_run=form.cleaned_data['dry_run']
+                )
+            except ImportFileError as exc:
+                form.add_error('file', str(exc))
+            else:
+                if not result.dry_run and result.total:
+                    messages.success(
+                        request, f'Importación completada: {result.created} creado(s), {result.updated} actualizado(s).'
+                    )
+    else:
+        form = ImportForm()
+    
+    return render(request, 'team/import.html', {
+        'form': form,
+        'result': result,
+        'employee_columns': EMPLOYEE_COLUMNS,
+        'absence_columns': ABSENCE_COLUMNS,
+    })
+
+
 @login_required
 def absence_type_list(request):
     """Lista de tipos de ausencia"""
@@ -628,11 +948,17 @@ def absence_type_edit(request, pk):
 @login_required
 def absence_type_delete(request, pk):
     """Eliminar tipo de ausencia"""
+    from boss_core.dependencies import Relation, inspect_dependencies
+    
     absence_type = get_object_or_404(AbsenceType, pk=pk)
     
     # Verificar si el tipo está siendo usado
-    if absence_type.absence_set.exists():
-        messages.error(request, f'No se puede eliminar "{absence_type.name}" porque está siendo usado en ausencias existentes.')
+    dependencies = inspect_dependencies(absence_type, [
+        Relation('absences', Absence.objects.all(), 'absence_type',
+                 blocking=True, message='está siendo usado en {count} ausencia(s)'),
+    ])
+    if not dependencies.can_delete:
+        messages.error(request, f'No se puede eliminar "{absence_type.name}" porque {dependencies.blocking_reasons[0]}.')
         return redirect('team:absence_type_list')
     
     if request.method == 'POST':
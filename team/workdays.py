@@ -0,0 +1,125 @@
+"""
+Cálculo de días hábiles: lunes a viernes, excluyendo los días festivos
+registrados en Holiday.
+
+Se apoya en `numpy.busday_count`, que recibe arreglos de fechas y calcula
+todas las duraciones en una sola operación vectorizada. El calendario de
+festivos se construye una vez por proceso y se reconstruye cuando cambia la
+versión de la tabla Holiday (número de festivos y última modificación), que
+se lee de la base de datos: un cambio hecho desde otro proceso también se ve.
+Dentro de una petición la versión se consulta una sola vez; fuera de ellas
+(trabajos, comandos) en cada llamada.
+
+Para una lista de ausencias, `attach_business_days()` calcula la columna de
+todas las filas con una sola llamada en lugar de Absence.business_days por fila.
+"""
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.core.signals import request_finished, request_started
+from django.db.models import Count, Max
+
+
+WEEKMASK = '1111100'
+
+# (versión, calendario) del proceso
+_calendar = (None, None)
+# Petición en curso del hilo y si ya se comprobó la versión en ella
+_request = threading.local()
+
+
+def _start_request(**kwargs):
+    _request.active = True
+    _request.checked = False
+
+
+def _finish_request(**kwargs):
+    _request.active = False
+    _request.checked = False
+
+
+request_started.connect(_start_request, dispatch_uid='team.workdays.start_request')
+request_finished.connect(_finish_request, dispatch_uid='team.workdays.finish_request')
+
+
+def holidays_changed():
+    """Un festivo cambió en este proceso: la próxima llamada vuelve a leer la versión"""
+    _request.checked = False
+
+
+def holidays_version():
+    """Huella de los festivos: cambia al crear, editar o eliminar uno"""
+    from .models import Holiday
+
+    stamp = Holiday.objects.aggregate(count=Count('pk'), last=Max('updated_at'))
+    return stamp['count'], stamp['last']
+
+
+def business_calendar():
+    """Calendario de días hábiles de numpy con los festivos vigentes"""
+    global _calendar
+    from .models import Holiday
+
+    version, calendar = _calendar
+    if calendar is not None and getattr(_request, 'checked', False):
+        return calendar
+    current = holidays_version()
+    if calendar is None or version != current:
+        holidays = list(Holiday.objects.values_list('date', flat=True))
+        calendar = np.busdaycalendar(weekmask=WEEKMASK, holidays=np.array(holidays, dtype='datetime64[D]'))
+        _calendar = (current, calendar)
+    if getattr(_request, 'active', False):
+        _request.checked = True
+    return calendar
+
+
+def business_days_array(starts, ends):
+    """
+    Días hábiles de cada rango cerrado [starts[i], ends[i]] en una sola
+    operación. Los rangos invertidos cuentan 0.
+    """
+    starts = np.asarray(starts, dtype='datetime64[D]')
+    ends = np.asarray(ends, dtype='datetime64[D]') + np.timedelta64(1, 'D')
+    counts = np.busday_count(starts, ends, busdaycal=business_calendar())
+    return np.maximum(counts, 0)
+
+
+def business_days_between(start, end):
+    """Número de días hábiles en el rango cerrado [start, end]"""
+    if end < start:
+        return 0
+    return int(business_days_array([start], [end])[0])
+
+
+def total_business_days(ranges):
+    """Suma de días hábiles de una secuencia de pares (inicio, fin)"""
+    ranges = list(ranges)
+    if not ranges:
+        return 0
+    starts, ends = zip(*ranges)
+    return int(business_days_array(starts, ends).sum())
+
+
+def attach_business_days(absences):
+    """Asigna business_days a cada ausencia con un solo cálculo; devuelve la lista"""
+    absences = list(absences)
+    if absences:
+        counts = business_days_array([a.start_date for a in absences], [a.end_date for a in absences])
+        for absence, days in zip(absences, counts):
+            absence.business_days = int(days)
+    return absences
+
+
+def is_business_day(day, calendar=None):
+    return bool(np.is_busday(np.datetime64(day, 'D'), busdaycal=calendar or business_calendar()))
+
+
+def iter_business_days(start, end):
+    """Genera los días hábiles del rango cerrado [start, end]"""
+    calendar = business_calendar()
+    day = start
+    while day <= end:
+        if is_business_day(day, calendar):
+            yield day
+        day += timedelta(days=1)